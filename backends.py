@@ -0,0 +1,194 @@
+"""
+Registry of solver backends and per-instance backend selection.
+
+Every backend solves one problem, 'php' or 'ptp', and declares what it can do:
+whether it is exact, the largest |H| it accepts, its version and fallback, and
+rough models of its time and memory as a function of n and |H|. The models
+were fitted on generated instances (see benchmark.py) and only have to be
+right within a small factor: they decide between backends, they do not
+promise a running time.
+
+`select_backend` picks, for one instance, the first backend of the problem
+(exact ones first) within the declared limits, the memory budget (by default
+the memory available right now) and the time budget. A caller can name a
+backend instead. The batch runner records the chosen backend of every result.
+
+Examples:
+    backend = select_backend('php', n=1000, num_homes=25, time_budget=60)
+    tour, pick_up_locs_dict = backend.run(G, H, alpha)
+    print(backend.name, backend.estimate(1000, 25))
+"""
+
+from memory_accounting import estimate_dp_memory, available_memory
+
+
+class Backend:
+    """
+    A solver engine and what it declares about itself.
+
+    Parameters:
+        name (str): Unique name, also the solver name of supervisor and RunStore.
+        problem (str): 'php' or 'ptp'.
+        run (callable): run(G, H, alpha, stats=None, gap_tolerance=None) ->
+            (tour, pick_up_locs_dict). Module-level, so it can run in a worker
+            process. Anytime backends stop once within gap_tolerance of the
+            lower bound (see lower_bounds.py), the others ignore it.
+        exact (bool): Whether the answer is optimal.
+        time_model (callable): time_model(n, num_homes) -> estimated seconds.
+        memory_model (callable): memory_model(n, num_homes) -> estimated bytes.
+        max_homes (int): Largest |H| the backend accepts, None for no limit.
+        version (str): Bump it whenever a change can change the results.
+        fallback (str): Cheaper backend retried over the time or memory limits.
+    """
+
+    def __init__(self, name, problem, run, exact, time_model, memory_model, max_homes=None,
+                 version='1', fallback=None):
+        self.name = name
+        self.problem = problem
+        self.run = run
+        self.exact = exact
+        self.time_model = time_model
+        self.memory_model = memory_model
+        self.max_homes = max_homes
+        self.version = version
+        self.fallback = fallback
+
+    def __repr__(self):
+        return f"Backend({self.name!r}, problem={self.problem!r}, exact={self.exact})"
+
+    def estimate(self, n, num_homes):
+        """{'seconds', 'memory'} estimated for an instance"""
+        return {'seconds': self.time_model(n, num_homes), 'memory': self.memory_model(n, num_homes)}
+
+    def rejects(self, n, num_homes, memory_budget=None, time_budget=None):
+        """Why the backend does not fit an instance, None when it does"""
+        if self.max_homes is not None and num_homes > self.max_homes:
+            return f"|H| = {num_homes} is over its limit of {self.max_homes}"
+        if memory_budget is not None and self.memory_model(n, num_homes) > memory_budget:
+            return "estimated memory over the budget"
+        if time_budget is not None and self.time_model(n, num_homes) > time_budget:
+            return "estimated time over the budget"
+        return None
+
+
+BACKENDS = {}
+
+
+def register_backend(backend):
+    """Add a backend to the registry, replacing one of the same name"""
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+def get_backend(name):
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown solver {name}") from None
+
+
+def backends_for(problem):
+    """Backends of a problem, exact ones first, then in registration order"""
+    return sorted((b for b in BACKENDS.values() if b.problem == problem), key=lambda b: not b.exact)
+
+
+def select_backend(problem, n, num_homes, memory_budget=None, time_budget=None, override=None):
+    """
+    Backend for one instance.
+
+    Parameters:
+        problem (str): 'php' or 'ptp'.
+        n (int), num_homes (int): Size of the instance.
+        memory_budget (int): Bytes the solve may use, by default the memory
+            available now (see `available_memory`), no limit when unknown.
+        time_budget (float): Seconds the solve may take, None for no limit.
+        override (str): Name of the backend to use whatever the estimates.
+
+    Returns:
+        Backend: The first backend of the problem that fits, or the fastest
+            one accepting |H| when none does.
+    """
+    if override is not None:
+        backend = get_backend(override)
+        if backend.problem != problem:
+            raise ValueError(f"backend {override} solves {backend.problem}, not {problem}")
+        return backend
+    candidates = backends_for(problem)
+    if not candidates:
+        raise ValueError(f"no backend for problem {problem}")
+    if memory_budget is None:
+        memory_budget = available_memory()
+    for backend in candidates:
+        if backend.rejects(n, num_homes, memory_budget, time_budget) is None:
+            return backend
+    # over the budgets anyway: the fastest that accepts the size at all
+    capable = [b for b in candidates if b.max_homes is None or num_homes <= b.max_homes]
+    return min(capable or candidates, key=lambda b: b.time_model(n, num_homes))
+
+
+# --- Built-in backends ---
+def _run_php(G, H, alpha, stats=None, gap_tolerance=None):
+    from php_from_tsp import php_solver_from_tsp
+    return php_solver_from_tsp(G, H, stats=stats), {}
+
+
+def _run_php_heuristic(G, H, alpha, stats=None, gap_tolerance=None):
+    from php_from_tsp import php_solver_from_tsp
+    from tsp_heuristics import heuristic_tsp
+    return php_solver_from_tsp(G, H, stats=stats, tsp_solver=heuristic_tsp), {}
+
+
+def _run_php_clustered(G, H, alpha, stats=None, gap_tolerance=None):
+    from php_from_tsp import php_solver_from_tsp
+    from cluster_tsp import cluster_tsp
+    return php_solver_from_tsp(G, H, stats=stats, tsp_solver=cluster_tsp), {}
+
+
+def _run_ptp(G, H, alpha, stats=None, gap_tolerance=None):
+    from ptp_solver import ptp_solver
+    return ptp_solver(G, H, alpha, stats=stats, gap_tolerance=gap_tolerance)
+
+
+def _run_ptp_greedy(G, H, alpha, stats=None, gap_tolerance=None):
+    from ptp_solver import greedy_ptp_solver
+    return greedy_ptp_solver(G, H, alpha, stats=stats)
+
+
+def _shortest_paths_time(n, num_homes, stops_per_home=1):
+    return 2e-6 * n * (num_homes * stops_per_home + 1)
+
+
+def _distance_matrix_memory(terminals):
+    # distance and path dicts of every pair of terminals
+    return 200 * terminals * terminals
+
+
+# pick-up stops per home, the home and about four neighbors
+_STOPS_PER_HOME = 5
+
+register_backend(Backend(
+    'php', 'php', _run_php, exact=True,
+    time_model=lambda n, h: 5e-8 * (1 << (h + 1)) * (h + 1) ** 2 + _shortest_paths_time(n, h),
+    memory_model=lambda n, h: estimate_dp_memory(h) + _distance_matrix_memory(h + 1),
+    max_homes=24, version='3', fallback='php_heuristic'))
+# 2-opt and Or-opt over all stops grow about as |H|^3: 10 s at |H| = 600
+register_backend(Backend(
+    'php_heuristic', 'php', _run_php_heuristic, exact=False,
+    time_model=lambda n, h: 3e-3 * h + 5e-8 * h ** 3 + _shortest_paths_time(n, h),
+    memory_model=lambda n, h: _distance_matrix_memory(h + 1),
+    max_homes=300, version='2', fallback='php_clustered'))
+register_backend(Backend(
+    'php_clustered', 'php', _run_php_clustered, exact=False,
+    time_model=lambda n, h: 1e-3 * h + 1e-6 * h * h + _shortest_paths_time(n, h),
+    memory_model=lambda n, h: _distance_matrix_memory(h + 1),
+    version='1'))
+register_backend(Backend(
+    'ptp', 'ptp', _run_ptp, exact=False,
+    time_model=lambda n, h: 1.2e-2 * h + 6e-5 * h * h + _shortest_paths_time(n, h, _STOPS_PER_HOME),
+    memory_model=lambda n, h: _distance_matrix_memory(_STOPS_PER_HOME * h + 1),
+    version='2', fallback='ptp_greedy'))
+register_backend(Backend(
+    'ptp_greedy', 'ptp', _run_ptp_greedy, exact=False,
+    time_model=lambda n, h: 1e-2 * h + 1.5e-5 * h * h + _shortest_paths_time(n, h, _STOPS_PER_HOME),
+    memory_model=lambda n, h: _distance_matrix_memory(_STOPS_PER_HOME * h + 1),
+    version='2'))
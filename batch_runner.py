@@ -0,0 +1,384 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils import *
+from profiling import profile, span
+from solver_stats import SolverStats
+from memory_accounting import MiB, track_memory, preflight, estimate_dp_memory
+from supervisor import (SupervisedSolve, SolveTimeout, WorkerCrashed, run_supervised, preload_solvers,
+                        solver_version)
+from backends import BACKENDS, backends_for, select_backend
+from lower_bounds import instance_lower_bound, gap
+
+SOLVER_NAMES = ('php', 'ptp')
+
+
+def instance_size(file):
+    """
+    (|H|, n) read from the header of an input file, used to schedule the
+    hardest instances first. The DP is exponential in |H|, so it sorts first.
+    """
+    try:
+        with open(file, 'r') as f:
+            f.readline()
+            number_of_nodes, number_of_homes = f.readline().split()[:2]
+        return int(number_of_homes), int(number_of_nodes)
+    except (OSError, ValueError):
+        return 0, 0
+
+
+def solve_instance(file, solver, trace_memory=False, memory_budget=None, over_budget='refuse',
+                   timeout=None, memory_limit=None, fallback=True, backend=None, gap_tolerance=None,
+                   lower_bound=False):
+    """
+    Read, solve and analyze one input file. Runs in a worker process.
+
+    Parameters:
+        file (str): Path of the input file.
+        solver (str): 'php' or 'ptp', the problem to solve.
+        trace_memory (bool): Trace allocations, see `MemoryTracker`.
+        memory_budget (int): Bytes allowed for the solve. The backend is chosen
+            within it (see `select_backend`), by default within the available memory.
+        over_budget (str): 'refuse' raises when the PHP DP tables do not fit
+            memory_budget (see `preflight`), 'downgrade' lets the backend selection
+            pick a heuristic.
+        timeout (float), memory_limit (int): Wall-clock seconds and bytes of a
+            supervised solve, see `SupervisedSolve`. None runs the solver in-process.
+        fallback (bool): Retry with the cheaper fallback backend when
+            the supervised solve runs out of time or memory.
+        backend (str): Use this backend instead of selecting one, see backends.py.
+        gap_tolerance (float): Let anytime backends stop within this relative gap
+            of the lower bound, see `ptp_solver`.
+        lower_bound (bool): Also compute a lower bound on the optimal cost and the
+            gap to it, within timeout and memory_limit like the solve. It runs
+            its own shortest paths and Held-Karp bound, off by default.
+
+    Returns:
+        dict: A result record with keys file, solver, n, homes, alpha, legitimate,
+            driving_cost, walking_cost, cost, lower_bound, gap, time, tour,
+            pick_up_locs_dict, error, profile, counters, memory, dp_estimate,
+            backend, solver_used, attempts and cached.
+            `time` only covers the successful solver call, like PTP_CLI; profile is
+            the time breakdown of the whole record (see `Profiler.to_dict`), counters
+            the solver's work counters (see `SolverStats`), memory the peak memory
+            (see `MemoryTracker.to_dict`, of the worker for a supervised solve)
+            backend the selected backend, solver_used the one that produced the
+            answer (its fallback after a failed attempt), and attempts every
+            solver tried (see `SupervisedSolve`). lower_bound is a lower bound on
+            the optimal cost (see `instance_lower_bound`) and gap the relative
+            optimality gap of cost, at most that; both are None without
+            lower_bound or when it ran over the limits. cached is True for
+            records reused from a `RunStore` instead of solved.
+    """
+    from student_utils import input_file_to_instance
+    from solution_validator import SolutionValidator
+
+    record = {'file': os.path.basename(file), 'solver': solver, 'n': None, 'homes': None,
+              'alpha': None, 'legitimate': False, 'driving_cost': None, 'walking_cost': None,
+              'cost': None, 'lower_bound': None, 'gap': None, 'time': None, 'tour': None,
+              'pick_up_locs_dict': None, 'error': None, 'profile': None, 'counters': None,
+              'memory': None, 'dp_estimate': None, 'backend': None, 'solver_used': None,
+              'attempts': None, 'cached': False}
+    stats = SolverStats()
+    worker_memory = None
+    with profile() as profiler, track_memory(trace=trace_memory) as tracker:
+        try:
+            G, H, alpha = input_file_to_instance(file)
+            record.update(n=G.number_of_nodes(), homes=len(H), alpha=alpha)
+
+            if solver == 'php':
+                record['dp_estimate'] = estimate_dp_memory(len(H))
+                if backend is None and over_budget == 'refuse':
+                    preflight(len(H), memory_budget, over_budget)
+            budgets = [budget for budget in (memory_budget, memory_limit) if budget is not None]
+            record['backend'] = select_backend(solver, record['n'], len(H),
+                                               memory_budget=min(budgets) if budgets else None,
+                                               time_budget=timeout, override=backend).name
+
+            supervised = SupervisedSolve(record['backend'], timeout=timeout, memory_limit=memory_limit,
+                                         fallback=fallback, trace_memory=trace_memory,
+                                         gap_tolerance=gap_tolerance)
+            try:
+                tour, pick_up_locs_dict = supervised.solve(G, H, alpha, stats=stats)
+            finally:
+                record['attempts'] = supervised.attempts
+            record['solver_used'] = supervised.solver_used
+            worker_memory = supervised.memory
+            record['time'] = supervised.attempts[-1]['seconds']
+
+            with span('validate'):
+                validator = SolutionValidator(G, H, alpha)
+                is_legitimate, driving_cost, walking_cost = validator.analyze(tour, pick_up_locs_dict)
+            record.update(legitimate=is_legitimate, driving_cost=driving_cost, walking_cost=walking_cost,
+                          cost=driving_cost + walking_cost, tour=tour,
+                          pick_up_locs_dict={str(k): list(v) for k, v in pick_up_locs_dict.items()})
+
+            if lower_bound:
+                with span('lower_bound'):
+                    record['lower_bound'] = _lower_bound(G, H, alpha, solver, timeout, memory_limit)
+                if record['lower_bound'] is not None:
+                    record['gap'] = gap(record['cost'], record['lower_bound'])
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+    record['profile'] = profiler.to_dict()
+    record['counters'] = stats.as_dict()
+    record['memory'] = worker_memory or tracker.to_dict()
+    return record
+
+
+def _lower_bound(G, H, alpha, problem, timeout, memory_limit):
+    """`instance_lower_bound` within the limits of the solve, None when it runs over them"""
+    if timeout is None and memory_limit is None:
+        return instance_lower_bound(G, H, alpha, problem)
+    try:
+        return run_supervised(instance_lower_bound, (G, H, alpha, problem),
+                              timeout=timeout, memory_limit=memory_limit)
+    except (SolveTimeout, MemoryError, WorkerCrashed):
+        return None
+
+
+def _cached_record(file, solver, stored):
+    """A result record from a stored result, see `RunStore.lookup`"""
+    record = {key: stored[key] for key in ('n', 'homes', 'alpha', 'legitimate', 'driving_cost',
+                                           'walking_cost', 'cost', 'time', 'tour', 'pick_up_locs_dict',
+                                           'error', 'counters', 'solver_used')}
+    record.update(file=os.path.basename(file), solver=solver, lower_bound=None, gap=None, profile=None,
+                  memory=None, dp_estimate=None, backend=stored['solver_used'], attempts=None, cached=True)
+    return record
+
+
+def _format_record(record):
+    if record['error']:
+        return f"{record['file']}: ERROR {record['error']}"
+    line = (f"{record['file']}: n = {record['n']}, |H| = {record['homes']}, "
+            f"{'legitimate' if record['legitimate'] else 'NOT legitimate'}, "
+            f"cost {record['cost']:.5f}")
+    if record['solver'] == 'ptp':
+        line += f" (driving {record['driving_cost']:.5f}, walking {record['walking_cost']:.5f})"
+    if record['gap'] is not None:
+        line += f", lower bound {record['lower_bound']:.5f}, gap {100 * record['gap']:.2f}%"
+    if record['solver_used'] != record['solver']:
+        line += f" [solved by {record['solver_used']}]"
+    if record['solver_used'] != record['backend']:
+        line += f" [fell back from {record['backend']}]"
+    if record['cached']:
+        return line + f", time {record['time']:.5f} s (cached)"
+    return line + f", time {record['time']:.5f} s, {_format_memory(record['memory'])}"
+
+
+def _format_memory(memory):
+    parts = []
+    if memory['peak_traced'] is not None:
+        parts.append(f"{memory['peak_traced'] / MiB:.2f} MiB traced")
+    if memory['peak_rss'] is not None:
+        parts.append(f"{memory['peak_rss'] / MiB:.2f} MiB RSS")
+    return f"peak {', '.join(parts) or 'memory unknown'}"
+
+
+def run_batch(files, solver='php', workers=None, results_file=None, out_dir=None, archive=None,
+              quiet=False, trace_memory=False, memory_budget=None, over_budget='refuse',
+              timeout=None, memory_limit=None, fallback=True, store=None, reuse=True, backend=None,
+              gap_tolerance=None, lower_bound=False):
+    """
+    Solve many input files in a process pool.
+
+    Parameters:
+        files (list): Paths of the input files.
+        solver (str): 'php' or 'ptp'.
+        workers (int): Number of worker processes, default os.cpu_count().
+            With 1 worker everything runs in this process.
+        results_file (str): Append one JSON record per instance to this file,
+            as soon as the instance is done.
+        out_dir (str), archive (str): Where PTP solutions are written,
+            see `SolutionSink`. PHP solutions are not written, like PTP_CLI.
+        quiet (bool): Do not print per-instance lines.
+        trace_memory, memory_budget, over_budget, timeout, memory_limit, fallback, backend, gap_tolerance,
+        lower_bound: See `solve_instance`.
+        store (str): SQLite run store (see `RunStore`) receiving every result.
+        reuse (bool): Take the result of an instance from the store instead of
+            solving it, when the store has a valid one for the same instance
+            content and parameters, produced by the current version of its backend.
+
+    Returns:
+        list: The result records (see `solve_instance`) in completion order.
+    """
+    # largest instances first, so a big one does not start last and idle the other workers
+    files = sorted(files, key=lambda file: (instance_size(file), file), reverse=True)
+
+    sink = None
+    if solver == 'ptp':
+        from solution_writer import SolutionSink
+        sink = SolutionSink(out_dir=out_dir, archive=archive)
+    results_out = open(results_file, 'a') if results_file else None
+
+    options = {'trace_memory': trace_memory, 'memory_budget': memory_budget, 'over_budget': over_budget,
+               'timeout': timeout, 'memory_limit': memory_limit, 'fallback': fallback,
+               'backend': backend, 'gap_tolerance': gap_tolerance, 'lower_bound': lower_bound}
+    records = []
+
+    run_store = None
+    if store:
+        from run_store import RunStore, instance_hash
+        # everything but trace_memory and lower_bound can change the result
+        params = {key: value for key, value in options.items() if key not in ('trace_memory', 'lower_bound')}
+        current_versions = [solver_version(b.name, fallback=False) for b in backends_for(solver)]
+        run_store = RunStore(store)
+        run_id = run_store.start_run(solver, solver_version(backend or solver, fallback), params)
+        hashes = {file: instance_hash(file) for file in files}
+
+    def collect(record, file):
+        records.append(record)
+        if run_store is not None:
+            # keyed on the backend that produced the result, which may be a fallback or auto-selected
+            used = record['solver_used'] or record['backend'] or solver
+            run_store.add(run_id, record, hashes[file], solver_version(used, fallback=False), params)
+        if not quiet:
+            print(_format_record(record), flush=True)
+        if results_out:
+            results_out.write(json.dumps(record) + '\n')
+            results_out.flush()
+        if sink is not None and record['tour'] is not None:
+            pick_up_locs_dict = {int(k): v for k, v in record['pick_up_locs_dict'].items()}
+            sink.add(record['file'], record['tour'], pick_up_locs_dict)
+
+    try:
+        if run_store is not None and reuse:
+            unsolved = []
+            for file in files:
+                stored = run_store.lookup(hashes[file], solver, current_versions, params)
+                if stored is None:
+                    unsolved.append(file)
+                else:
+                    collect(_cached_record(file, solver, stored), file)
+            files = unsolved
+        if workers == 1:
+            for file in files:
+                collect(solve_instance(file, solver, **options), file)
+        elif files:
+            preload_solvers()
+            with ProcessPoolExecutor(max_workers=workers, initializer=preload_solvers) as executor:
+                futures = {executor.submit(solve_instance, file, solver, **options): file for file in files}
+                for future in as_completed(futures):
+                    collect(future.result(), futures[future])
+    finally:
+        if sink is not None:
+            sink.close()
+        if results_out:
+            results_out.close()
+        if run_store is not None:
+            run_store.close()
+    return records
+
+
+def summarize(records):
+    """
+    The summary PTP_CLI prints at the end of test_php_all / test_ptp_all.
+    Like there, every file counts as tested, a failed solve as not legitimate.
+    """
+    solved = [record for record in records if not record['error']]
+    legitimate_count = sum(1 for record in solved if record['legitimate'])
+    lines = [f"\nSuccessfully tested {len(records)} files \n {legitimate_count} legitimate"]
+    if solved:
+        scores = [record['cost'] for record in solved]
+        lines.append(f"Average cost: {sum(scores)/len(scores):.5f}")
+    gaps = [record['gap'] for record in solved if record['gap'] is not None]
+    if gaps:
+        worst = max((record for record in solved if record['gap'] is not None), key=lambda record: record['gap'])
+        lines.append(f"Average gap to the lower bound: {100 * sum(gaps) / len(gaps):.2f}%, "
+                     f"largest {100 * worst['gap']:.2f}% ({worst['file']})")
+    failed = len(records) - len(solved)
+    if failed:
+        lines.append(f"{failed} files failed with an error")
+    cached = sum(1 for record in records if record['cached'])
+    if cached:
+        lines.append(f"{cached} results reused from the run store")
+    backends = {}
+    for record in solved:
+        backends[record['solver_used']] = backends.get(record['solver_used'], 0) + 1
+    if len(backends) > 1:
+        lines.append("Backends used: " + ', '.join(f"{name} {count}" for name, count in sorted(backends.items())))
+    fallbacks = sum(1 for record in solved if record['solver_used'] != record['backend'])
+    if fallbacks:
+        lines.append(f"{fallbacks} files solved by a cheaper fallback solver")
+    measured = [record for record in records if record['memory'] and record['memory']['peak_rss']]
+    if measured:
+        worst = max(measured, key=lambda record: record['memory']['peak_rss'])
+        lines.append(f"Largest peak RSS: {worst['memory']['peak_rss'] / MiB:.2f} MiB ({worst['file']})")
+    return '\n'.join(lines)
+
+
+def summarize_counters(records):
+    """Work counters added up over all records, one per line"""
+    total = SolverStats.aggregate(record['counters'] for record in records)
+    return '\n'.join(f"  {name}: {value}" for name, value in total.as_dict().items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve all input files in parallel, without prompts.")
+    parser.add_argument('-s', '--solver', choices=SOLVER_NAMES, default='php',
+                        help="solver to run (default: %(default)s)")
+    parser.add_argument('-i', '--inputs', default=os.path.join(INPUT_FILE_DIRECTORY, '*.in'),
+                        help="glob of the input files (default: %(default)s)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument('-o', '--output', default=None,
+                        help="append JSON result records to this file")
+    parser.add_argument('--out-dir', default=None,
+                        help=f"directory of the PTP .out files (default: ./{OUTPUT_FILE_DIRECTORY})")
+    parser.add_argument('--archive', default=None,
+                        help="write PTP solutions to this archive instead of .out files")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print the summary")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="trace allocations for the peak and largest allocation sites (slow)")
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MIB',
+                        help="memory budget of every solve in MiB (default: the available memory)")
+    parser.add_argument('--over-budget', choices=('refuse', 'downgrade'), default='refuse',
+                        help="refuse instances over the budget or solve them heuristically "
+                             "(default: %(default)s)")
+    parser.add_argument('-t', '--timeout', type=float, default=None, metavar='SECONDS',
+                        help="wall-clock limit of every solve, run in a supervised worker (default: none)")
+    parser.add_argument('--memory-limit', type=float, default=None, metavar='MIB',
+                        help="memory limit of every solve, run in a supervised worker (default: none)")
+    parser.add_argument('--no-fallback', action='store_true',
+                        help="do not retry a solve over its limits with a cheaper solver")
+    parser.add_argument('-b', '--backend', choices=sorted(BACKENDS), default=None,
+                        help="solve with this backend instead of selecting one per instance")
+    parser.add_argument('--gap-tolerance', type=float, default=None, metavar='GAP',
+                        help="stop anytime solvers within this relative gap of the lower bound, "
+                             "e.g. 0.05 (default: run them fully)")
+    parser.add_argument('--lower-bound', action='store_true',
+                        help="also compute a lower bound and the optimality gap of every solve, "
+                             "within the same limits")
+    parser.add_argument('--store', default=None, metavar='SQLITE',
+                        help="record results in this run store and reuse its valid results")
+    parser.add_argument('--no-reuse', action='store_true',
+                        help="solve every instance again, even with a valid result in the store")
+    args = parser.parse_args(argv)
+    memory_budget = int(args.memory_budget * MiB) if args.memory_budget is not None else None
+    memory_limit = int(args.memory_limit * MiB) if args.memory_limit is not None else None
+
+    files = sorted(glob.glob(args.inputs))
+    if not files:
+        print(f"No input files match {args.inputs}")
+        return 1
+    print(f"Testing {args.solver} solver on {len(files)} inputs...")
+    records = run_batch(files, solver=args.solver, workers=args.workers, results_file=args.output,
+                        out_dir=args.out_dir, archive=args.archive, quiet=args.quiet,
+                        trace_memory=args.trace_memory, memory_budget=memory_budget,
+                        over_budget=args.over_budget, timeout=args.timeout,
+                        memory_limit=memory_limit, fallback=not args.no_fallback,
+                        store=args.store, reuse=not args.no_reuse, backend=args.backend,
+                        gap_tolerance=args.gap_tolerance, lower_bound=args.lower_bound)
+    print(summarize(records))
+    counters = summarize_counters(records)
+    if counters:
+        print(f"Work counters:\n{counters}")
+    return 0 if all(record['legitimate'] for record in records) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for mtsp_dp and the PHP pipeline.
+
+Sweeps n, |H| and graph density over generated instances (plus the bundled
+inputs that are small enough), times every stage of php_solver_from_tsp over
+repeated runs after warm-up, measures peak traced memory in a separate run,
+and records everything to JSON. Given a baseline JSON, it fails when a case
+got slower, heavier or more expensive than the baseline by more than a threshold.
+
+Usage:
+    python benchmark.py -o bench.json                      # run and record
+    python benchmark.py --baseline bench.json --threshold 0.2  # run and compare
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+from utils import *
+from student_utils import input_file_to_instance, weighted_edge_list_to_graph, analyze_solution
+from php_from_tsp import php_solver_from_tsp
+from solver_stats import SolverStats
+from profiling import profile
+from instance_generator import generate_instance
+
+STAGES = ('preprocess', 'shortest_paths', 'reduction', 'dp', 'expansion')
+# span of every stage under the php_solver_from_tsp span, see profiling
+STAGE_SPANS = {'preprocess': 'preprocess', 'shortest_paths': 'shortest_paths', 'reduction': 'reduction',
+               'dp': 'mtsp_dp', 'expansion': 'expansion'}
+
+
+def generated_case(n, homes, avg_degree, alpha=0.3, seed=0):
+    """A generated instance as (name, G, H, alpha, params)"""
+    H, adj = generate_instance(n, homes, alpha, degree='local', avg_degree=avg_degree, seed=seed)
+    edge_list = [(u, v, float(w)) for u, nbrs in enumerate(adj) for v, w in nbrs.items()]
+    G = weighted_edge_list_to_graph(edge_list)
+    G.graph['H'] = H
+    G.graph['alpha'] = alpha
+    name = f"gen_n{n}_h{homes}_d{avg_degree:g}"
+    return name, G, H, alpha, {'source': 'generated', 'avg_degree': avg_degree, 'seed': seed}
+
+
+def bundled_cases(max_homes):
+    """Bundled inputs with at most max_homes homes"""
+    cases = []
+    for file in get_files_with_extension(INPUT_FILE_DIRECTORY, '.in'):
+        G, H, alpha = input_file_to_instance(os.path.join(INPUT_FILE_DIRECTORY, file))
+        if len(H) <= max_homes:
+            avg_degree = G.number_of_edges() / G.number_of_nodes()
+            cases.append((file, G, H, alpha, {'source': 'bundled', 'avg_degree': round(avg_degree, 3)}))
+    return cases
+
+
+def time_php_stages(G, H):
+    """
+    Time one php_solver_from_tsp call and its stages, from its profiling spans.
+    A stage the call skipped, e.g. preprocess on a small graph, takes 0 seconds.
+
+    Returns:
+        tuple: (total, stage_times, tour) where total is the seconds of the whole
+            call and stage_times maps every name of STAGES to seconds.
+    """
+    with profile() as profiler:
+        tour = php_solver_from_tsp(G, H)
+    totals = profiler.totals()
+    times = {stage: totals.get(f'php_solver_from_tsp/{name}', 0.0) for stage, name in STAGE_SPANS.items()}
+    return totals['php_solver_from_tsp'], times, tour
+
+
+def peak_memory(G, H):
+    """Peak traced allocations of one php_solver_from_tsp call, in bytes"""
+    tracemalloc.start()
+    try:
+        php_solver_from_tsp(G, H)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def work_counters(G, H):
+    """Work counters of one php_solver_from_tsp call, see SolverStats"""
+    stats = SolverStats()
+    php_solver_from_tsp(G, H, stats=stats)
+    return stats.as_dict()
+
+
+def run_case(name, G, H, alpha, params, repeat=3, warmup=1, memory=True):
+    """
+    Benchmark one instance.
+
+    Returns:
+        dict: Case record with the median and min total time, median time per
+            stage, peak traced memory, work counters and cost of the solution.
+    """
+    for _ in range(warmup):
+        time_php_stages(G, H)
+
+    totals = []
+    stage_samples = {stage: [] for stage in STAGES}
+    tour = None
+    for _ in range(repeat):
+        total, times, tour = time_php_stages(G, H)
+        totals.append(total)
+        for stage in STAGES:
+            stage_samples[stage].append(times[stage])
+
+    is_legitimate, driving_cost, walking_cost = analyze_solution(G, H, alpha, tour, {})
+    record = {
+        'name': name,
+        'n': G.number_of_nodes(),
+        'homes': len(H),
+        'edges': G.number_of_edges() // 2,
+        'legitimate': is_legitimate,
+        'cost': driving_cost + walking_cost,
+        'time_median': statistics.median(totals),
+        'time_min': min(totals),
+        'stages': {stage: statistics.median(samples) for stage, samples in stage_samples.items()},
+        'peak_memory': peak_memory(G, H) if memory else None,
+        'counters': work_counters(G, H),
+    }
+    record.update(params)
+    return record
+
+
+def run_benchmark(sizes, homes, degrees, repeat=3, warmup=1, include_bundled=True, memory=True,
+                  verbose=True):
+    """
+    Run the whole sweep.
+
+    Returns:
+        dict: {'meta': {...}, 'cases': [case records]}
+    """
+    cases = []
+    if include_bundled:
+        cases.extend(bundled_cases(max(homes)))
+    for n in sizes:
+        for h in homes:
+            if h > n // 2:
+                continue
+            for avg_degree in degrees:
+                cases.append(generated_case(n, h, avg_degree))
+
+    records = []
+    for name, G, H, alpha, params in cases:
+        record = run_case(name, G, H, alpha, params, repeat=repeat, warmup=warmup, memory=memory)
+        records.append(record)
+        if verbose:
+            print(format_record(record), flush=True)
+
+    meta = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'warmup': warmup,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    return {'meta': meta, 'cases': records}
+
+
+def format_record(record):
+    stages = ' '.join(f"{stage}={record['stages'][stage]*1000:.1f}ms" for stage in STAGES)
+    memory = f", peak {record['peak_memory']/2**20:.2f} MiB" if record['peak_memory'] is not None else ''
+    return (f"{record['name']:24s} n={record['n']:6d} |H|={record['homes']:3d} "
+            f"total={record['time_median']*1000:9.1f}ms ({stages}){memory}, cost {record['cost']:.2f}")
+
+
+def compare_to_baseline(results, baseline, threshold=0.2, min_seconds=0.005):
+    """
+    Regressions of results against baseline.
+
+    A case regresses when its best time or peak memory grew by more than
+    threshold (a fraction), or when its cost grew at all. The best of the
+    repeated runs is compared because it is the least sensitive to machine
+    noise, and time differences below min_seconds are ignored.
+
+    Returns:
+        list: Human-readable regression messages, empty when nothing regressed.
+    """
+    baseline_cases = {case['name']: case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        old = baseline_cases.get(case['name'])
+        if old is None:
+            continue
+        name = case['name']
+        if case['time_min'] - old['time_min'] > max(threshold * old['time_min'], min_seconds):
+            regressions.append(f"{name}: time {old['time_min']:.4f}s -> {case['time_min']:.4f}s")
+        if case['peak_memory'] is not None and old.get('peak_memory') is not None \
+                and case['peak_memory'] > (1 + threshold) * old['peak_memory']:
+            regressions.append(f"{name}: peak memory {old['peak_memory']} -> {case['peak_memory']} bytes")
+        if case['cost'] > old['cost'] + 1e-6:
+            regressions.append(f"{name}: cost {old['cost']:.5f} -> {case['cost']:.5f}")
+        if old['legitimate'] and not case['legitimate']:
+            regressions.append(f"{name}: solution is no longer legitimate")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark mtsp_dp and the PHP pipeline.")
+    parser.add_argument('-n', '--sizes', type=int, nargs='+', default=[50, 200, 1000],
+                        help="numbers of nodes of generated instances (default: %(default)s)")
+    parser.add_argument('--homes', type=int, nargs='+', default=[4, 8, 12],
+                        help="values of |H| (default: %(default)s)")
+    parser.add_argument('--degrees', type=float, nargs='+', default=[3, 8],
+                        help="average degrees of generated graphs (default: %(default)s)")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="timed runs per case (default: %(default)s)")
+    parser.add_argument('--warmup', type=int, default=1, help="untimed runs per case (default: %(default)s)")
+    parser.add_argument('--no-bundled', action='store_true', help="skip the bundled inputs")
+    parser.add_argument('--no-memory', action='store_true', help="skip the peak memory run")
+    parser.add_argument('-o', '--output', default=None, help="write the results JSON to this file")
+    parser.add_argument('--baseline', default=None, help="baseline results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed relative slowdown or memory growth (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.sizes, args.homes, args.degrees, repeat=args.repeat, warmup=args.warmup,
+                            include_bundled=not args.no_bundled, memory=not args.no_memory)
+    if args.output:
+        write_to_file(args.output, json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, threshold=args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.baseline}:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"\nNo regression against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Cluster-first, route-second M-TSP for home sets too large for one tour search.
+
+    1. Partition the stops (every node but the depot) into clusters of about
+       cluster_size stops by k-medoids on the distances of the reduced graph,
+       i.e. on the shortest-path metric of the city.
+    2. Close every cluster into a short cycle: exactly by mtsp_dp up to
+       exact_limit stops, by nearest neighbor + 2-opt + Or-opt beyond.
+       The clusters are independent, with workers > 1 they are solved in a
+       process pool.
+    3. Order the clusters by a tour over their medoids from the depot.
+    4. Stitch: open every cycle at one of its edges and enter it from either
+       end, choosing the cuts of all clusters together by dynamic programming
+       over the cluster sequence. The clusters were solved apart, so the
+       poor edges are around the junctions: 2-opt and Or-opt restricted to
+       near neighbors find them without scanning every pair of stops.
+
+`cluster_tsp` is a drop-in replacement of mtsp_dp, like heuristic_tsp:
+
+    tour = php_solver_from_tsp(G, H, tsp_solver=cluster_tsp)
+"""
+
+import heapq
+import random
+import networkx as nx
+from tsp_heuristics import distance_matrix, nearest_neighbor_order, improve_order, tour_length
+from solver_stats import SolverStats
+from profiling import span, traced
+
+# Stops per cluster, the exact cycle of such a cluster takes a few milliseconds
+CLUSTER_SIZE = 10
+# Clusters up to this many stops are solved exactly by mtsp_dp
+EXACT_LIMIT = 12
+# Candidate new edges per stop of the 2-opt and Or-opt after stitching
+NEIGHBORS = 8
+
+
+def k_medoids(nodes, dist, k, seed=0, max_iterations=20):
+    """
+    Partition nodes into k clusters around medoids, alternating between
+    assigning every node to its nearest medoid and moving every medoid to the
+    member closest to the others. Seeded like k-means++.
+
+    Returns:
+        tuple: (medoids, clusters, iterations) where clusters[i] lists the
+            nodes of the cluster of medoids[i], the medoid included.
+    """
+    nodes = list(nodes)
+    k = max(1, min(k, len(nodes)))
+    rng = random.Random(seed)
+    medoids = [rng.choice(nodes)]
+    nearest = {v: dist[medoids[0]][v] for v in nodes}
+    while len(medoids) < k:
+        total = sum(nearest.values())
+        if total <= 0:
+            break
+        target, acc = rng.random() * total, 0
+        for v in nodes:
+            acc += nearest[v]
+            if acc >= target and nearest[v] > 0:
+                break
+        medoids.append(v)
+        for u in nodes:
+            nearest[u] = min(nearest[u], dist[v][u])
+
+    iterations = 0
+    while True:
+        iterations += 1
+        index = {m: i for i, m in enumerate(medoids)}
+        clusters = [[m] for m in medoids]
+        for v in nodes:
+            if v not in index:
+                clusters[min(range(len(medoids)), key=lambda i: dist[medoids[i]][v])].append(v)
+        new_medoids = [min(cluster, key=lambda c: sum(dist[c][v] for v in cluster)) for cluster in clusters]
+        if new_medoids == medoids or iterations >= max_iterations:
+            return medoids, clusters, iterations
+        medoids = new_medoids
+
+
+def solve_cycle(dist, exact_limit=EXACT_LIMIT):
+    """
+    Short closed tour over the nodes 0 to len(dist)-1 of a distance matrix.
+    Runs in a worker process.
+
+    Returns:
+        tuple: (order, counters), the visiting order without the return to
+            its start and the work counters of the solve.
+    """
+    from mtsp_dp import mtsp_dp
+    stats = SolverStats()
+    m = len(dist)
+    if m <= 3:
+        return list(range(m)), stats.as_dict()
+    if m <= exact_limit:
+        G = nx.DiGraph()
+        G.add_weighted_edges_from((u, v, dist[u][v]) for u in range(m) for v in range(m) if u != v)
+        order = mtsp_dp(G, stats=stats)[:-1]
+    else:
+        order = nearest_neighbor_order(range(m), dist)
+        stats.add('heuristic_tsp.moves', improve_order(order, dist))
+    return order, stats.as_dict()
+
+
+def stitch(cycles, dist, depot=0):
+    """
+    Join closed cycles, in the given order, into one tour from the depot.
+
+    Every cycle is entered at a node and left at one of its two cycle
+    neighbors, skipping the edge between them. The choice for all cycles is
+    optimal for the cycle order, by dynamic programming over the sequence
+    with the exit node as state.
+
+    Returns:
+        list: The visiting order, the depot first.
+    """
+    # best[last] = (cost of the tour so far, back pointer), last the exit of the latest cycle
+    best = {depot: (0, None)}
+    layers = []
+    for cycle in cycles:
+        m = len(cycle)
+        length = tour_length(cycle, dist)
+        layer = {}
+        for i in range(m):
+            for step in ((1, -1) if m > 2 else (1,)):
+                entry, last = cycle[i], cycle[(i + step) % m]
+                inside = length - dist[last][entry] if m > 1 else 0
+                prev = min(best, key=lambda u: best[u][0] + dist[u][entry])
+                cost = best[prev][0] + dist[prev][entry] + inside
+                if last not in layer or cost < layer[last][0]:
+                    layer[last] = (cost, (prev, i, -step))
+        layers.append(layer)
+        best = layer
+
+    last = min(best, key=lambda u: best[u][0] + dist[u][depot])
+    paths = []
+    for cycle, layer in zip(reversed(cycles), reversed(layers)):
+        prev, i, step = layer[last][1]
+        # walk the cycle from the entry, away from the exit
+        paths.append([cycle[(i + step * j) % len(cycle)] for j in range(len(cycle))])
+        last = prev
+    order = [depot]
+    for path in reversed(paths):
+        order.extend(path)
+    return order
+
+
+def nearest_neighbors(dist, k=NEIGHBORS):
+    """neighbors[u] = the k nodes closest to u, closest first"""
+    n = len(dist)
+    return [heapq.nsmallest(k, (v for v in range(n) if v != u), key=dist[u].__getitem__) for u in range(n)]
+
+
+def two_opt_neighbors(order, dist, neighbors):
+    """
+    2-opt that only tries new edges (a, c) with c among the neighbors of a
+    shorter than the edge (a, b) they replace. order[0] stays in place.
+    Works in place.
+
+    Returns:
+        int: Number of improving moves applied.
+    """
+    n = len(order)
+    position = {v: i for i, v in enumerate(order)}
+    moves = 0
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n):
+            a, b = order[i], order[(i + 1) % n]
+            for c in neighbors[a]:
+                if dist[a][c] >= dist[a][b]:
+                    break
+                j = position[c]
+                d = order[(j + 1) % n]
+                if c == b or d == a:
+                    continue
+                if dist[a][c] + dist[b][d] - dist[a][b] - dist[c][d] < -1e-9:
+                    # (a, b), (c, d) -> (a, c), (b, d): reverse b..c or d..a, whichever avoids order[0]
+                    lo, hi = (i + 1, j) if i < j else (j + 1, i)
+                    order[lo:hi + 1] = reversed(order[lo:hi + 1])
+                    for k in range(lo, hi + 1):
+                        position[order[k]] = k
+                    moves += 1
+                    improved = True
+                    break
+    return moves
+
+
+def or_opt_neighbors(order, dist, neighbors, max_segment=3):
+    """
+    Or-opt that only tries to insert a segment next to a neighbor of one of
+    its ends, closer than the gain of removing the segment. order[0] stays
+    in place. Works in place.
+
+    Returns:
+        int: Number of improving moves applied.
+    """
+    n = len(order)
+    moves = 0
+    improved = True
+    while improved:
+        improved = False
+        position = {v: i for i, v in enumerate(order)}
+        for length in range(1, max_segment + 1):
+            for i in range(1, n - length + 1):
+                segment = order[i:i + length]
+                prev, nxt = order[i - 1], order[(i + length) % n]
+                removal_gain = dist[prev][segment[0]] + dist[segment[-1]][nxt] - dist[prev][nxt]
+                inside = set(segment)
+                best_delta, best = -1e-9, None
+                for end, other in ((segment[0], segment[-1]), (segment[-1], segment[0])):
+                    for c in neighbors[end]:
+                        if dist[end][c] >= removal_gain:
+                            break
+                        if c in inside:
+                            continue
+                        j = position[c]
+                        # between c's predecessor a and c, or between c and its successor b
+                        for a, b, first in ((order[j - 1], c, other), (c, order[(j + 1) % n], end)):
+                            if a in inside or b in inside:
+                                continue
+                            last = end if first == other else other
+                            delta = dist[a][first] + dist[last][b] - dist[a][b] - removal_gain
+                            if delta < best_delta:
+                                best_delta, best = delta, (a, first)
+                if best is not None:
+                    a, first = best
+                    if first != segment[0]:
+                        segment.reverse()
+                    rest = order[:i] + order[i + length:]
+                    k = rest.index(a)
+                    order[:] = rest[:k + 1] + segment + rest[k + 1:]
+                    position = {v: i for i, v in enumerate(order)}
+                    moves += 1
+                    improved = True
+    return moves
+
+
+def improve_boundaries(order, dist, neighbors):
+    """Alternate the neighbor-list 2-opt and Or-opt until neither improves. Works in place."""
+    moves = two_opt_neighbors(order, dist, neighbors)
+    while True:
+        moved = or_opt_neighbors(order, dist, neighbors)
+        if not moved:
+            break
+        moves += moved + two_opt_neighbors(order, dist, neighbors)
+    return moves
+
+
+@traced()
+def cluster_tsp(G, stats=None, cluster_size=CLUSTER_SIZE, exact_limit=EXACT_LIMIT, workers=1, seed=0):
+    """
+    M-TSP by cluster-first, route-second, for graphs too large for mtsp_dp and
+    slow for heuristic_tsp. Not guaranteed to be optimal.
+
+    Parameters:
+        G (nx.Graph): Complete graph on the nodes 0 to n-1, see mtsp_dp.
+        stats (SolverStats): Optional, receives the cluster_tsp.* counters and
+            the counters of the cluster solves.
+        cluster_size (int): Stops per cluster on average.
+        exact_limit (int): Largest cluster solved exactly by mtsp_dp.
+        workers (int): Processes solving the clusters, 1 solves them here.
+        seed (int): Seed of the k-medoids initialization.
+
+    Returns:
+        list: A tour over all nodes of G, starting and ending at node 0.
+    """
+    n = G.number_of_nodes()
+    dist = distance_matrix(G)
+    if n <= exact_limit:
+        order, counters = solve_cycle(dist, exact_limit)
+        if stats is not None:
+            stats.update(counters)
+        return order + [0]
+    stops = list(range(1, n))
+
+    with span('clustering'):
+        k = -(-len(stops) // cluster_size)
+        medoids, clusters, iterations = k_medoids(stops, dist, k, seed=seed)
+
+    with span('cluster_solve'):
+        matrices = [[[dist[u][v] for v in cluster] for u in cluster] for cluster in clusters]
+        if workers > 1 and len(clusters) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                solved = list(executor.map(solve_cycle, matrices, [exact_limit] * len(matrices)))
+        else:
+            solved = [solve_cycle(matrix, exact_limit) for matrix in matrices]
+    cycles = [[cluster[i] for i in order] for cluster, (order, _) in zip(clusters, solved)]
+
+    with span('stitching'):
+        medoid_dist = _medoid_distances(medoids, dist)
+        sequence = nearest_neighbor_order(range(len(medoid_dist)), medoid_dist)
+        improve_order(sequence, medoid_dist)
+        order = stitch([cycles[i - 1] for i in sequence[1:]], dist)
+        moves = improve_boundaries(order, dist, nearest_neighbors(dist))
+
+    if stats is not None:
+        stats.add('cluster_tsp.clusters', len(clusters))
+        stats.add('cluster_tsp.exact_clusters', sum(1 for cluster in clusters if len(cluster) <= exact_limit))
+        stats.add('cluster_tsp.medoid_iterations', iterations)
+        stats.add('cluster_tsp.boundary_moves', moves)
+        for _, counters in solved:
+            stats.update(counters)
+    return order + [0]
+
+
+def _medoid_distances(medoids, dist):
+    """Distances between the depot (index 0) and the medoids (index i + 1)"""
+    points = [0] + list(medoids)
+    return [[dist[u][v] for v in points] for u in points]
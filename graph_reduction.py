@@ -0,0 +1,134 @@
+"""
+Graph preprocessing that shrinks the road network before shortest paths.
+
+Nodes that are not terminals (the depot and the homes) only matter as parts of
+paths between terminals. Two kinds of them can go without changing any
+distance between the remaining nodes:
+    - dead ends: a non-terminal node with one neighbor is never on a shortest
+      path between two other nodes, so it is pruned, repeatedly;
+    - chains: a non-terminal node with two neighbors a and b is replaced by an
+      edge (a, b) with the length of the path through it, when a and b are
+      not already adjacent.
+Contracted edges remember the nodes they stand for, so a walk on the reduced
+graph expands back to a walk that only uses real edges.
+
+The reduction also keeps what the triangle inequality check needs: the graph
+is metric iff every reduced edge is no longer than `required_distances` says.
+
+Examples:
+    reduction = GraphReduction.from_graph(G, [0] + H)
+    tour = reduction.expand(php_solver_from_tsp(reduction.graph(), H))
+"""
+
+from profiling import traced
+
+
+class GraphReduction:
+    """
+    A graph with its non-terminal dead ends pruned and its chains contracted.
+
+    Parameters:
+        adj (dict): adj[u][v] = weight of the edge from u to v. Must be
+            symmetric for a node to be pruned or contracted; asymmetric nodes are kept.
+        terminals (iterable): Nodes that must stay.
+        stats (SolverStats): Optional, receives reduction.pruned and reduction.contracted.
+
+    Attributes:
+        adj (dict): The reduced graph, in the same form.
+        chains (dict): chains[(a, b)] = nodes of G between a and b on the
+            contracted edge (a, b), in order from a to b.
+        longest (dict): longest[(a, b)] = heaviest edge of G in that chain.
+        pruned (int), contracted (int): Number of nodes removed either way.
+    """
+
+    def __init__(self, adj, terminals=(), stats=None):
+        self.adj = adj = {u: dict(nbrs) for u, nbrs in adj.items()}
+        self.chains = {}
+        self.longest = {}
+        self.pruned = self.contracted = 0
+        keep = set(terminals)
+
+        # only nodes whose in-edges mirror their out-edges are undirected in effect
+        incoming = {u: {} for u in adj}
+        for u, nbrs in adj.items():
+            for v, w in nbrs.items():
+                incoming.setdefault(v, {})[u] = w
+        undirected = {v for v, nbrs in adj.items() if incoming[v] == nbrs}
+
+        queue = [v for v in adj if v not in keep]
+        while queue:
+            v = queue.pop()
+            if v not in adj or v in keep or v not in undirected:
+                continue
+            nbrs = adj[v]
+            if len(nbrs) == 1 and len(adj) > 1:
+                (u,) = nbrs
+                self._remove(v)
+                self.pruned += 1
+                queue.append(u)
+            elif len(nbrs) == 2:
+                a, b = nbrs
+                if b in adj[a]:
+                    continue
+                longest = max(self.longest.get((a, v), nbrs[a]), self.longest.get((v, b), nbrs[b]))
+                chain = self._chain(a, v) + [v] + self._chain(v, b)
+                w = nbrs[a] + nbrs[b]
+                self._remove(v)
+                adj[a][b] = adj[b][a] = w
+                self.chains[(a, b)], self.chains[(b, a)] = chain, chain[::-1]
+                self.longest[(a, b)] = self.longest[(b, a)] = longest
+                self.contracted += 1
+                # a and b have a new neighbor, they may be contractible now
+                queue += [a, b]
+
+        if stats is not None:
+            stats.add('reduction.pruned', self.pruned)
+            stats.add('reduction.contracted', self.contracted)
+
+    @classmethod
+    @traced('graph_reduction')
+    def from_graph(cls, G, terminals=(), stats=None):
+        """Reduce a weighted NetworkX graph, see the class parameters"""
+        return cls({u: {v: data['weight'] for v, data in nbrs.items()} for u, nbrs in G.adj.items()},
+                   terminals, stats=stats)
+
+    def _chain(self, a, b):
+        self.longest.pop((b, a), None)
+        self.longest.pop((a, b), None)
+        self.chains.pop((b, a), None)
+        return self.chains.pop((a, b), [])
+
+    def _remove(self, v):
+        for u in self.adj.pop(v):
+            del self.adj[u][v]
+            self._chain(u, v)
+
+    def graph(self):
+        """The reduced graph as an nx.DiGraph"""
+        from student_utils import weighted_edge_list_to_graph
+        G = weighted_edge_list_to_graph([(u, v, w) for u, nbrs in self.adj.items() for v, w in nbrs.items()])
+        G.add_nodes_from(self.adj)
+        return G
+
+    def expand(self, walk):
+        """A walk on the reduced graph as a walk on the original one"""
+        if not walk:
+            return []
+        expanded = [walk[0]]
+        for u, v in zip(walk, walk[1:]):
+            expanded.extend(self.chains.get((u, v), ()))
+            expanded.append(v)
+        return expanded
+
+    def required_distances(self):
+        """
+        required[(u, v)] = the least shortest-path distance between u and v in
+        the reduced graph for which the original graph is metric.
+
+        A plain edge must be a shortest path by itself. The edges of a chain of
+        total length W are shortest paths iff the way around, from a to b
+        through the rest of the graph, is at least 2 * longest - W; pruned
+        dead ends are always shortest paths.
+        """
+        return {(u, v): 2 * self.longest[(u, v)] - w if (u, v) in self.chains else w
+                for u, nbrs in self.adj.items() for v, w in nbrs.items()}
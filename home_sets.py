@@ -0,0 +1,222 @@
+"""
+Batch solving of many home sets on one shared city graph.
+
+Shortest paths are computed once, from every node of the union of all home
+sets (and the depot), instead of once per solve. Each home set is then solved
+against that shared distance matrix, in parallel: the reduction, mtsp_dp and
+the expansion of the tour are all that is left per request.
+
+Usage:
+    python home_sets.py inputs/5.in home_sets.txt -w 4 -o tours.jsonl
+    python home_sets.py inputs/5.in --random 200 --homes 10 --compare
+
+A home-sets file holds one home set per line, as space-separated node numbers.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from shortest_paths import dijkstra, path_to
+from solver_stats import SolverStats
+from profiling import span, traced
+
+
+class SharedDistances:
+    """
+    Distances and shortest-path trees between the depot and a set of terminals.
+
+    Parameters:
+        G (nx.DiGraph): The city graph.
+        terminals (iterable): Every node a home set may contain.
+        stats (SolverStats): Optional, receives the Dijkstra counters.
+    """
+
+    def __init__(self, G, terminals, stats=None):
+        self.terminals = list(dict.fromkeys([0] + list(terminals)))
+        self.dist = {}
+        self.pred = {}
+        for u in self.terminals:
+            dist, pred = dijkstra(G, u, targets=self.terminals, stats=stats)
+            self.dist[u] = {v: dist[v] for v in self.terminals}
+            self.pred[u] = pred
+
+    def path(self, u, v):
+        return path_to(self.pred[u], v)
+
+    def solve(self, H, tsp_solver=None, stats=None):
+        """
+        PHP tour visiting H, like php_solver_from_tsp(G, H) but on the shared distances.
+
+        Parameters:
+            H (list): Homes, all among the terminals.
+            tsp_solver (callable): Solves M-TSP on the reduced graph, mtsp_dp by default.
+            stats (SolverStats): Optional, receives the tsp_solver counters.
+
+        Returns:
+            list: The tour, starting and ending at node 0.
+        """
+        from php_from_tsp import build_reduced_graph, expand_tour
+        from mtsp_dp import mtsp_dp
+
+        nodes_prime = list(dict.fromkeys([0] + list(H)))
+        missing = [h for h in nodes_prime if h not in self.dist]
+        if missing:
+            raise ValueError(f"homes {missing} are not among the shared terminals")
+        all_shortest_paths = {u: (self.dist[u], None) for u in nodes_prime}
+        indices = (tsp_solver or mtsp_dp)(build_reduced_graph(all_shortest_paths, nodes_prime), stats=stats)
+        tsp_tour = [nodes_prime[i] for i in indices]
+        # only the paths between consecutive terminals of the tour are needed
+        paths = {u: (None, {v: self.path(u, v)}) for u, v in zip(tsp_tour, tsp_tour[1:])}
+        return expand_tour(tsp_tour, paths)
+
+
+# The shared distances of a worker process, set by _init_worker
+_shared = None
+
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+
+def _solve_request(index, H, tsp_solver):
+    stats = SolverStats()
+    start_time = time.perf_counter()
+    try:
+        tour, error = _shared.solve(H, tsp_solver=tsp_solver, stats=stats), None
+    except Exception as e:
+        tour, error = None, f"{type(e).__name__}: {e}"
+    return {'index': index, 'homes': list(H), 'tour': tour, 'error': error,
+            'seconds': time.perf_counter() - start_time, 'counters': stats.as_dict()}
+
+
+@traced()
+def solve_home_sets(G, home_sets, workers=None, tsp_solver=None, stats=None, chunksize=4):
+    """
+    Solve PHP for many home sets on one graph.
+
+    Parameters:
+        G (nx.DiGraph): The city graph.
+        home_sets (list): One list of homes per request.
+        workers (int): Number of worker processes, default os.cpu_count().
+            With 1 worker everything runs in this process.
+        tsp_solver (callable): See `SharedDistances.solve`.
+        stats (SolverStats): Optional, receives the counters of every solve.
+        chunksize (int): Requests sent to a worker at a time.
+
+    Returns:
+        tuple: (results, summary) where results has one record per request, in
+            request order, with keys index, homes, tour, error, seconds and
+            counters; summary has the number of requests and terminals, the
+            seconds of the shared shortest paths and of the solves, and the
+            throughput in requests per second over the whole call.
+    """
+    start_time = time.perf_counter()
+    with span('shared_shortest_paths'):
+        terminals = {h for H in home_sets for h in H}
+        shared = SharedDistances(G, sorted(terminals), stats=stats)
+    shared_seconds = time.perf_counter() - start_time
+
+    with span('solve'):
+        if workers == 1 or len(home_sets) <= 1:
+            _init_worker(shared)
+            results = [_solve_request(i, H, tsp_solver) for i, H in enumerate(home_sets)]
+        else:
+            # the shared distances go to every worker once, not with every request
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shared,)) as executor:
+                results = list(executor.map(_solve_request, range(len(home_sets)), home_sets,
+                                            [tsp_solver] * len(home_sets), chunksize=chunksize))
+    total_seconds = time.perf_counter() - start_time
+
+    if stats is not None:
+        for result in results:
+            stats.update(result['counters'])
+    summary = {
+        'requests': len(home_sets),
+        'failed': sum(1 for result in results if result['error']),
+        'terminals': len(shared.terminals),
+        'shared_seconds': shared_seconds,
+        'solve_seconds': total_seconds - shared_seconds,
+        'total_seconds': total_seconds,
+        'throughput': len(home_sets) / total_seconds if total_seconds else float('inf'),
+    }
+    return results, summary
+
+
+def read_home_sets(file):
+    """One home set per non-empty line, as space-separated node numbers"""
+    with open(file, 'r') as f:
+        return [[int(token) for token in line.split()] for line in f if line.strip()]
+
+
+def random_home_sets(G, count, homes, seed=0, pool=None):
+    """
+    count random home sets of `homes` nodes each, drawn from `pool` nodes
+    (default: all nodes but the depot), so that home sets overlap like real requests.
+    """
+    rng = random.Random(seed)
+    nodes = sorted(v for v in G.nodes if v != 0)
+    if pool is not None:
+        nodes = rng.sample(nodes, min(pool, len(nodes)))
+    return [rng.sample(nodes, min(homes, len(nodes))) for _ in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve PHP for many home sets on one shared graph.")
+    parser.add_argument('input', help="input file of the city graph (its own homes are ignored)")
+    parser.add_argument('home_sets', nargs='?', default=None, help="file with one home set per line")
+    parser.add_argument('--random', type=int, default=None, metavar='COUNT',
+                        help="solve COUNT random home sets instead of a file")
+    parser.add_argument('--homes', type=int, default=8, help="homes per random set (default: %(default)s)")
+    parser.add_argument('--pool', type=int, default=None,
+                        help="draw random homes from this many nodes (default: all nodes)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random home sets")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument('-o', '--output', default=None, help="write one JSON record per request to this file")
+    parser.add_argument('--compare', action='store_true',
+                        help="also time php_solver_from_tsp once per home set, for comparison")
+    args = parser.parse_args(argv)
+
+    from student_utils import input_file_to_instance
+    G, _, _ = input_file_to_instance(args.input)
+    if args.random is not None:
+        home_sets = random_home_sets(G, args.random, args.homes, seed=args.seed, pool=args.pool)
+    elif args.home_sets:
+        home_sets = read_home_sets(args.home_sets)
+    else:
+        parser.error("give a home-sets file or --random COUNT")
+
+    stats = SolverStats()
+    results, summary = solve_home_sets(G, home_sets, workers=args.workers, stats=stats)
+    if args.output:
+        with open(args.output, 'w') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+        print(f"Tours written to {args.output}")
+    for result in results:
+        if result['error']:
+            print(f"Request {result['index']}: ERROR {result['error']}")
+    print(f"{summary['requests']} home sets over {summary['terminals']} terminals of "
+          f"{os.path.basename(args.input)}, {summary['failed']} failed")
+    print(f"Shared shortest paths: {summary['shared_seconds']:.5f} s, solves: {summary['solve_seconds']:.5f} s")
+    print(f"Throughput: {summary['throughput']:.1f} home sets per second")
+
+    if args.compare:
+        from php_from_tsp import php_solver_from_tsp
+        start_time = time.perf_counter()
+        for H in home_sets:
+            php_solver_from_tsp(G, H)
+        seconds = time.perf_counter() - start_time
+        print(f"php_solver_from_tsp one at a time: {seconds:.5f} s, "
+              f"{len(home_sets) / seconds:.1f} home sets per second")
+    return 0 if not summary['failed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
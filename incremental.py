@@ -0,0 +1,355 @@
+"""
+Incremental PHP re-solve after edge-weight and home-set updates.
+
+A loaded instance keeps one full shortest-path tree per terminal (H ∪ {0}).
+An update only repairs the part of every tree it touches: the subtrees hanging
+below edges that got heavier are recomputed from their boundary, and edges that
+got lighter are propagated from their head. A new home only needs the tree of
+its own; it is inserted where it is cheapest, a removed home is cut out. The
+tour is then re-optimized with 2-opt and Or-opt from the previous terminal
+order, instead of a cold mtsp_dp. An exact re-solve can run in a background
+process meanwhile, and is adopted when it finishes before the next change.
+
+Examples:
+    solver = IncrementalPHP(G, H)
+    tour = solver.tour
+    tour = solver.update_edges([(3, 7, 12.0), (7, 9, 4.5)])
+    tour = solver.add_home(42)
+    solver.resolve_in_background()
+    ...
+    if solver.collect_background():
+        tour = solver.tour
+"""
+
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from shortest_paths import dijkstra, path_to
+from php_from_tsp import build_reduced_graph, expand_tour
+from mtsp_dp import mtsp_dp
+from tsp_heuristics import improve_order, tour_length
+from profiling import span, traced
+
+
+class ShortestPathTree:
+    """
+    Shortest-path tree of one source, kept up to date under weight changes.
+
+    Attributes:
+        dist (dict): dist[v] = shortest distance from the source to v.
+        pred (dict): pred[v] = node before v on that path, None for the source.
+        children (dict): children[u] = set of nodes whose pred is u.
+    """
+
+    def __init__(self, G, source, stats=None):
+        self.source = source
+        self.dist, self.pred = dijkstra(G, source, stats=stats)
+        self.children = {v: set() for v in self.dist}
+        for v, u in self.pred.items():
+            if u is not None:
+                self.children[u].add(v)
+
+    def _set_pred(self, v, u):
+        old = self.pred.get(v)
+        if old is not None:
+            self.children[old].discard(v)
+        self.pred[v] = u
+        if u is not None:
+            self.children.setdefault(u, set()).add(v)
+        self.children.setdefault(v, set())
+
+    def _subtree(self, root):
+        nodes, stack = [], [root]
+        while stack:
+            v = stack.pop()
+            nodes.append(v)
+            stack.extend(self.children.get(v, ()))
+        return nodes
+
+    def repair(self, G, increased, decreased):
+        """
+        Repair the tree after the weights of G changed. Both directions of an
+        edge change together, G being undirected by construction.
+
+        Parameters:
+            increased (list): Edges (u, v) whose weight went up.
+            decreased (list): Edges (u, v) whose weight went down.
+
+        Returns:
+            int: Number of nodes whose distance was reset or improved.
+        """
+        adj, dist, inf = G.adj, self.dist, float('inf')
+
+        # 1. the subtrees below tree edges that got heavier lose their distances
+        affected = set()
+        for u, v in increased:
+            for a, b in ((u, v), (v, u)):
+                if self.pred.get(b) == a and b not in affected:
+                    affected.update(self._subtree(b))
+        for v in affected:
+            dist[v] = inf
+
+        # 2. seed them from the rest of the tree, and seed the lighter edges
+        heap = []
+        for v in affected:
+            best, best_u = inf, None
+            for u, data in adj[v].items():
+                if u not in affected and dist.get(u, inf) + data['weight'] < best:
+                    best, best_u = dist[u] + data['weight'], u
+            if best_u is not None:
+                heap.append((best, v, best_u))
+        for u, v in decreased:
+            for a, b in ((u, v), (v, u)):
+                d = dist.get(a, inf) + adj[a][b]['weight']
+                if d < dist.get(b, inf):
+                    heap.append((d, b, a))
+        heapq.heapify(heap)
+
+        # 3. propagate the improvements, Dijkstra order
+        repaired = len(affected)
+        while heap:
+            d, v, u = heapq.heappop(heap)
+            if d >= dist.get(v, inf):
+                continue
+            dist[v] = d
+            self._set_pred(v, u)
+            repaired += 1
+            for w, data in adj[v].items():
+                nd = d + data['weight']
+                if nd < dist.get(w, inf):
+                    heapq.heappush(heap, (nd, w, v))
+        return repaired
+
+    def path(self, target):
+        return path_to(self.pred, target)
+
+
+def exact_order(terminals, dist, stats=None):
+    """
+    Optimal visiting order of the terminals by mtsp_dp, depot first and not
+    repeated at the end. A module-level function, so it can run in a worker process.
+    """
+    all_shortest_paths = {u: (dist[u], None) for u in terminals}
+    indices = mtsp_dp(build_reduced_graph(all_shortest_paths, terminals), stats=stats)
+    return [terminals[i] for i in indices[:-1]]
+
+
+class IncrementalPHP:
+    """
+    PHP solution of one instance that follows edge-weight and home-set updates.
+
+    The first solve is exact (mtsp_dp over H ∪ {0}); after an update the
+    previous terminal order is re-optimized with 2-opt and Or-opt, so the tour
+    stays legitimate but is not guaranteed to be optimal anymore. `resolve`
+    runs mtsp_dp again on the current distances, `resolve_in_background`
+    does it in a worker process while the repaired tour is served.
+
+    Parameters:
+        G (nx.DiGraph): The graph, updated in place by `update_edges`.
+        H (list): The home nodes.
+        stats (SolverStats): Optional, receives the Dijkstra, mtsp_dp and
+            incremental.* counters.
+    """
+
+    def __init__(self, G, H, stats=None):
+        self.G = G
+        self.H = list(dict.fromkeys(H))
+        self.stats = stats
+        self.terminals = list(dict.fromkeys([0] + self.H))
+        with span('shortest_path_trees'):
+            self.trees = {t: ShortestPathTree(G, t, stats=stats) for t in self.terminals}
+        # every change bumps the version, so a stale background result is dropped
+        self.version = 0
+        self._background = None
+        self._executor = None
+        self.resolve()
+
+    # --- Views ---
+    def distances(self):
+        """dist[u][v] between every pair of terminals"""
+        return {u: {v: self.trees[u].dist[v] for v in self.terminals} for u in self.terminals}
+
+    def all_shortest_paths(self):
+        """Terminal shortest paths in the shape of `shortest_paths_from_terminals`"""
+        return {u: ({v: tree.dist[v] for v in self.terminals},
+                    {v: tree.path(v) for v in self.terminals})
+                for u, tree in self.trees.items()}
+
+    @property
+    def driving_distance(self):
+        return tour_length(self.order, self.distances())
+
+    def _expand(self):
+        # only the paths between consecutive terminals of the tour are needed
+        order = self.order + [0]
+        paths = {u: (None, {v: self.trees[u].path(v)}) for u, v in zip(order, order[1:])}
+        self.tour = expand_tour(order, paths)
+        return self.tour
+
+    def _reoptimize(self):
+        with span('reoptimize'):
+            moves = improve_order(self.order, self.distances())
+        if self.stats is not None:
+            self.stats.add('incremental.order_moves', moves)
+
+    # --- Solving ---
+    @traced()
+    def resolve(self):
+        """Exact re-solve with mtsp_dp on the current distances. Returns the tour."""
+        self.order = exact_order(self.terminals, self.distances(), stats=self.stats)
+        return self._expand()
+
+    def resolve_in_background(self, executor=None):
+        """
+        Start an exact re-solve of the current distances in a worker process.
+        The current tour stays served; see `collect_background`.
+
+        Parameters:
+            executor (concurrent.futures.Executor): Where to run it. By default
+                a single-process pool owned by this object, see `close`.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the exact terminal order.
+        """
+        if executor is None:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=1)
+            executor = self._executor
+        future = executor.submit(exact_order, list(self.terminals), self.distances())
+        self._background = (self.version, future)
+        return future
+
+    def collect_background(self, wait=False):
+        """
+        Adopt the background re-solve if it finished and nothing changed since
+        it started. A stale result is dropped.
+
+        Returns:
+            bool: Whether the tour changed.
+        """
+        if self._background is None:
+            return False
+        version, future = self._background
+        if version != self.version:
+            future.cancel()
+            self._background = None
+            return False
+        if not wait and not future.done():
+            return False
+        self._background = None
+        order = future.result()
+        dist = self.distances()
+        if tour_length(order, dist) < tour_length(self.order, dist) - 1e-9:
+            self.order = order
+            self._expand()
+            return True
+        return False
+
+    def close(self):
+        """Shut down the background worker, if one was started"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @traced()
+    def add_home(self, h):
+        """
+        Add a home: one Dijkstra from h (the distances to h are already in the
+        trees of the other terminals), cheapest insertion, local improvement.
+
+        Returns:
+            list: The new tour.
+        """
+        if h not in self.G:
+            raise ValueError(f"node {h} is not in the graph")
+        if h in self.H:
+            return self.tour
+        self.collect_background()
+        self.version += 1
+        self.H.append(h)
+        if h not in self.trees:
+            with span('shortest_path_tree'):
+                self.trees[h] = ShortestPathTree(self.G, h, stats=self.stats)
+            self.terminals.append(h)
+
+            dist = self.distances()
+            order = self.order + [0]
+            position = min(range(len(order) - 1),
+                           key=lambda i: dist[order[i]][h] + dist[h][order[i + 1]] - dist[order[i]][order[i + 1]])
+            self.order.insert(position + 1, h)
+            self._reoptimize()
+        if self.stats is not None:
+            self.stats.add('incremental.homes_added')
+        return self._expand()
+
+    @traced()
+    def remove_home(self, h):
+        """
+        Remove a home: cut it out of the order and improve locally.
+
+        Returns:
+            list: The new tour.
+        """
+        if h not in self.H:
+            raise ValueError(f"node {h} is not a home")
+        self.collect_background()
+        self.version += 1
+        self.H.remove(h)
+        if h != 0:
+            del self.trees[h]
+            self.terminals.remove(h)
+            self.order.remove(h)
+            self._reoptimize()
+        if self.stats is not None:
+            self.stats.add('incremental.homes_removed')
+        return self._expand()
+
+    @traced()
+    def update_edges(self, changes):
+        """
+        Apply edge-weight updates and re-optimize the tour.
+
+        Parameters:
+            changes (iterable): (u, v, weight) triples. Weights must stay
+                non-negative and the edges must exist.
+
+        Returns:
+            list: The new tour.
+        """
+        adj = self.G.adj
+        changes = list(changes)
+        # check everything first, so a bad update leaves the instance untouched
+        for u, v, weight in changes:
+            if v not in adj.get(u, {}):
+                raise ValueError(f"edge ({u}, {v}) does not exist")
+            if weight < 0:
+                raise ValueError(f"edge ({u}, {v}) would get a negative weight {weight}")
+        self.collect_background()
+        self.version += 1
+
+        increased, decreased = [], []
+        for u, v, weight in changes:
+            old = adj[u][v]['weight']
+            adj[u][v]['weight'] = weight
+            if u in adj.get(v, {}):
+                adj[v][u]['weight'] = weight
+            if weight > old:
+                increased.append((u, v))
+            elif weight < old:
+                decreased.append((u, v))
+
+        repaired = 0
+        with span('repair'):
+            for tree in self.trees.values():
+                repaired += tree.repair(self.G, increased, decreased)
+        self._reoptimize()
+        if self.stats is not None:
+            self.stats.add('incremental.updates')
+            self.stats.add('incremental.nodes_repaired', repaired)
+        return self._expand()
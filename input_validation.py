@@ -0,0 +1,301 @@
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from utils import *
+from graph_reduction import GraphReduction
+
+
+class CompactInstance:
+    """
+    Compact representation of an input file.
+
+    Attributes:
+        alpha (float): The cost coefficient.
+        number_of_nodes (int): Number of nodes declared in the file.
+        number_of_homes (int): Number of friends declared in the file.
+        H (list): A list of home nodes.
+        adj (dict): adj[u][v] = weight of the edge from u to v,
+            in the same node and edge order as the equivalent nx.DiGraph.
+    """
+
+    __slots__ = ('alpha', 'number_of_nodes', 'number_of_homes', 'H', 'adj')
+
+    def __init__(self, alpha, number_of_nodes, number_of_homes, H, adj):
+        self.alpha = alpha
+        self.number_of_nodes = number_of_nodes
+        self.number_of_homes = number_of_homes
+        self.H = H
+        self.adj = adj
+
+
+def parse_compact_input(file):
+    """
+    Read an input file once and build a CompactInstance from it.
+    Same format and same semantics as `data_parser` + `weighted_edge_list_to_graph`.
+
+    Raises:
+        ValueError, IndexError: When the file cannot be parsed.
+    """
+    with open(file, 'r') as f:
+        lines = [line.split() for line in f]
+    alpha = float(lines[0][0])
+    number_of_nodes = int(lines[1][0])
+    number_of_homes = int(lines[1][1])
+    H = [int(node) for node in lines[2]]
+
+    adj = {}
+    i = 3
+    while i < len(lines):
+        line = lines[i]
+        u, d = int(line[0]), int(line[1])
+        i += 1
+        for _ in range(d):
+            line = lines[i]
+            v, w = int(line[0]), float(line[1])
+            i += 1
+            # nodes only exist through edges, exactly like nx.DiGraph
+            adj.setdefault(u, {})[v] = w
+            adj.setdefault(v, {})
+    return CompactInstance(alpha, number_of_nodes, number_of_homes, H, adj)
+
+
+def expected_limits_from_file_name(file):
+    """
+    Maximum number of nodes and expected alpha encoded in a file name like `20_03.in`.
+    """
+    file_name = os.path.basename(file).split(".")[0].split("_")
+    max_number_of_nodes = int(file_name[0])
+    expected_alpha = float(file_name[1]) / 10
+    return max_number_of_nodes, expected_alpha
+
+
+def is_connected_compact(adj):
+    """Connectivity of the undirected version of the graph, by BFS"""
+    if not adj:
+        return False
+    undirected = {u: set(nbrs) for u, nbrs in adj.items()}
+    for u, nbrs in adj.items():
+        for v in nbrs:
+            undirected[v].add(u)
+    start = next(iter(undirected))
+    seen = {start}
+    stack = [start]
+    while stack:
+        u = stack.pop()
+        for v in undirected[u]:
+            if v not in seen:
+                seen.add(v)
+                stack.append(v)
+    return len(seen) == len(undirected)
+
+
+def is_metric_compact(adj, required=None):
+    """
+    Triangle inequality check equivalent to `is_metric`.
+
+    Instead of Floyd-Warshall, run one Dijkstra per node that stops once it
+    passes the heaviest edge leaving that node: an edge (u, v, w) breaks the
+    triangle inequality iff some path from u to v is shorter than w.
+
+    Parameters:
+        adj (dict): adj[u][v] = weight of the edge from u to v.
+        required (dict): Optional, required[(u, v)] replaces w as the least
+            allowed distance from u to v, see `GraphReduction.required_distances`.
+    """
+    for u, nbrs in adj.items():
+        if not nbrs:
+            continue
+        bounds = nbrs
+        if required is not None:
+            # a bound of 0 or less holds whatever the distance
+            bounds = {v: required[(u, v)] for v in nbrs if required[(u, v)] > 0}
+            if not bounds:
+                continue
+        cutoff = max(bounds.values())
+        dist = {u: 0}
+        heap = [(0, u)]
+        while heap:
+            d, x = heapq.heappop(heap)
+            if d > dist[x] or d > cutoff:
+                continue
+            for y, w in adj[x].items():
+                nd = d + w
+                if nd < dist.get(y, float('inf')):
+                    dist[y] = nd
+                    heapq.heappush(heap, (nd, y))
+        for v, bound in bounds.items():
+            if bound - dist[v] >= 0.001:
+                return False
+    return True
+
+
+def check_input(file):
+    """
+    Validate one input file in a single pass, failing fast.
+
+    Applies the same rules as `is_valid_input`, but the file is read once,
+    all structural checks run on the compact representation, and the
+    expensive connectivity and metric checks are skipped as soon as a
+    cheaper check has failed.
+
+    Parameters:
+        file (str): Path to the input file.
+
+    Returns:
+        dict: A machine-readable report with keys
+            - file (str): Base name of the file.
+            - valid (bool): Whether the input file is valid.
+            - errors (list): Error messages, same wording as `is_valid_input`.
+            - n (int or None), homes (int or None): Declared sizes.
+            - skipped (list): Checks that were not run, either because a cheaper
+              check failed or because the file name does not encode the limits.
+            - seconds (float): Time spent on this file.
+    """
+    start_time = time.perf_counter()
+    report = {'file': os.path.basename(file), 'valid': False, 'errors': [],
+              'n': None, 'homes': None, 'skipped': [], 'seconds': 0.0}
+    errors = report['errors']
+
+    def done():
+        report['valid'] = not errors
+        report['seconds'] = time.perf_counter() - start_time
+        return report
+
+    # the limits are encoded in names like 20_03.in, other names skip those checks
+    try:
+        max_number_of_nodes, expected_alpha = expected_limits_from_file_name(file)
+    except (ValueError, IndexError):
+        max_number_of_nodes = expected_alpha = None
+        report['skipped'].append('file name limits')
+
+    try:
+        instance = parse_compact_input(file)
+    except (ValueError, IndexError, OSError):
+        errors.append('Cannot parse data')
+        report['skipped'] += ['connectivity', 'metric']
+        return done()
+    report['n'] = instance.number_of_nodes
+    report['homes'] = instance.number_of_homes
+
+    alpha = instance.alpha
+    H = instance.H
+    adj = instance.adj
+
+    # --- cheap checks ---
+    if round(alpha, ndigits=MAXIMUM_FLOAT_DIGITS) != alpha:
+        errors.append('maximum float digits exceeded')
+    alpha = round(alpha, ndigits=MAXIMUM_FLOAT_DIGITS)
+    if max_number_of_nodes is not None:
+        if abs(alpha - expected_alpha) >= 1e-5:
+            errors.append('alpha is not as required')
+        if instance.number_of_nodes > max_number_of_nodes:
+            errors.append('maximum number of nodes exceeded')
+        if instance.number_of_homes > int(max_number_of_nodes/2):
+            errors.append('maximum number of friends exceeded')
+    if len(H) != instance.number_of_homes:
+        errors.append('number of friends not correct')
+    if len(set(H)) != len(H):
+        errors.append('friend homes not distinct')
+    if 0 in H:
+        errors.append('0 in H')
+    if len(adj) != instance.number_of_nodes:
+        errors.append('number of nodes not correct')
+    if sorted(adj) != list(range(len(adj))):
+        errors.append('nodes not indexed from 0 to n-1')
+    if any(h not in adj for h in H):
+        errors.append('some home nodes not in the graph')
+
+    for u, v, w in ((u, v, w) for u, nbrs in adj.items() for v, w in nbrs.items()):
+        if u == v:
+            errors.append('edge connecting a node with itself')
+            break
+        if w > MAXIMUM_EDGE_WEIGHT:
+            errors.append('maximum edge weight exceeded')
+            break
+        if w <= 0:
+            errors.append('non-positive edge weight')
+            break
+        if not w.is_integer():
+            errors.append('edge weight not an integer')
+            break
+        if adj[v].get(u) != w:
+            errors.append('edge weights not symmetric')
+            break
+
+    if errors:
+        report['skipped'] += ['connectivity', 'metric']
+        return done()
+
+    # --- expensive checks ---
+    # on the graph without its dead ends and degree-2 chains, which keeps both answers
+    reduction = GraphReduction(adj)
+    if not is_connected_compact(reduction.adj):
+        errors.append('graph is not connected')
+        report['skipped'].append('metric')
+        return done()
+
+    if not is_metric_compact(reduction.adj, reduction.required_distances()):
+        errors.append('graph does not have triangle inequality')
+
+    return done()
+
+
+def check_input_corpus(directory, workers=None, extension='.in', chunksize=16):
+    """
+    Validate every input file under directory in a process pool.
+
+    Parameters:
+        directory (str): Directory holding the input files.
+        workers (int): Number of worker processes, default os.cpu_count().
+        extension (str): Extension of the input files.
+        chunksize (int): Number of files handed to a worker at a time.
+
+    Returns:
+        dict: {'directory', 'total', 'valid', 'invalid', 'seconds', 'files'}
+            where 'files' holds one `check_input` report per file, sorted by name.
+    """
+    start_time = time.perf_counter()
+    files = [os.path.join(directory, file) for file in get_files_with_extension(directory, extension)]
+    if workers == 1 or len(files) <= 1:
+        reports = [check_input(file) for file in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            reports = list(executor.map(check_input, files, chunksize=chunksize))
+    valid_count = sum(1 for report in reports if report['valid'])
+    return {
+        'directory': directory,
+        'total': len(reports),
+        'valid': valid_count,
+        'invalid': len(reports) - valid_count,
+        'seconds': time.perf_counter() - start_time,
+        'files': reports,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate every input file of a directory.")
+    parser.add_argument('directory', nargs='?', default=INPUT_FILE_DIRECTORY,
+                        help="directory holding the .in files (default: %(default)s)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument('-o', '--output', default=None,
+                        help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    corpus_report = check_input_corpus(args.directory, workers=args.workers)
+    data = json.dumps(corpus_report, indent=2)
+    if args.output:
+        write_to_file(args.output, data)
+        print(f"Checked {corpus_report['total']} files, {corpus_report['valid']} valid, "
+              f"report written to {args.output}")
+    else:
+        print(data)
+    return 0 if corpus_report['invalid'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import os
+import sys
+import math
+import time
+import heapq
+import random
+import argparse
+from utils import *
+
+DEGREE_DISTRIBUTIONS = ('uniform', 'powerlaw', 'local')
+WEIGHT_MODELS = ('geometric', 'closure')
+
+# Points live on an integer grid small enough that the longest possible
+# edge, the diagonal, stays below MAXIMUM_EDGE_WEIGHT.
+GRID_SIZE = int(MAXIMUM_EDGE_WEIGHT / math.sqrt(2)) - 1
+
+
+def ceil_distance(p, q):
+    """
+    Euclidean distance rounded up, computed exactly on integer points.
+
+    Rounding up keeps the triangle inequality:
+    ceil(a) + ceil(b) >= a + b >= c, and the left side is an integer, so it is >= ceil(c).
+    The max with 1 keeps weights positive for coincident points.
+    """
+    s = (p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2
+    return max(1, math.isqrt(s - 1) + 1) if s > 0 else 1
+
+
+class _DisjointSet:
+    """Union-find used to stitch the random graph into one component"""
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, x, y):
+        x, y = self.find(x), self.find(y)
+        if x == y:
+            return False
+        self.parent[y] = x
+        return True
+
+
+def _uniform_edges(n, avg_degree, rng):
+    """Random pairs, Poisson-like degrees"""
+    m = int(n * avg_degree / 2)
+    edges = set()
+    attempts = 0
+    while len(edges) < m and attempts < 4 * m:
+        u, v = rng.randrange(n), rng.randrange(n)
+        attempts += 1
+        if u != v:
+            edges.add((u, v) if u < v else (v, u))
+    return edges
+
+
+def _powerlaw_edges(n, avg_degree, rng):
+    """Preferential attachment, heavy-tailed degrees"""
+    k = max(1, int(round(avg_degree / 2)))
+    edges = set()
+    # every endpoint appears once per incident edge, so sampling from it is degree-proportional
+    endpoints = []
+    for u in range(1, n):
+        for _ in range(min(k, u)):
+            v = rng.choice(endpoints) if endpoints and rng.random() < 0.9 else rng.randrange(u)
+            if v != u and (v, u) not in edges:
+                edges.add((v, u))
+                endpoints.append(u)
+                endpoints.append(v)
+    return edges
+
+
+def _local_edges(n, avg_degree, points, rng):
+    """Each node linked to its nearest points, road-network-like degrees"""
+    k = max(1, int(round(avg_degree / 2)))
+    # bucket points so that a 3x3 block of cells holds a few dozen points
+    cells_per_side = max(1, int(math.sqrt(n / 4)))
+    cell = GRID_SIZE / cells_per_side + 1
+    grid = {}
+    for i, (x, y) in enumerate(points):
+        grid.setdefault((int(x / cell), int(y / cell)), []).append(i)
+
+    edges = set()
+    for i, (x, y) in enumerate(points):
+        cx, cy = int(x / cell), int(y / cell)
+        candidates = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in grid.get((cx + dx, cy + dy), ()):
+                    if j != i:
+                        px, py = points[j]
+                        candidates.append(((px - x) ** 2 + (py - y) ** 2, j))
+        for _, j in heapq.nsmallest(k, candidates):
+            edges.add((i, j) if i < j else (j, i))
+    return edges
+
+
+def _closure_weights(n, edges, rng, max_weight):
+    """
+    Random integer weights that are their own shortest-path closure.
+
+    Every node gets a random potential p and every edge (u, v) the weight
+    b + |p[u] - p[v]| with b random in [low, 2 * low]. A path of two or more
+    edges around (u, v) is at least 2 * low + |p[u] - p[v]| long, never shorter
+    than the edge, so the graph is metric by construction. Linear time, where
+    closing random weights with one Dijkstra per node is close to quadratic on
+    graphs with hubs.
+    """
+    low = max(1, max_weight // 8)
+    high = min(2 * low, max_weight)
+    potential = [rng.randint(0, max_weight - high) for _ in range(n)]
+    return {(u, v): rng.randint(low, high) + abs(potential[u] - potential[v]) for u, v in sorted(edges)}
+
+
+def generate_instance(n, num_homes, alpha, degree='local', avg_degree=4, weights='geometric',
+                      max_weight=1000, seed=None):
+    """
+    Generate a random connected metric instance of the PTP problem.
+
+    Parameters:
+        n (int): Number of nodes, indexed from 0 to n-1.
+        num_homes (int): Number of friends |H|, at most n // 2.
+        alpha (float): The cost coefficient.
+        degree (str): Degree distribution of the road graph, one of
+            'uniform' (random pairs), 'powerlaw' (preferential attachment)
+            or 'local' (nearest neighbors in the plane).
+        avg_degree (float): Target average degree before the graph is connected up.
+        weights (str): 'geometric' for rounded-up Euclidean lengths of random
+            points, or 'closure' for random weights up to max_weight that
+            satisfy the triangle inequality by construction (see `_closure_weights`).
+        max_weight (int): Largest random weight of the 'closure' model.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        tuple: A tuple containing:
+            - H (list): A list of home nodes.
+            - adj (list): adj[u] is a dict {v: weight} of the neighbors of u.
+
+    Notes:
+        Both weight models give integer, symmetric, positive weights that satisfy
+        the triangle inequality, so the result passes `is_valid_input` once written
+        under a matching file name (see `instance_file_name`).
+    """
+    if degree not in DEGREE_DISTRIBUTIONS:
+        raise ValueError(f"degree must be one of {DEGREE_DISTRIBUTIONS}")
+    if weights not in WEIGHT_MODELS:
+        raise ValueError(f"weights must be one of {WEIGHT_MODELS}")
+    if n < 2:
+        raise ValueError("n must be at least 2")
+    if not 0 <= num_homes <= n // 2:
+        raise ValueError("num_homes must be between 0 and n // 2")
+    if weights == 'closure' and not 1 <= max_weight <= MAXIMUM_EDGE_WEIGHT:
+        raise ValueError(f"max_weight must be between 1 and {MAXIMUM_EDGE_WEIGHT}")
+
+    rng = random.Random(seed)
+    points = [(rng.randint(0, GRID_SIZE), rng.randint(0, GRID_SIZE)) for _ in range(n)]
+
+    if degree == 'uniform':
+        edges = _uniform_edges(n, avg_degree, rng)
+    elif degree == 'powerlaw':
+        edges = _powerlaw_edges(n, avg_degree, rng)
+    else:
+        edges = _local_edges(n, avg_degree, points, rng)
+
+    # connect the components, joining each one to a random node already connected
+    components = _DisjointSet(n)
+    for u, v in edges:
+        components.union(u, v)
+    roots = {}
+    for u in range(n):
+        roots.setdefault(components.find(u), u)
+    representatives = list(roots.values())
+    rng.shuffle(representatives)
+    connected = [representatives[0]]
+    for u in representatives[1:]:
+        v = rng.choice(connected)
+        edges.add((u, v) if u < v else (v, u))
+        connected.append(u)
+
+    if weights == 'geometric':
+        weighted = {(u, v): ceil_distance(points[u], points[v]) for u, v in edges}
+    else:
+        weighted = _closure_weights(n, edges, rng, max_weight)
+
+    adj = [dict() for _ in range(n)]
+    for (u, v), w in weighted.items():
+        adj[u][v] = w
+        adj[v][u] = w
+
+    H = sorted(rng.sample(range(1, n), num_homes))
+    return H, adj
+
+
+def instance_file_name(n, alpha, tag=None):
+    """
+    File name accepted by `is_valid_input`: <n>_<10 alpha>[_tag].in
+    """
+    alpha_code = round(alpha * 10)
+    if abs(alpha_code - alpha * 10) >= 1e-9:
+        raise ValueError("alpha must be a multiple of 0.1 to be encoded in the file name")
+    name = f"{n}_{alpha_code:02d}"
+    if tag is not None:
+        name += f"_{tag}"
+    return name + '.in'
+
+
+def write_instance(file, alpha, H, adj):
+    """
+    Write an instance in the input file format.
+    """
+    data = [str(alpha), f"{len(adj)} {len(H)}", ' '.join(str(h) for h in H)]
+    for u, nbrs in enumerate(adj):
+        data.append(f"{u} {len(nbrs)}")
+        data.extend(f"{v} {w}" for v, w in nbrs.items())
+    write_to_file(file, '\n'.join(data) + '\n')
+
+
+def generate_ladder(out_dir, sizes, num_homes, alpha, seed=0, **kwargs):
+    """
+    Generate one instance per size, for scaling tests.
+
+    Parameters:
+        out_dir (str): Output directory, created if missing.
+        sizes (list): Values of n.
+        num_homes (int or float): |H| for every instance, or the fraction of n
+            when it is a float below 1. Capped at n // 2.
+        alpha (float): The cost coefficient, a multiple of 0.1.
+        seed (int): Base seed, instance i uses seed + i.
+        kwargs: Passed on to `generate_instance`.
+
+    Returns:
+        list: Paths of the generated files.
+    """
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    files = []
+    for i, n in enumerate(sizes):
+        homes = int(num_homes * n) if isinstance(num_homes, float) and num_homes < 1 else int(num_homes)
+        homes = min(homes, n // 2)
+        H, adj = generate_instance(n, homes, alpha, seed=seed + i, **kwargs)
+        file = os.path.join(out_dir, instance_file_name(n, alpha, tag=f"h{homes}_s{seed + i}"))
+        write_instance(file, alpha, H, adj)
+        files.append(file)
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate random metric PTP instances.")
+    parser.add_argument('-n', '--sizes', type=int, nargs='+', default=[50, 100, 1000, 10000, 100000],
+                        help="numbers of nodes (default: %(default)s)")
+    parser.add_argument('--homes', type=float, default=20,
+                        help="|H| per instance, or a fraction of n when below 1 (default: %(default)s)")
+    parser.add_argument('--alpha', type=float, default=0.3, help="cost coefficient (default: %(default)s)")
+    parser.add_argument('--degree', choices=DEGREE_DISTRIBUTIONS, default='local',
+                        help="degree distribution (default: %(default)s)")
+    parser.add_argument('--avg-degree', type=float, default=4, help="average degree (default: %(default)s)")
+    parser.add_argument('--weights', choices=WEIGHT_MODELS, default='geometric',
+                        help="metric weight model (default: %(default)s)")
+    parser.add_argument('--max-weight', type=int, default=1000,
+                        help="largest random weight of the closure model (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="base random seed (default: %(default)s)")
+    parser.add_argument('-o', '--out-dir', default='generated', help="output directory (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    num_homes = args.homes if args.homes < 1 else int(args.homes)
+    start_time = time.time()
+    files = generate_ladder(args.out_dir, args.sizes, num_homes, args.alpha, seed=args.seed,
+                            degree=args.degree, avg_degree=args.avg_degree, weights=args.weights,
+                            max_weight=args.max_weight)
+    for file in files:
+        print(file)
+    print(f"Generated {len(files)} instances in {time.time() - start_time:.2f} seconds")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
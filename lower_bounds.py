@@ -0,0 +1,271 @@
+"""
+Lower bounds on the optimal cost, for optimality-gap reporting and early stopping.
+
+PHP reduces to M-TSP over the terminals T = H ∪ {0} on shortest-path
+distances (see php_from_tsp), whose optimal tour is at least:
+    - mst: the weight of a minimum spanning tree of T;
+    - one_tree: a spanning tree of T - {0} plus the two cheapest edges at 0;
+    - held_karp: the 1-tree bound with Lagrangian node penalties, raised by
+      subgradient ascent (Held and Karp). The best of the three, usually
+      within a few percent of the optimum;
+    - assignment: the cheapest assignment of a successor to every terminal.
+PTP has no tour to relax, see `ptp_lower_bound`.
+
+All bounds assume symmetric distances, like the graphs of this project.
+
+Examples:
+    bounds = php_lower_bounds(terminals, dist)
+    print(bounds['lower'], gap(tour_length, bounds['lower']))
+"""
+
+from profiling import traced
+
+INF = float('inf')
+
+# The assignment bound is O(|T|^3) and rarely the best, it is skipped above this
+ASSIGNMENT_LIMIT = 80
+
+
+def gap(upper, lower):
+    """Relative optimality gap (upper - lower) / upper, 0 when both are 0"""
+    if upper <= 0:
+        return 0.0
+    return max(0.0, (upper - lower) / upper)
+
+
+def _spanning_tree(nodes, dist, penalty=None):
+    """
+    Prim's algorithm on the complete graph over nodes, O(|nodes|^2).
+    With penalties, the edge (u, v) weighs dist[u][v] + penalty[u] + penalty[v].
+
+    Returns:
+        tuple: (weight, degree) where degree[u] is the degree of u in the tree.
+    """
+    if not nodes:
+        return 0, {}
+    penalty = penalty or {}
+    root = nodes[0]
+    degree = {u: 0 for u in nodes}
+    best = {v: (dist[root][v] + penalty.get(root, 0) + penalty.get(v, 0), root) for v in nodes[1:]}
+    weight = 0
+    while best:
+        v = min(best, key=lambda u: best[u][0])
+        w, u = best.pop(v)
+        weight += w
+        degree[u] += 1
+        degree[v] += 1
+        pv = penalty.get(v, 0)
+        for x, (wx, _) in best.items():
+            d = dist[v][x] + pv + penalty.get(x, 0)
+            if d < wx:
+                best[x] = (d, v)
+    return weight, degree
+
+
+def mst_bound(terminals, dist):
+    return _spanning_tree(list(terminals), dist)[0]
+
+
+def _one_tree(terminals, dist, penalty=None):
+    """Weight and degrees of the minimum 1-tree, node terminals[0] being the special node"""
+    special, rest = terminals[0], list(terminals[1:])
+    penalty = penalty or {}
+    weight, degree = _spanning_tree(rest, dist, penalty)
+    edges = sorted((dist[special][v] + penalty.get(special, 0) + penalty.get(v, 0), v) for v in rest)[:2]
+    degree[special] = len(edges)
+    for w, v in edges:
+        weight += w
+        degree[v] += 1
+    return weight, degree
+
+
+def one_tree_bound(terminals, dist):
+    terminals = list(terminals)
+    if len(terminals) < 3:
+        return _small_tour(terminals, dist)
+    return _one_tree(terminals, dist)[0]
+
+
+def held_karp_bound(terminals, dist, iterations=100, upper=None):
+    """
+    Held-Karp bound: max over penalties p of 1-tree(p) - 2 * sum(p),
+    approximated by subgradient ascent.
+
+    Parameters:
+        upper (float): Length of a known tour, to size the steps. By default
+            twice the MST, which is always a tour length.
+    """
+    terminals = list(terminals)
+    if len(terminals) < 3:
+        return _small_tour(terminals, dist)
+    if upper is None:
+        upper = 2 * mst_bound(terminals, dist)
+    penalty = {u: 0.0 for u in terminals}
+    best, step_scale, stall = -INF, 2.0, 0
+    for _ in range(iterations):
+        weight, degree = _one_tree(terminals, dist, penalty)
+        value = weight - 2 * sum(penalty.values())
+        if value > best + 1e-9:
+            best, stall = value, 0
+        else:
+            stall += 1
+            if stall >= 10:
+                step_scale, stall = step_scale / 2, 0
+        subgradient = {u: degree[u] - 2 for u in terminals}
+        norm = sum(g * g for g in subgradient.values())
+        # every degree is 2: the 1-tree is a tour, and optimal
+        if norm == 0 or step_scale < 1e-4:
+            break
+        step = step_scale * max(upper - value, 0) / norm
+        if step == 0:
+            break
+        for u, g in subgradient.items():
+            penalty[u] += step * g
+    return best
+
+
+def assignment_bound(terminals, dist):
+    """
+    Cheapest assignment of a successor to every terminal, no terminal being its
+    own successor: every tour is such an assignment. Hungarian algorithm, O(|T|^3).
+    """
+    terminals = list(terminals)
+    n = len(terminals)
+    if n < 3:
+        return _small_tour(terminals, dist)
+    big = 1 + 2 * sum(max(dist[u][v] for v in terminals) for u in terminals)
+
+    def cost(i, j):
+        return big if i == j else dist[terminals[i]][terminals[j]]
+
+    # potentials u (rows) and v (columns), match[j] = row of column j, 1-indexed
+    u, v = [0.0] * (n + 1), [0.0] * (n + 1)
+    match, way = [0] * (n + 1), [0] * (n + 1)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [INF] * (n + 1)
+        used = [False] * (n + 1)
+        while match[j0] != 0:
+            used[j0] = True
+            i0, delta, j1 = match[j0], INF, 0
+            for j in range(1, n + 1):
+                if not used[j]:
+                    c = cost(i0 - 1, j - 1) - u[i0] - v[j]
+                    if c < minv[j]:
+                        minv[j], way[j] = c, j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(n + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    return sum(cost(match[j] - 1, j - 1) for j in range(1, n + 1))
+
+
+def _small_tour(terminals, dist):
+    """The only tour of at most two terminals"""
+    if len(terminals) < 2:
+        return 0
+    a, b = terminals[:2]
+    return dist[a][b] + dist[b][a]
+
+
+@traced()
+def php_lower_bounds(terminals, dist, upper=None):
+    """
+    Every PHP bound of the tour over terminals, depot first.
+
+    Parameters:
+        terminals (list): [0] + H.
+        dist (dict): dist[u][v] = shortest distance between terminals u and v.
+        upper (float): Length of a known tour, helps the Held-Karp steps.
+
+    Returns:
+        dict: Driving distance bounds by name, and 'lower', the best of them.
+    """
+    terminals = list(dict.fromkeys(terminals))
+    bounds = {
+        'mst': mst_bound(terminals, dist),
+        'one_tree': one_tree_bound(terminals, dist),
+        'held_karp': held_karp_bound(terminals, dist, upper=upper),
+    }
+    if len(terminals) <= ASSIGNMENT_LIMIT:
+        bounds['assignment'] = assignment_bound(terminals, dist)
+    bounds['lower'] = max(bounds.values())
+    return bounds
+
+
+@traced()
+def ptp_lower_bound(dist, options, alpha):
+    """
+    Lower bound on the PTP cost: alpha * driving + walking.
+
+    Two bounds, the best is returned:
+        - radius: whatever the stops, the car drives at least to the farthest
+          one and back. For a radius R, friends can only use stops within R
+          of the depot, so the cost is at least 2 * alpha * R plus every
+          friend's cheapest walk to such a stop; minimized over R.
+        - cluster tree: the route visits one stop of every friend who cannot
+          walk to the depot, so it is at least a spanning tree over these
+          friends and the depot, where two friends are as far apart as
+          their closest pair of stops.
+
+    Parameters:
+        dist (dict): dist[u][v] between the depot and every candidate stop.
+        options (dict): Pick-up options of every friend, see `pickup_options`.
+        alpha (float): The cost coefficient of driving.
+    """
+    if not options:
+        return 0
+    radii = sorted({0} | {dist[0][s] for stops in options.values() for s in stops})
+    radius_bound = INF
+    for radius in radii:
+        if 2 * alpha * radius >= radius_bound:
+            break
+        walking = 0
+        for h, stops in options.items():
+            walking += min((dist[s][h] for s in stops if s == 0 or dist[0][s] <= radius), default=INF)
+        radius_bound = min(radius_bound, 2 * alpha * radius + walking)
+
+    # clusters: the depot, then the stops of every friend who needs the car
+    clusters = [[0]] + [stops for stops in options.values() if 0 not in stops]
+    cluster_dist = {i: {j: min(dist[s][t] for s in a for t in b) if i != j else 0
+                        for j, b in enumerate(clusters)}
+                    for i, a in enumerate(clusters)}
+    tree_bound = alpha * _spanning_tree(list(range(len(clusters))), cluster_dist)[0]
+    return max(radius_bound, tree_bound)
+
+
+def instance_lower_bound(G, H, alpha, problem, stats=None):
+    """
+    Lower bound on the optimal cost of an instance, in the units of
+    `analyze_solution`: driving cost (alpha * distance) plus walking cost.
+
+    Parameters:
+        problem (str): 'php' or 'ptp'.
+        stats (SolverStats): Optional, receives the Dijkstra counters.
+
+    Returns:
+        float: The lower bound.
+    """
+    from shortest_paths import shortest_paths_from_terminals
+    if problem == 'php':
+        terminals = [0] + [h for h in dict.fromkeys(H) if h != 0]
+        all_shortest_paths = shortest_paths_from_terminals(G, terminals, stats=stats)
+        dist = {u: all_shortest_paths[u][0] for u in terminals}
+        return alpha * php_lower_bounds(terminals, dist)['lower']
+    if problem == 'ptp':
+        from ptp_solver import pickup_options
+        options = pickup_options(G, H)
+        stops = [0] + sorted({s for stops in options.values() for s in stops} - {0})
+        all_shortest_paths = shortest_paths_from_terminals(G, stops, stats=stats)
+        return ptp_lower_bound({u: all_shortest_paths[u][0] for u in stops}, options, alpha)
+    raise ValueError(f"unknown problem {problem}")
@@ -0,0 +1,220 @@
+import os
+import sys
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# The tracker receiving checkpoints, None while memory accounting is disabled
+_active = None
+
+MiB = 1 << 20
+
+
+def estimate_dp_memory(num_homes):
+    """
+    Predicted peak bytes of the mtsp_dp tables for |H| = num_homes.
+
+    mtsp_dp works on n = |H| + 1 nodes and keeps two tables (dp and parent)
+    of 2^n lists of n entries, i.e. 56 + 8n bytes per list, plus one float
+    object per reached state. Measured peaks are within about 10% below it.
+    """
+    n = num_homes + 1
+    lists = 2 * (1 << n) * (56 + 8 * n)
+    floats = (1 << (n - 1)) * n * 12
+    return lists + floats
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """Raised before a solve whose predicted memory is over the budget"""
+
+    def __init__(self, estimate, budget):
+        super().__init__(f"predicted DP memory {estimate / MiB:.2f} MiB is over the "
+                         f"budget of {budget / MiB:.2f} MiB")
+        self.estimate = estimate
+        self.budget = budget
+
+
+def preflight(num_homes, budget=None, over_budget='refuse'):
+    """
+    Decide how to solve an instance given a memory budget in bytes.
+
+    Parameters:
+        num_homes (int): |H| of the instance.
+        budget (int): Memory budget for the DP tables, None for no budget.
+        over_budget (str): 'refuse' raises MemoryBudgetExceeded when the
+            estimate is over the budget, 'downgrade' returns 'heuristic'.
+
+    Returns:
+        str: 'exact' when mtsp_dp fits the budget, otherwise 'heuristic'.
+    """
+    if budget is None:
+        return 'exact'
+    estimate = estimate_dp_memory(num_homes)
+    if estimate <= budget:
+        return 'exact'
+    if over_budget == 'downgrade':
+        return 'heuristic'
+    raise MemoryBudgetExceeded(estimate, budget)
+
+
+def available_memory():
+    """Memory the system can give without swapping, in bytes (MemAvailable), None if unknown"""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS of this process. Returns whether it worked (Linux only)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, None if unknown"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+class MemoryTracker:
+    """
+    Memory accounting for one unit of work, typically one instance.
+
+    Peak RSS is always measured. With trace=True, allocations are traced
+    with tracemalloc as well, giving the peak of traced allocations and the
+    largest allocating call sites at the highest checkpoint. Tracing makes
+    pure Python loops such as mtsp_dp many times slower, so it is opt-in.
+
+    Examples:
+        with track_memory(trace=True) as tracker:
+            tour = php_solver_from_tsp(G, H)
+        print(tracker.format())
+    """
+
+    def __init__(self, trace=False, top=5):
+        self.trace = trace
+        self.top = top
+        self.rss_reset = False
+        self.peak_rss = None
+        self.peak_traced = None
+        self.peak_checkpoint = None
+        self._checkpoint_bytes = -1
+        self._snapshot = None
+        self._started_tracing = False
+
+    def start(self):
+        self.rss_reset = _reset_peak_rss()
+        if self.trace:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+
+    def checkpoint(self, label):
+        if not self.trace:
+            return
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self._checkpoint_bytes:
+            self._checkpoint_bytes = current
+            self.peak_checkpoint = label
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def stop(self):
+        if self.trace and tracemalloc.is_tracing():
+            _, self.peak_traced = tracemalloc.get_traced_memory()
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        self.peak_rss = peak_rss()
+
+    def top_sites(self):
+        """The largest allocating call sites at the highest checkpoint, as (site, bytes, count)"""
+        if self._snapshot is None:
+            return []
+        snapshot = self._snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        sites = []
+        for stat in snapshot.statistics('lineno')[:self.top]:
+            frame = stat.traceback[0]
+            sites.append((f"{os.path.basename(frame.filename)}:{frame.lineno}", stat.size, stat.count))
+        return sites
+
+    def to_dict(self):
+        return {
+            'peak_rss': self.peak_rss,
+            'rss_since_start': self.rss_reset,
+            'peak_traced': self.peak_traced,
+            'peak_checkpoint': self.peak_checkpoint,
+            'top_sites': [{'site': site, 'bytes': size, 'count': count}
+                          for site, size, count in self.top_sites()],
+        }
+
+    def format(self):
+        parts = []
+        if self.peak_traced is not None:
+            parts.append(f"{self.peak_traced / MiB:.2f} MiB traced")
+        if self.peak_rss is not None:
+            parts.append(f"{self.peak_rss / MiB:.2f} MiB RSS"
+                         + ("" if self.rss_reset else " (process lifetime)"))
+        lines = [f"Peak memory: {', '.join(parts) or 'unknown'}"]
+        sites = self.top_sites()
+        if sites:
+            lines.append(f"Largest allocations at {self.peak_checkpoint}:")
+            lines += [f"  {site}: {size / MiB:.2f} MiB in {count} blocks" for site, size, count in sites]
+        return '\n'.join(lines)
+
+
+def checkpoint(label):
+    """
+    Mark a point where memory use is likely at its peak, e.g. right after
+    the DP tables are filled. The tracker keeps the allocation snapshot of
+    the highest checkpoint. Costs a global lookup when accounting is disabled.
+    """
+    tracker = _active
+    if tracker is not None:
+        tracker.checkpoint(label)
+
+
+@contextmanager
+def track_memory(trace=False, tracker=None):
+    """
+    Enable memory accounting for the enclosed block.
+
+    Yields:
+        MemoryTracker: The tracker, stopped on exit.
+    """
+    global _active
+    tracker = tracker or MemoryTracker(trace=trace)
+    previous = _active
+    _active = tracker
+    tracker.start()
+    try:
+        yield tracker
+    finally:
+        _active = previous
+        tracker.stop()
@@ -1,8 +1,56 @@
 import networkx as nx
 from mtsp_dp import mtsp_dp
+from shortest_paths import shortest_paths_from_terminals
 from student_utils import *
+from profiling import span, traced
+from memory_accounting import checkpoint
+from graph_reduction import GraphReduction
 
-def php_solver_from_tsp(G, H):
+def build_reduced_graph(all_shortest_paths, nodes_prime):
+    """
+    Complete graph G' on nodes_prime with shortest path distances as edge weights.
+    The reduced graph uses indices 0 to len(nodes_prime)-1.
+    """
+    reduced_graph = nx.DiGraph()
+    reduced_graph.add_nodes_from(range(len(nodes_prime)))
+    
+    for i, u in enumerate(nodes_prime):
+        for j, v in enumerate(nodes_prime):
+            if i != j:
+                # Get shortest path distance from u to v in original graph G
+                # all_shortest_paths[u][0] is the distance dictionary from u
+                distance = all_shortest_paths[u][0][v]
+                reduced_graph.add_edge(i, j, weight=distance)
+    return reduced_graph
+
+
+def expand_tour(tsp_tour, all_shortest_paths):
+    """
+    Expand a tour over terminals to a tour in the original graph.
+
+    For each consecutive pair of nodes in the TSP tour, replace the edge
+    with the actual shortest path in the original graph.
+    """
+    tour = []
+    for i in range(len(tsp_tour) - 1):
+        u = tsp_tour[i]
+        v = tsp_tour[i + 1]
+        
+        # Get the shortest path from u to v in original graph G
+        # all_shortest_paths[u][1] is the path dictionary from u
+        path = all_shortest_paths[u][1][v]
+        
+        # Add all nodes in the path except the last one (to avoid duplication)
+        # The last node will be added as the first node of the next path
+        tour.extend(path[:-1])
+    
+    # Add the final node (which should be 0 to complete the cycle)
+    tour.append(tsp_tour[-1])
+    return tour
+
+
+@traced()
+def php_solver_from_tsp(G, H, stats=None, tsp_solver=None, preprocess=True):
     """
     PHP solver via reduction to Euclidean TSP.
 
@@ -10,6 +58,13 @@ def php_solver_from_tsp(G, H):
         G (nx.Graph): A NetworkX graph representing the city.
             This directed graph is equivalent to an undirected one by construction.
         H (list): A list of home nodes that must be visited.
+        stats (SolverStats): Optional, receives the Dijkstra and mtsp_dp work counters.
+        tsp_solver (callable): Solves M-TSP on the reduced graph, mtsp_dp by default.
+            tsp_heuristics.heuristic_tsp needs far less memory but is not exact,
+            see memory_accounting.preflight. cluster_tsp.cluster_tsp scales to
+            hundreds of homes, where heuristic_tsp slows down.
+        preprocess (bool): Run the shortest paths on G without its non-terminal
+            dead ends and degree-2 chains, see graph_reduction.
 
     Returns:
         list: A list of nodes traversed by your car (the computed tour).
@@ -35,54 +90,42 @@ def php_solver_from_tsp(G, H):
     """
     
     # Step 1: Construct complete graph G' with nodes V' = H ∪ {0}
-    # Compute all-pairs shortest paths in G using Dijkstra's algorithm
-    # all_shortest_paths[u] = (distances_dict, paths_dict)
-    # where distances_dict[v] = shortest distance from u to v
-    # and paths_dict[v] = shortest path from u to v as a list of nodes
-    all_shortest_paths = dict(nx.all_pairs_dijkstra(G))
-    
     # Create node set for reduced graph: H union {0}
     # This ensures node 0 is always first in the list
     nodes_prime = [0] + list(H)
     
-    # Build complete graph G' with shortest path distances as edge weights
-    # The reduced graph uses indices 0 to len(nodes_prime)-1
-    reduced_graph = nx.DiGraph()
-    reduced_graph.add_nodes_from(range(len(nodes_prime)))
+    # Dead ends and chains without homes only stretch the shortest path search
+    graph, reduction = G, None
+    if preprocess:
+        with span('preprocess'):
+            reduction = GraphReduction.from_graph(G, nodes_prime, stats=stats)
+            # building the smaller graph only pays off when a good part of G goes away
+            if reduction.pruned + reduction.contracted >= G.number_of_nodes() // 4:
+                graph = reduction.graph()
+            else:
+                reduction = None
     
-    for i, u in enumerate(nodes_prime):
-        for j, v in enumerate(nodes_prime):
-            if i != j:
-                # Get shortest path distance from u to v in original graph G
-                # all_shortest_paths[u][0] is the distance dictionary from u
-                distance = all_shortest_paths[u][0][v]
-                reduced_graph.add_edge(i, j, weight=distance)
+    # Shortest paths are only needed between the nodes of G',
+    # so Dijkstra runs from each of them and stops once all of them are settled
+    with span('shortest_paths'):
+        all_shortest_paths = shortest_paths_from_terminals(graph, nodes_prime, stats=stats)
+    checkpoint('php.shortest_paths')
+    
+    with span('reduction'):
+        reduced_graph = build_reduced_graph(all_shortest_paths, nodes_prime)
     
     # Step 2: Solve M-TSP on reduced graph G' using dynamic programming
     # This returns a tour in terms of indices (0 to len(nodes_prime)-1)
-    tsp_tour_indices = mtsp_dp(reduced_graph)
+    tsp_tour_indices = (tsp_solver or mtsp_dp)(reduced_graph, stats=stats)
     
     # Convert indices back to original node labels
     tsp_tour = [nodes_prime[i] for i in tsp_tour_indices]
     
     # Step 3: Expand the TSP tour to include intermediate nodes from shortest paths
-    # For each consecutive pair of nodes in the TSP tour, replace the edge
-    # with the actual shortest path in the original graph
-    tour = []
-    for i in range(len(tsp_tour) - 1):
-        u = tsp_tour[i]
-        v = tsp_tour[i + 1]
-        
-        # Get the shortest path from u to v in original graph G
-        # all_shortest_paths[u][1] is the path dictionary from u
-        path = all_shortest_paths[u][1][v]
-        
-        # Add all nodes in the path except the last one (to avoid duplication)
-        # The last node will be added as the first node of the next path
-        tour.extend(path[:-1])
-    
-    # Add the final node (which should be 0 to complete the cycle)
-    tour.append(tsp_tour[-1])
+    with span('expansion'):
+        tour = expand_tour(tsp_tour, all_shortest_paths)
+        if reduction is not None:
+            tour = reduction.expand(tour)
     
     return tour
 
@@ -0,0 +1,207 @@
+import json
+import time
+import functools
+from contextlib import contextmanager
+
+# The profiler receiving spans, None while profiling is disabled
+_active = None
+
+
+class _NullSpan:
+    """Shared do-nothing span returned while profiling is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    A named, timed section of code, with the spans opened inside it as children.
+    Times come from time.perf_counter, a monotonic clock.
+    """
+
+    __slots__ = ('name', 'start', 'end', 'children')
+
+    def __init__(self, name, start=None):
+        self.name = name
+        self.start = time.perf_counter() if start is None else start
+        self.end = None
+        self.children = []
+
+    @property
+    def duration(self):
+        end = time.perf_counter() if self.end is None else self.end
+        return end - self.start
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'seconds': self.duration,
+            'children': [child.to_dict() for child in self.children],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a span tree from `to_dict`, e.g. one sent back by a worker process"""
+        span = cls(data['name'], start=0.0)
+        span.end = data['seconds']
+        span.children = [cls.from_dict(child) for child in data['children']]
+        return span
+
+
+class _SpanContext:
+    __slots__ = ('profiler', 'name', 'span')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler._stack
+        self.span = Span(self.name)
+        stack[-1].children.append(self.span)
+        stack.append(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.span.end = time.perf_counter()
+        self.profiler._stack.pop()
+        return False
+
+
+class Profiler:
+    """
+    Collects nested spans for one unit of work, typically one instance.
+
+    Examples:
+        with profile() as profiler:
+            G, H, alpha = input_file_to_instance(file)
+            tour = php_solver_from_tsp(G, H)
+        print(profiler.format())
+        data = profiler.to_json()
+    """
+
+    def __init__(self, name='total'):
+        self.root = Span(name)
+        self._stack = [self.root]
+
+    def span(self, name):
+        return _SpanContext(self, name)
+
+    def stop(self):
+        if self.root.end is None:
+            self.root.end = time.perf_counter()
+
+    def totals(self):
+        """
+        Total seconds per span path, e.g. {'php_solver_from_tsp/mtsp_dp': 0.5}.
+        Spans with the same path are added up.
+        """
+        totals = {}
+
+        def visit(span, prefix):
+            for child in span.children:
+                path = prefix + child.name
+                totals[path] = totals.get(path, 0.0) + child.duration
+                visit(child, path + '/')
+
+        visit(self.root, '')
+        return totals
+
+    def to_dict(self):
+        return self.root.to_dict()
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def format(self, min_fraction=0.0):
+        """
+        Indented time breakdown, one line per span.
+        Spans under min_fraction of the total are left out.
+        """
+        total = self.root.duration or 1e-12
+        lines = [f"{self.root.name}: {self.root.duration:.5f} seconds"]
+
+        def visit(span, depth):
+            for child in span.children:
+                if child.duration / total < min_fraction:
+                    continue
+                lines.append(f"{'  ' * depth}{child.name}: {child.duration:.5f} s "
+                             f"({100 * child.duration / total:.1f}%)")
+                visit(child, depth + 1)
+
+        visit(self.root, 1)
+        return '\n'.join(lines)
+
+
+def span(name):
+    """
+    Time the enclosed block as a span of the active profiler.
+
+        with span('mtsp_dp.fill'):
+            ...
+
+    Costs a global lookup when profiling is disabled.
+    """
+    profiler = _active
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(name)
+
+
+def traced(name=None):
+    """Decorator timing every call of a function as a span"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def attach(span_dict):
+    """
+    Add a finished span tree (see `Span.to_dict`) under the currently open
+    span of the active profiler. Used to keep the spans of a worker process.
+    """
+    profiler = _active
+    if profiler is not None:
+        profiler._stack[-1].children.append(Span.from_dict(span_dict))
+
+
+def active_profiler():
+    """The profiler receiving spans, or None"""
+    return _active
+
+
+@contextmanager
+def profile(profiler=None):
+    """
+    Enable profiling for the enclosed block.
+
+    Yields:
+        Profiler: The profiler collecting the spans, stopped on exit.
+    """
+    global _active
+    profiler = profiler or Profiler()
+    previous = _active
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+        profiler.stop()
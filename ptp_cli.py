@@ -1,15 +1,21 @@
 import os
 import time
 import re
+import json
 from utils import *
 from student_utils import *
-from php_from_tsp import php_solver_from_tsp 
-from ptp_solver import ptp_solver
+from profiling import profile
+from memory_accounting import MiB, track_memory
+from supervisor import SupervisedSolve, SolveTimeout, WorkerCrashed, run_supervised
+from backends import select_backend
 
 
 class PTP_CLI:
     """
     Interactive command-line client for managing and testing solvers.
+
+    Solvers are imported by the commands that run them, so the client
+    starts without loading networkx.
     """
 
     PROMPT_MESSAGE = """
@@ -24,18 +30,29 @@ Type '--help' to get more information
 Commands:
   ls_input: list all input files (default under ./inputs folder)
   ck_input: check whether student created inputs are valid or not
+  ck_corpus: check all inputs in parallel and write a JSON report
   test_php: test php solver 
   test_ptp: test ptp solver
   test_php_all: test php solver on all input files
   test_ptp_all: test ptp solver on all input files
+  trace_memory: turn allocation tracing on or off (slow, shows the largest allocations)
+  lower_bound: turn the lower bound and optimality gap of every solution on or off (slow)
+  set_limits: set the time and memory limits of every solve in test_php_all / test_ptp_all
 
 To quit the client: type 'exit' or press Escape or Enter
 
 Type --help to get help instructions
 """
 
-    def __init__(self, input_dir="./inputs", stu_in_files=None):
+    def __init__(self, input_dir="./inputs", stu_in_files=None, trace_memory=False,
+                 timeout=None, memory_limit=None, lower_bound=False):
         self.INPUT_FILE_DIRECTORY = input_dir
+        self.trace_memory = trace_memory
+        # report the gap of every solution to a lower bound, see report_gap
+        self.lower_bound = lower_bound
+        # limits of a supervised solve, see SupervisedSolve
+        self.timeout = timeout
+        self.memory_limit = memory_limit
         self.in_files = []
         self.stu_in_files = stu_in_files or ['20_03.in', '20_10.in', '40_03.in', '40_10.in']
 
@@ -56,6 +73,8 @@ Type --help to get help instructions
                 self.ls_input()
             elif cmd == "ck_input":
                 self.ck_input()
+            elif cmd == "ck_corpus":
+                self.ck_corpus()
             elif cmd == "test_php":
                 self.test_php()
             elif cmd == "test_ptp":
@@ -64,6 +83,12 @@ Type --help to get help instructions
                 self.test_php_all()
             elif cmd == "test_ptp_all":
                 self.test_ptp_all()
+            elif cmd == "trace_memory":
+                self.toggle_trace_memory()
+            elif cmd == "lower_bound":
+                self.toggle_lower_bound()
+            elif cmd == "set_limits":
+                self.set_limits()
             else:
                 print("Command not found.\nType '--help' to get instruction list")
 
@@ -108,7 +133,91 @@ Type --help to get help instructions
         if in_message:
             print(in_message)
 
+    def ck_corpus(self):
+        from input_validation import check_input_corpus
+        print(f"Checking all inputs under {self.INPUT_FILE_DIRECTORY}...")
+        corpus_report = check_input_corpus(os.path.join(os.getcwd(), self.INPUT_FILE_DIRECTORY))
+
+        for report in corpus_report['files']:
+            if not report['valid']:
+                print(f"\n{report['file']} is not valid. Error message:\n" + '\n'.join(report['errors']))
+
+        out_dir = os.path.join(os.getcwd(), OUTPUT_FILE_DIRECTORY)
+        if not os.path.exists(out_dir):
+            os.makedirs(out_dir)
+        report_path = os.path.join(out_dir, 'input_report.json')
+        write_to_file(report_path, json.dumps(corpus_report, indent=2))
+
+        print(f"\nSuccessfully checked {corpus_report['total']} files \n {corpus_report['valid']} valid")
+        print(f"Report written to {report_path}")
+
+    def toggle_trace_memory(self):
+        self.trace_memory = not self.trace_memory
+        print(f"Allocation tracing {'on' if self.trace_memory else 'off'}")
+
+    def toggle_lower_bound(self):
+        self.lower_bound = not self.lower_bound
+        print(f"Lower bounds {'on' if self.lower_bound else 'off'}")
+
+    def set_limits(self):
+        timeout = input("Time limit per solve in seconds (Enter for none): ").strip()
+        memory_limit = input("Memory limit per solve in MiB (Enter for none): ").strip()
+        try:
+            self.timeout = float(timeout) if timeout else None
+            self.memory_limit = int(float(memory_limit) * MiB) if memory_limit else None
+        except ValueError:
+            print("Limits must be numbers, unchanged.")
+            return
+        if self.timeout is None and self.memory_limit is None:
+            print("No limits, solvers run in this process")
+        else:
+            print("Solves run in a supervised worker and fall back to a cheaper solver over the limits")
+
+    def supervised_solve(self, solver, G, H, alpha):
+        """
+        Solve within the configured limits, with the backend selected for the instance.
+        Without limits the solver itself runs, whatever the memory available now.
+        Returns (tour, pick_up_locs_dict, solver_used), tour is None when every attempt failed.
+        """
+        limited = self.timeout is not None or self.memory_limit is not None
+        backend = select_backend(solver, G.number_of_nodes(), len(H), memory_budget=self.memory_limit,
+                                 time_budget=self.timeout, override=None if limited else solver)
+        if backend.name != solver:
+            print(f"Solving with {backend.name}, {solver} is estimated over the limits")
+        supervised = SupervisedSolve(backend.name, timeout=self.timeout, memory_limit=self.memory_limit,
+                                     trace_memory=self.trace_memory)
+        try:
+            tour, pick_up_locs_dict = supervised.solve(G, H, alpha)
+        except Exception as e:
+            print(f"Solve failed: {type(e).__name__}: {e}")
+            return None, None, None
+        for attempt in supervised.attempts[:-1]:
+            print(f"{attempt['solver']} solver stopped after {attempt['seconds']:.5f} seconds: {attempt['error']}")
+        if supervised.solver_used != solver:
+            print(f"Answer by the {supervised.solver_used} solver, not {solver}")
+        return tour, pick_up_locs_dict, supervised.solver_used
+
+    def report_gap(self, problem, G, H, alpha, cost):
+        """
+        Print the lower bound on the optimal cost and the gap of cost to it, within the
+        solve limits. Does nothing unless the lower_bound command turned it on.
+        """
+        if not self.lower_bound:
+            return
+        from lower_bounds import instance_lower_bound, gap
+        if self.timeout is None and self.memory_limit is None:
+            lower = instance_lower_bound(G, H, alpha, problem)
+        else:
+            try:
+                lower = run_supervised(instance_lower_bound, (G, H, alpha, problem),
+                                       timeout=self.timeout, memory_limit=self.memory_limit)
+            except (SolveTimeout, MemoryError, WorkerCrashed) as e:
+                print(f"Lower bound stopped: {type(e).__name__}: {e}")
+                return
+        print(f"Lower bound: {lower:.5f}, gap {100 * gap(cost, lower):.2f}%")
+
     def test_php(self):
+        from php_from_tsp import php_solver_from_tsp
         print("Testing php solver...")
         user_in_files_str = input("Select input files: ")
         self.ensure_in_files_loaded()
@@ -116,18 +225,22 @@ Type --help to get help instructions
         file_paths, message = input_file_names_to_file_path(user_in_files_str, self.in_files)
         count = legitimate_count = 0
         for file in file_paths:
-            print(f"\nReading file {os.path.basename(file)}...")
-            G, H, alpha = input_file_to_instance(file)
-            print(f"n = {G.number_of_nodes()}, |H| = {len(H)}, alpha = {alpha}")
-            print('Graph constructed...')
-            tour = php_solver_from_tsp(G, H)
-            print('Tour generated by php solver...')
-            print('Analyzing the solution...')
-            is_legitimate, driving_cost, walking_cost = analyze_solution(G, H, alpha, tour, {})
-            if is_legitimate:
-                legitimate_count += 1
-            print(f"Your solution is{' NOT' if not is_legitimate else ''} legitimate.")
-            print(f"Total driving cost of your solution: {driving_cost:.5f}")
+            with profile() as profiler, track_memory(trace=self.trace_memory) as tracker:
+                print(f"\nReading file {os.path.basename(file)}...")
+                G, H, alpha = input_file_to_instance(file)
+                print(f"n = {G.number_of_nodes()}, |H| = {len(H)}, alpha = {alpha}")
+                print('Graph constructed...')
+                tour = php_solver_from_tsp(G, H)
+                print('Tour generated by php solver...')
+                print('Analyzing the solution...')
+                is_legitimate, driving_cost, walking_cost = analyze_solution(G, H, alpha, tour, {})
+                if is_legitimate:
+                    legitimate_count += 1
+                print(f"Your solution is{' NOT' if not is_legitimate else ''} legitimate.")
+                print(f"Total driving cost of your solution: {driving_cost:.5f}")
+                self.report_gap('php', G, H, alpha, driving_cost + walking_cost)
+            print(profiler.format())
+            print(tracker.format())
             count += 1
 
         print(f"\nSuccessfully tested {count} files \n {legitimate_count} solutions legitimate")
@@ -135,6 +248,7 @@ Type --help to get help instructions
             print(message)
 
     def test_ptp(self):
+        from ptp_solver import ptp_solver
         print("Testing PTP solver...")
         user_in_files_str = input("Select input files: ")
         print("Starting testing PTP solver...")
@@ -143,22 +257,26 @@ Type --help to get help instructions
         file_paths, message = input_file_names_to_file_path(user_in_files_str, self.in_files)
         count = legitimate_count = 0
         for file in file_paths:
-            print(f"\nReading file {os.path.basename(file)}...")
-            G, H, alpha = input_file_to_instance(file)
-            print(f"n = {G.number_of_nodes()}, |H| = {len(H)}, alpha = {alpha}")
-            print('Graph constructed...')
-            tour, pick_up_locs_dict = ptp_solver(G, H, alpha)
-            print('Tour generated by PTP solver...')
-            print("Writing solution to output file...")
-            write_ptp_solution_to_out(tour, pick_up_locs_dict, os.path.basename(file))
-            print("Output written.")
-            print('Analyzing the solution...')
-            is_legitimate, driving_cost, walking_cost = analyze_solution(G, H, alpha, tour, pick_up_locs_dict)
-            if is_legitimate:
-                legitimate_count += 1
-            print(f"Your solution is{' NOT' if not is_legitimate else ''} legitimate.")
-            print(f"Total driving cost: {driving_cost:.5f}")
-            print(f"Total walking cost: {walking_cost:.5f}")
+            with profile() as profiler, track_memory(trace=self.trace_memory) as tracker:
+                print(f"\nReading file {os.path.basename(file)}...")
+                G, H, alpha = input_file_to_instance(file)
+                print(f"n = {G.number_of_nodes()}, |H| = {len(H)}, alpha = {alpha}")
+                print('Graph constructed...')
+                tour, pick_up_locs_dict = ptp_solver(G, H, alpha)
+                print('Tour generated by PTP solver...')
+                print("Writing solution to output file...")
+                write_ptp_solution_to_out(tour, pick_up_locs_dict, os.path.basename(file))
+                print("Output written.")
+                print('Analyzing the solution...')
+                is_legitimate, driving_cost, walking_cost = analyze_solution(G, H, alpha, tour, pick_up_locs_dict)
+                if is_legitimate:
+                    legitimate_count += 1
+                print(f"Your solution is{' NOT' if not is_legitimate else ''} legitimate.")
+                print(f"Total driving cost: {driving_cost:.5f}")
+                print(f"Total walking cost: {walking_cost:.5f}")
+                self.report_gap('ptp', G, H, alpha, driving_cost + walking_cost)
+            print(profiler.format())
+            print(tracker.format())
             count += 1
 
         print(f"\nSuccessfully tested {count} files \n {legitimate_count} solutions legitimate")
@@ -174,27 +292,36 @@ Type --help to get help instructions
         scores = []
 
         for file in file_paths:
-            print(f"\nReading file {os.path.basename(file)}...")
-            G, H, alpha = input_file_to_instance(file)
-            print(f"n = {G.number_of_nodes()}, |H| = {len(H)}, alpha = {alpha}")
-            print('Graph constructed...')
-            start_time = time.time()
-            php_tour = php_solver_from_tsp(G, H)
-            php_time = time.time() - start_time
-            print('Tour generated by php solver...')
-            print('Analyzing the solution...')
-            php_is_legitimate, php_driving_cost, php_walking_cost = analyze_solution(G, H, alpha, php_tour, {})
-            php_cost = php_driving_cost + php_walking_cost
-            if php_is_legitimate:
-                legitimate_count += 1
-            print(f"Your php solution is{' NOT' if not php_is_legitimate else ''} legitimate.")
-            print(f"Total cost: {php_cost:.5f}")
-            print(f"Running time: {php_time:.5f} seconds")
-            scores.append(php_cost)
+            with profile() as profiler, track_memory(trace=self.trace_memory) as tracker:
+                print(f"\nReading file {os.path.basename(file)}...")
+                G, H, alpha = input_file_to_instance(file)
+                print(f"n = {G.number_of_nodes()}, |H| = {len(H)}, alpha = {alpha}")
+                print('Graph constructed...')
+                start_time = time.time()
+                php_tour, _, solver_used = self.supervised_solve('php', G, H, alpha)
+                php_time = time.time() - start_time
+                if php_tour is None:
+                    print("No php solution within the limits, NOT legitimate.")
+                    print(f"Running time: {php_time:.5f} seconds")
+                else:
+                    print(f'Tour generated by {solver_used} solver...')
+                    print('Analyzing the solution...')
+                    php_is_legitimate, php_driving_cost, php_walking_cost = analyze_solution(G, H, alpha, php_tour, {})
+                    php_cost = php_driving_cost + php_walking_cost
+                    if php_is_legitimate:
+                        legitimate_count += 1
+                    print(f"Your php solution is{' NOT' if not php_is_legitimate else ''} legitimate.")
+                    print(f"Total cost: {php_cost:.5f}")
+                    self.report_gap('php', G, H, alpha, php_cost)
+                    print(f"Running time: {php_time:.5f} seconds")
+                    scores.append(php_cost)
+            print(profiler.format())
+            print(tracker.format())
             count += 1
 
         print(f"\nSuccessfully tested {count} files \n {legitimate_count} legitimate")
-        print(f"Average cost: {sum(scores)/len(scores):.5f}")
+        if scores:
+            print(f"Average cost: {sum(scores)/len(scores):.5f}")
         if message:
             print(message)
 
@@ -207,32 +334,41 @@ Type --help to get help instructions
         scores = []
 
         for file in file_paths:
-            print(f"\nReading file {os.path.basename(file)}...")
-            G, H, alpha = input_file_to_instance(file)
-            print(f"n = {G.number_of_nodes()}, |H| = {len(H)}, alpha = {alpha}")
-            print('Graph constructed...')
-            start_time = time.time()
-            ptp_tour, ptp_pick_up_locs_dict = ptp_solver(G, H, alpha)
-            ptp_time = time.time() - start_time
-            print('Tour generated by PTP solver...')
-            print("Writing solution to output file...")
-            write_ptp_solution_to_out(ptp_tour, ptp_pick_up_locs_dict, os.path.basename(file))
-            print("Output written.")
-            print('Analyzing the solution...')
-            ptp_is_legitimate, ptp_driving_cost, ptp_walking_cost = analyze_solution(G, H, alpha, ptp_tour, ptp_pick_up_locs_dict)
-            ptp_cost = ptp_driving_cost + ptp_walking_cost
-            if ptp_is_legitimate:
-                legitimate_count += 1
-            print(f"Your PTP solution is{' NOT' if not ptp_is_legitimate else ''} legitimate.")
-            print(f"Total cost: {ptp_cost:.5f}")
-            print(f"Driving cost: {ptp_driving_cost:.5f}")
-            print(f"Walking cost: {ptp_walking_cost:.5f}")
-            print(f"Running time: {ptp_time:.5f} seconds")
-            scores.append(ptp_cost)
+            with profile() as profiler, track_memory(trace=self.trace_memory) as tracker:
+                print(f"\nReading file {os.path.basename(file)}...")
+                G, H, alpha = input_file_to_instance(file)
+                print(f"n = {G.number_of_nodes()}, |H| = {len(H)}, alpha = {alpha}")
+                print('Graph constructed...')
+                start_time = time.time()
+                ptp_tour, ptp_pick_up_locs_dict, solver_used = self.supervised_solve('ptp', G, H, alpha)
+                ptp_time = time.time() - start_time
+                if ptp_tour is None:
+                    print("No PTP solution within the limits, NOT legitimate.")
+                    print(f"Running time: {ptp_time:.5f} seconds")
+                else:
+                    print(f'Tour generated by {solver_used} solver...')
+                    print("Writing solution to output file...")
+                    write_ptp_solution_to_out(ptp_tour, ptp_pick_up_locs_dict, os.path.basename(file))
+                    print("Output written.")
+                    print('Analyzing the solution...')
+                    ptp_is_legitimate, ptp_driving_cost, ptp_walking_cost = analyze_solution(G, H, alpha, ptp_tour, ptp_pick_up_locs_dict)
+                    ptp_cost = ptp_driving_cost + ptp_walking_cost
+                    if ptp_is_legitimate:
+                        legitimate_count += 1
+                    print(f"Your PTP solution is{' NOT' if not ptp_is_legitimate else ''} legitimate.")
+                    print(f"Total cost: {ptp_cost:.5f}")
+                    print(f"Driving cost: {ptp_driving_cost:.5f}")
+                    print(f"Walking cost: {ptp_walking_cost:.5f}")
+                    self.report_gap('ptp', G, H, alpha, ptp_cost)
+                    print(f"Running time: {ptp_time:.5f} seconds")
+                    scores.append(ptp_cost)
+            print(profiler.format())
+            print(tracker.format())
             count += 1
 
         print(f"\nSuccessfully tested {count} files \n {legitimate_count} legitimate")
-        print(f"Average cost: {sum(scores)/len(scores):.5f}")
+        if scores:
+            print(f"Average cost: {sum(scores)/len(scores):.5f}")
         if message:
             print(message)
 
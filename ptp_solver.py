@@ -1,7 +1,255 @@
+import random
 import networkx as nx
 from student_utils import *
+from profiling import span, traced
+from memory_accounting import checkpoint
+from shortest_paths import dijkstra, shortest_paths_from_terminals
+from php_from_tsp import build_reduced_graph, expand_tour
+from mtsp_dp import mtsp_dp
+from tsp_heuristics import tour_length, nearest_neighbor_order, improve_order
 
-def ptp_solver(G:nx.DiGraph, H:list, alpha:float):
+# Routes with at most this many stops (depot included) are re-ordered exactly by mtsp_dp
+EXACT_ORDER_LIMIT = 12
+
+
+def pickup_options(G, H):
+    """
+    Where every friend can be picked up: their home and its neighbors.
+
+    Returns:
+        dict: options[h] = list of nodes, the home first.
+    """
+    options = {}
+    for h in H:
+        nbrs = set(G.successors(h)) | set(G.predecessors(h))
+        nbrs.discard(h)
+        options[h] = [h] + sorted(nbrs)
+    return options
+
+
+def prune_pickup_options(G, options, alpha, stats=None):
+    """
+    Remove the pick-up stops that some other stop dominates.
+
+    A stop s serves the friends F(s) whose options contain it. Another stop t
+    dominates s when F(t) ⊇ F(s) and, for every h in F(s),
+        walk(s, h) - walk(t, h) >= 2 * alpha * d(s, t).
+    Putting t in place of s on any route then drives at most 2 * d(s, t)
+    more (triangle inequality), and saves at least that much walking.
+    So some optimal solution never uses s. The depot is on every route
+    already, so it only has to beat s on walking. Equivalent stops, with equal
+    friends and walking costs, collapse to the lowest-numbered one when alpha is 0.
+
+    Only distances near the homes are needed: walking costs come from one
+    Dijkstra per home that stops at its last neighbor, and d(s, t) is
+    bounded by the way through a common home.
+
+    Parameters:
+        G (nx.DiGraph): The graph.
+        options (dict): Pick-up options of every friend, see `pickup_options`.
+        alpha (float): The cost coefficient of driving.
+        stats (SolverStats): Optional, receives ptp.stops_pruned and the Dijkstra counters.
+
+    Returns:
+        dict: The options without the dominated stops, in the same order.
+            A friend's home is never dominated, so nobody is left without options.
+    """
+    walk = {}
+    for h, stops in options.items():
+        dist, _ = dijkstra(G, h, targets=stops, stats=stats)
+        for s in stops:
+            walk.setdefault(s, {})[h] = dist[s]
+
+    def detour(s, t):
+        if t == 0:
+            return 0
+        bound = min(walk[s][h] + walk[t][h] for h in walk[s])
+        if t in G.adj[s]:
+            bound = min(bound, G.adj[s][t]['weight'])
+        return 2 * alpha * bound
+
+    kept = set(walk) | {0}
+    # the higher-numbered of two equivalent stops goes first
+    for s in sorted(walk, reverse=True):
+        if s == 0:
+            continue
+        friends = walk[s]
+        h0 = next(iter(friends))
+        for t in options[h0]:
+            if t == s or t not in kept or not all(h in walk[t] for h in friends):
+                continue
+            extra = detour(s, t)
+            if all(friends[h] - walk[t][h] >= extra - 1e-9 for h in friends):
+                kept.discard(s)
+                break
+
+    pruned = {h: [s for s in stops if s in kept] for h, stops in options.items()}
+    if stats is not None:
+        stats.add('ptp.stops_pruned', len(walk) - len(kept & set(walk)))
+    return pruned
+
+
+class PickupSearch:
+    """
+    Local search over the set of pick-up stops of a PTP solution.
+
+    A solution is an ordered route of stops (the depot 0 is implicit at both
+    ends). Given the stops, every friend walks to the closest stop they can
+    use, so only the route has to be searched. Moves are:
+        - drop a stop, when everyone it served can still be picked up elsewhere;
+        - add a stop at its cheapest position;
+        - swap a stop for another one serving one of the same friends.
+    The route order itself is improved with 2-opt and Or-opt.
+
+    Parameters:
+        dist (dict): dist[u][v] = shortest distance between candidate stops u and v.
+        options (dict): Pick-up options of every friend, see `pickup_options`.
+        alpha (float): The cost coefficient of driving.
+        rng (random.Random): Source of randomness for move order and restarts.
+    """
+
+    def __init__(self, dist, options, alpha, rng):
+        self.dist = dist
+        self.options = options
+        self.alpha = alpha
+        self.rng = rng
+        self.friends_of = {}
+        for h, stops in options.items():
+            for s in stops:
+                self.friends_of.setdefault(s, []).append(h)
+        self.candidates = sorted(s for s in self.friends_of if s != 0)
+        # work counters
+        self.moves_evaluated = 0
+        self.moves_accepted = 0
+
+    # --- Cost evaluation ---
+    def walk(self, h, stops):
+        """Walking cost of friend h and the stop they use, (inf, None) if no stop serves h"""
+        best, best_stop = float('inf'), None
+        for s in self.options[h]:
+            if s in stops or s == 0:
+                d = self.dist[s][h]
+                if d < best:
+                    best, best_stop = d, s
+        return best, best_stop
+
+    def walking_cost(self, stops, friends=None):
+        friends = self.options if friends is None else friends
+        return sum(self.walk(h, stops)[0] for h in friends)
+
+    def cost(self, route):
+        return self.alpha * tour_length([0] + route, self.dist) + self.walking_cost(set(route))
+
+    def assignment(self, route):
+        """pick_up_locs_dict of a route"""
+        stops = set(route)
+        pick_up_locs_dict = {}
+        for h in self.options:
+            _, s = self.walk(h, stops)
+            pick_up_locs_dict.setdefault(s, []).append(h)
+        return pick_up_locs_dict
+
+    # --- Moves ---
+    def _insertion(self, route, t):
+        """Cheapest position and extra driving distance to insert t"""
+        order = [0] + route + [0]
+        dist = self.dist
+        best, best_position = float('inf'), 0
+        for p in range(len(order) - 1):
+            a, b = order[p], order[p + 1]
+            extra = dist[a][t] + dist[t][b] - dist[a][b]
+            if extra < best:
+                best, best_position = extra, p
+        return best_position, best
+
+    def _walking_delta(self, stops, new_stops, touched):
+        friends = set()
+        for s in touched:
+            friends.update(self.friends_of.get(s, ()))
+        return self.walking_cost(new_stops, friends) - self.walking_cost(stops, friends)
+
+    def _try_moves(self, route):
+        """Apply the first improving move found. Returns whether the route changed."""
+        dist, alpha = self.dist, self.alpha
+        stops = set(route)
+        order = [0] + route + [0]
+
+        moves = [('drop', i) for i in range(len(route))]
+        moves += [('add', t) for t in self.candidates if t not in stops]
+        moves += [('swap', i, t) for i in range(len(route))
+                  for h in self.friends_of[route[i]] for t in self.options[h]
+                  if t != 0 and t not in stops]
+        self.rng.shuffle(moves)
+
+        for move in moves:
+            self.moves_evaluated += 1
+            if move[0] == 'drop':
+                i = move[1]
+                s = route[i]
+                a, b = order[i], order[i + 2]
+                drive_delta = dist[a][b] - dist[a][s] - dist[s][b]
+                new_stops = stops - {s}
+                walk_delta = self._walking_delta(stops, new_stops, [s])
+                new_route = route[:i] + route[i + 1:]
+            elif move[0] == 'add':
+                t = move[1]
+                position, drive_delta = self._insertion(route, t)
+                new_stops = stops | {t}
+                walk_delta = self._walking_delta(stops, new_stops, [t])
+                new_route = route[:position] + [t] + route[position:]
+            else:
+                _, i, t = move
+                s = route[i]
+                a, b = order[i], order[i + 2]
+                drive_delta = dist[a][t] + dist[t][b] - dist[a][s] - dist[s][b]
+                new_stops = (stops - {s}) | {t}
+                walk_delta = self._walking_delta(stops, new_stops, [s, t])
+                new_route = route[:i] + [t] + route[i + 1:]
+
+            if alpha * drive_delta + walk_delta < -1e-9:
+                route[:] = new_route
+                self.moves_accepted += 1
+                return True
+        return False
+
+    def local_search(self, route):
+        """Improve route in place until no move and no re-ordering helps"""
+        while True:
+            while self._try_moves(route):
+                pass
+            order = [0] + route
+            if not improve_order(order, self.dist):
+                return route
+            route[:] = order[1:]
+
+    def perturb(self, route, strength):
+        """Replace a few stops by random options, keeping every friend served"""
+        route = list(route)
+        for _ in range(min(strength, len(route))):
+            i = self.rng.randrange(len(route))
+            h = self.rng.choice(self.friends_of[route[i]])
+            route[i] = self.rng.choice(self.options[h])
+        route = [s for s in dict.fromkeys(route) if s != 0]
+        # repair: serve the friends left without a stop at their home
+        stops = set(route)
+        for h in self.options:
+            if self.walk(h, stops)[1] is None:
+                position, _ = self._insertion(route, h)
+                route.insert(position, h)
+                stops.add(h)
+        return route
+
+
+def _exact_order(route, all_shortest_paths, stats=None):
+    """Optimal visiting order of a short route, by mtsp_dp"""
+    nodes_prime = [0] + route
+    indices = mtsp_dp(build_reduced_graph(all_shortest_paths, nodes_prime), stats=stats)
+    return [nodes_prime[i] for i in indices[1:-1]]
+
+
+@traced()
+def ptp_solver(G:nx.DiGraph, H:list, alpha:float, restarts:int=8, seed:int=0, stats=None,
+               exact_order_limit:int=EXACT_ORDER_LIMIT, prune_stops:bool=True, gap_tolerance:float=None):
     """
     PTP solver.
 
@@ -10,6 +258,17 @@ def ptp_solver(G:nx.DiGraph, H:list, alpha:float):
             This directed graph is equivalent to an undirected one by construction.
         H (list): A list of home nodes.
         alpha (float): The coefficient for calculating cost.
+        restarts (int): Number of perturbed restarts of the local search.
+        seed (int): Seed of the random move order and perturbations.
+        stats (SolverStats): Optional, receives the Dijkstra, mtsp_dp and
+            ptp.moves_evaluated / ptp.moves_accepted / ptp.restarts counters.
+        exact_order_limit (int): Routes with at most this many stops, depot
+            included, are re-ordered exactly by mtsp_dp. 0 disables it.
+        prune_stops (bool): Drop dominated pick-up stops before the shortest
+            paths, see `prune_pickup_options`.
+        gap_tolerance (float): Stop the restarts once the best route is within
+            this relative gap of `lower_bounds.ptp_lower_bound`. None always
+            runs every restart.
 
     Returns:
         tuple: A tuple containing:
@@ -27,10 +286,81 @@ def ptp_solver(G:nx.DiGraph, H:list, alpha:float):
     - Pick-up locations must be part of the tour.
     - Each friend should be picked up exactly once.
     - The pick-up locations must be neighbors of the friends' home nodes or their homes.
+
+    Algorithm:
+        1. Shortest paths between the depot and every pick-up stop that is not dominated.
+        2. Start from the PHP route visiting every home: the exact one by
+           mtsp_dp when |H| + 1 <= exact_order_limit, otherwise ordered by
+           nearest neighbor, 2-opt and Or-opt. Every move below lowers the
+           cost, so with the exact start the result never costs more than
+           the optimal PHP tour.
+        3. Local search over the set of stops (see `PickupSearch`), then
+           `restarts` rounds of perturbation + local search, keeping the best
+           route, until the gap to the lower bound is within gap_tolerance.
+        4. Re-order short routes exactly with mtsp_dp, then expand the route
+           with shortest paths and pick everyone up at their closest stop.
     """
+    rng = random.Random(seed)
+    with span('shortest_paths'):
+        options = pickup_options(G, H)
+        if prune_stops:
+            options = prune_pickup_options(G, options, alpha, stats=stats)
+        terminals = [0] + sorted({s for stops in options.values() for s in stops} - {0})
+        all_shortest_paths = shortest_paths_from_terminals(G, terminals, stats=stats)
+        dist = {u: all_shortest_paths[u][0] for u in terminals}
+    checkpoint('ptp.shortest_paths')
+
+    search = PickupSearch(dist, options, alpha, rng)
+    with span('construction'):
+        homes = [h for h in dict.fromkeys(H) if h != 0]
+        if 1 < len(homes) + 1 <= exact_order_limit:
+            best_route = _exact_order(homes, all_shortest_paths, stats=stats)
+        else:
+            order = nearest_neighbor_order([0] + homes, dist)
+            improve_order(order, dist)
+            best_route = order[1:]
+
+    lower = None
+    if gap_tolerance is not None:
+        from lower_bounds import ptp_lower_bound, gap
+        lower = ptp_lower_bound(dist, options, alpha)
+
+    restarts_done = 0
+    with span('local_search'):
+        search.local_search(best_route)
+        best_cost = search.cost(best_route)
+        for _ in range(restarts):
+            if lower is not None and gap(best_cost, lower) <= gap_tolerance:
+                break
+            restarts_done += 1
+            route = search.perturb(best_route, strength=max(1, len(best_route) // 4))
+            search.local_search(route)
+            cost = search.cost(route)
+            if cost < best_cost - 1e-9:
+                best_route, best_cost = route, cost
 
+    if 1 < len(best_route) + 1 <= exact_order_limit:
+        with span('exact_order'):
+            best_route = _exact_order(best_route, all_shortest_paths, stats=stats)
+
+    with span('expansion'):
+        tour = expand_tour([0] + best_route + [0], all_shortest_paths)
+        pick_up_locs_dict = search.assignment(best_route)
+
+    if stats is not None:
+        stats.add('ptp.moves_evaluated', search.moves_evaluated)
+        stats.add('ptp.moves_accepted', search.moves_accepted)
+        stats.add('ptp.restarts', restarts_done)
     return tour, pick_up_locs_dict
 
 
+def greedy_ptp_solver(G:nx.DiGraph, H:list, alpha:float, stats=None):
+    """
+    Cheap PTP fallback: one local search from the constructed route, without
+    restarts and without exact re-ordering. Returns the same as ptp_solver.
+    """
+    return ptp_solver(G, H, alpha, restarts=0, stats=stats, exact_order_limit=0)
+
+
 if __name__ == "__main__":
     pass
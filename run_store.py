@@ -0,0 +1,260 @@
+"""
+Run history in a local SQLite database, with content-addressed result reuse.
+
+Every result is keyed by (instance content hash, solver, solver version,
+parameters), where the solver version is the version of the backend that
+produced the result. The batch runner looks results up before solving, so
+unchanged instances are not solved again by unchanged backends with the same
+parameters.
+
+Usage:
+    python run_store.py runs
+    python run_store.py best
+    python run_store.py compare <run_id> <run_id>
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import argparse
+
+DEFAULT_STORE = 'runs.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started REAL NOT NULL,
+    solver TEXT NOT NULL,
+    solver_version TEXT NOT NULL,
+    params TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    instance_hash TEXT NOT NULL,
+    file TEXT NOT NULL,
+    solver TEXT NOT NULL,
+    solver_version TEXT NOT NULL,
+    params TEXT NOT NULL,
+    solver_used TEXT,
+    n INTEGER,
+    homes INTEGER,
+    alpha REAL,
+    legitimate INTEGER NOT NULL,
+    driving_cost REAL,
+    walking_cost REAL,
+    cost REAL,
+    time REAL,
+    tour TEXT,
+    pick_up_locs_dict TEXT,
+    counters TEXT,
+    error TEXT,
+    cached INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_key ON results (instance_hash, solver, solver_version, params);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+"""
+
+# record fields stored as JSON text
+_JSON_FIELDS = ('tour', 'pick_up_locs_dict', 'counters')
+
+
+def instance_hash(file):
+    """SHA-256 of the content of an input file"""
+    digest = hashlib.sha256()
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def params_key(params):
+    """Canonical text of a parameter dict, equal for equal parameters"""
+    return json.dumps(params or {}, sort_keys=True, separators=(',', ':'))
+
+
+class RunStore:
+    """
+    SQLite store of runs and of their results, one row per solved instance.
+
+    A run is one batch invocation; results keep the history of every run, and
+    `lookup` returns the newest valid result of a key: legitimate and without error.
+
+    Examples:
+        with RunStore('runs.sqlite') as store:
+            run_id = store.start_run('ptp', version, params)
+            cached = store.lookup(instance_hash(file), 'ptp', ['ptp:2', 'ptp_greedy:2'], params)
+            ...
+            store.add(run_id, record, instance_hash(file), 'ptp:2', params)
+            print(store.best_known())
+    """
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    # --- Writing ---
+    def start_run(self, solver, solver_version, params=None):
+        """Register a new run. Returns its run_id."""
+        run_id = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO runs (run_id, started, solver, solver_version, params) VALUES (?, ?, ?, ?, ?)",
+                (run_id, time.time(), solver, solver_version, params_key(params)))
+        return run_id
+
+    def add(self, run_id, record, instance_hash, solver_version, params=None):
+        """Store a result record of the batch runner (see `solve_instance`)"""
+        row = {
+            'run_id': run_id, 'instance_hash': instance_hash, 'file': record['file'],
+            'solver': record['solver'], 'solver_version': solver_version, 'params': params_key(params),
+            'solver_used': record.get('solver_used'), 'n': record.get('n'), 'homes': record.get('homes'),
+            'alpha': record.get('alpha'), 'legitimate': int(bool(record.get('legitimate'))),
+            'driving_cost': record.get('driving_cost'), 'walking_cost': record.get('walking_cost'),
+            'cost': record.get('cost'), 'time': record.get('time'), 'error': record.get('error'),
+            'cached': int(bool(record.get('cached'))), 'created': time.time(),
+        }
+        for field in _JSON_FIELDS:
+            row[field] = json.dumps(record.get(field)) if record.get(field) is not None else None
+        columns = ', '.join(row)
+        with self.connection:
+            self.connection.execute(f"INSERT INTO results ({columns}) VALUES ({', '.join('?' * len(row))})",
+                                    tuple(row.values()))
+
+    # --- Reading ---
+    @staticmethod
+    def _record(row):
+        record = dict(row)
+        for field in _JSON_FIELDS:
+            if record[field] is not None:
+                record[field] = json.loads(record[field])
+        record['legitimate'] = bool(record['legitimate'])
+        record['cached'] = bool(record['cached'])
+        return record
+
+    def lookup(self, instance_hash, solver, solver_versions, params=None):
+        """
+        The newest valid result of a key as a record dict, None if there is none.
+
+        solver_versions are the versions accepted, e.g. the current version of
+        every backend of the solver: a result produced by an older version of
+        its backend is not returned.
+        """
+        solver_versions = list(solver_versions)
+        row = self.connection.execute(
+            f"SELECT * FROM results WHERE instance_hash = ? AND solver = ? "
+            f"AND solver_version IN ({', '.join('?' * len(solver_versions))}) "
+            f"AND params = ? AND legitimate = 1 AND error IS NULL AND tour IS NOT NULL "
+            f"ORDER BY created DESC LIMIT 1",
+            (instance_hash, solver, *solver_versions, params_key(params))).fetchone()
+        return self._record(row) if row is not None else None
+
+    def runs(self):
+        """All runs, newest first, with their number of results, legitimate results and mean cost"""
+        rows = self.connection.execute(
+            "SELECT runs.*, COUNT(results.id) AS results, SUM(results.legitimate) AS legitimate, "
+            "SUM(results.cached) AS cached, AVG(results.cost) AS mean_cost "
+            "FROM runs LEFT JOIN results USING (run_id) GROUP BY runs.run_id ORDER BY runs.started DESC")
+        return [dict(row) for row in rows]
+
+    def results(self, run_id):
+        """All results of a run, by file name"""
+        rows = self.connection.execute("SELECT * FROM results WHERE run_id = ? ORDER BY file", (run_id,))
+        return [self._record(row) for row in rows]
+
+    def compare_runs(self, run_a, run_b):
+        """
+        Per-instance costs of two runs, matched by instance content.
+
+        Returns:
+            list: (file, cost_a, cost_b, cost_b - cost_a) for instances of both
+                runs, cost None when the result is not legitimate.
+        """
+        rows = self.connection.execute(
+            "SELECT a.file AS file, "
+            "CASE WHEN a.legitimate THEN a.cost END AS cost_a, "
+            "CASE WHEN b.legitimate THEN b.cost END AS cost_b "
+            "FROM results a JOIN results b ON a.instance_hash = b.instance_hash "
+            "WHERE a.run_id = ? AND b.run_id = ? ORDER BY a.file", (run_a, run_b))
+        return [(row['file'], row['cost_a'], row['cost_b'],
+                 row['cost_b'] - row['cost_a'] if row['cost_a'] is not None and row['cost_b'] is not None
+                 else None)
+                for row in rows]
+
+    def best_known(self, instance_hash=None):
+        """
+        The cheapest legitimate result of every instance over all runs and
+        solvers, or of one instance. Ties go to the oldest result.
+
+        Returns:
+            list: Record dicts, by file name.
+        """
+        where, args = "legitimate = 1 AND error IS NULL", ()
+        if instance_hash is not None:
+            where += " AND instance_hash = ?"
+            args = (instance_hash,)
+        rows = self.connection.execute(
+            f"SELECT * FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY instance_hash "
+            f"ORDER BY cost, created) AS rank FROM results WHERE {where}) WHERE rank = 1 ORDER BY file",
+            args)
+        return [self._record(row) for row in rows]
+
+
+def _format_cost(cost):
+    return f"{cost:.5f}" if cost is not None else "-"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the run history.")
+    parser.add_argument('--store', default=DEFAULT_STORE, help="SQLite store (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('runs', help="list all runs")
+    commands.add_parser('best', help="best-known solution of every instance")
+    compare = commands.add_parser('compare', help="compare the costs of two runs")
+    compare.add_argument('run_a')
+    compare.add_argument('run_b')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.store):
+        print(f"No run store at {args.store}")
+        return 1
+    with RunStore(args.store) as store:
+        if args.command == 'runs':
+            for run in store.runs():
+                started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run['started']))
+                print(f"{run['run_id']}  {started}  {run['solver']} ({run['solver_version']}) "
+                      f"{run['results']} results, {run['legitimate'] or 0} legitimate, "
+                      f"{run['cached'] or 0} cached, mean cost {_format_cost(run['mean_cost'])}")
+        elif args.command == 'best':
+            for record in store.best_known():
+                print(f"{record['file']}: cost {_format_cost(record['cost'])} by {record['solver_used']} "
+                      f"in run {record['run_id']}")
+        else:
+            rows = store.compare_runs(args.run_a, args.run_b)
+            for file, cost_a, cost_b, delta in rows:
+                change = f"{delta:+.5f}" if delta is not None else "-"
+                print(f"{file}: {_format_cost(cost_a)} -> {_format_cost(cost_b)} ({change})")
+            if not rows:
+                print("The runs have no instance in common")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import heapq
+
+
+def dijkstra(G, source, targets=None, stats=None):
+    """
+    Single-source Dijkstra on a weighted NetworkX graph.
+
+    Parameters:
+        G (nx.DiGraph): The graph, with a 'weight' attribute on every edge.
+        source: The source node.
+        targets (iterable): Stop as soon as all of these nodes are settled.
+            By default the whole graph is explored.
+        stats (SolverStats): Receives dijkstra.runs, dijkstra.heap_pushes
+            and dijkstra.heap_pops.
+
+    Returns:
+        tuple: (dist, pred) where dist[v] is the shortest distance from source
+            to every settled node v, and pred[v] is the node before v on that path.
+    """
+    adj = G.adj
+    dist = {}
+    pred = {source: None}
+    seen = {source: 0}
+    heap = [(0, source)]
+    pushes, pops = 1, 0
+    remaining = set(targets) if targets is not None else None
+
+    while heap:
+        d, u = heapq.heappop(heap)
+        pops += 1
+        if u in dist:
+            continue
+        dist[u] = d
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+        for v, data in adj[u].items():
+            nd = d + data['weight']
+            if v not in dist and nd < seen.get(v, float('inf')):
+                seen[v] = nd
+                pred[v] = u
+                heapq.heappush(heap, (nd, v))
+                pushes += 1
+
+    if stats is not None:
+        stats.add('dijkstra.runs')
+        stats.add('dijkstra.heap_pushes', pushes)
+        stats.add('dijkstra.heap_pops', pops)
+    return dist, pred
+
+
+def path_to(pred, target):
+    """Path from the source of a predecessor map to target, as a list of nodes"""
+    path = [target]
+    while pred[path[-1]] is not None:
+        path.append(pred[path[-1]])
+    path.reverse()
+    return path
+
+
+def shortest_paths_from_terminals(G, terminals, stats=None):
+    """
+    Shortest paths between every pair of terminals.
+
+    Only |terminals| Dijkstra runs are made, each stopping once all terminals
+    are settled, instead of one full run per node of G.
+
+    Parameters:
+        G (nx.DiGraph): The graph.
+        terminals (list): The nodes that matter, e.g. H ∪ {0}.
+        stats (SolverStats): Receives the Dijkstra counters.
+
+    Returns:
+        dict: all_shortest_paths[u] = (distances_dict, paths_dict) for every terminal u,
+            where distances_dict[v] and paths_dict[v] are given for every terminal v.
+            Same shape as dict(nx.all_pairs_dijkstra(G)), restricted to terminals.
+    """
+    terminals = list(dict.fromkeys(terminals))
+    all_shortest_paths = {}
+    for u in terminals:
+        dist, pred = dijkstra(G, u, targets=terminals, stats=stats)
+        all_shortest_paths[u] = ({v: dist[v] for v in terminals},
+                                 {v: path_to(pred, v) for v in terminals})
+    return all_shortest_paths
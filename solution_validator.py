@@ -0,0 +1,156 @@
+import networkx as nx
+
+
+class SolutionValidator:
+    """
+    Validator for many candidate solutions of a single instance.
+
+    `analyze_solution` rebuilds everything it needs on every call: it runs
+    Floyd-Warshall over the whole graph, checks pick-up locations with a linear
+    scan of the tour and looks every edge up through `G.has_edge`.
+    This class does that work once per instance, so scoring thousands of
+    candidates only costs dictionary and set lookups.
+
+    Parameters:
+        G (nx.DiGraph): The graph representing the problem.
+        H (list): A list of home nodes.
+        alpha (float): The cost coefficient.
+
+    Notes:
+        - `analyze` and `analyze_batch` return exactly what `analyze_solution`
+          returns for the same inputs: (is_legitimate, driving_cost, walking_cost).
+        - Shortest-path lengths are only needed for walking costs. They are
+          computed lazily, one Dijkstra per distinct pick-up location, and cached.
+        - Failure reasons are not printed by default. Pass `verbose=True` to
+          get the same messages as `analyze_solution`.
+    """
+
+    INFEASIBLE = (False, float('infinity'), float('infinity'))
+
+    def __init__(self, G, H, alpha):
+        self.G = G
+        self.H = list(H)
+        self.alpha = alpha
+
+        # weight[(u, v)] = edge weight, also used as the edge membership test
+        self.weight = {(u, v): data['weight'] for u, v, data in G.edges(data=True)}
+        # driving cost of every edge, pre-multiplied by alpha
+        self.drive = {edge: float(alpha * w) for edge, w in self.weight.items()}
+
+        self.home_set = set(self.H)
+
+        # Single-source shortest-path lengths, filled on demand
+        self._dist = {}
+
+    # --- Helper methods ---
+    def distances_from(self, source):
+        """Shortest-path lengths from source, cached per source."""
+        dist = self._dist.get(source)
+        if dist is None:
+            dist = nx.single_source_dijkstra_path_length(self.G, source)
+            self._dist[source] = dist
+        return dist
+
+    def is_adjacent(self, u, v):
+        """Whether u and v are joined by an edge in either direction."""
+        return (u, v) in self.weight or (v, u) in self.weight
+
+    def walking_distance(self, pick_up_loc, friend):
+        dist = self.distances_from(pick_up_loc)
+        # floyd_warshall reports unreachable pairs as inf, do the same here
+        return dist.get(friend, float('inf'))
+
+    # --- Validation ---
+    def analyze(self, tour, pick_up_locs_dict, verbose=False):
+        """
+        Analyze one solution.
+
+        Parameters:
+            tour (list): The tour of the car.
+            pick_up_locs_dict (dict): Pick-up locations mapped to the friends
+                picked up there, {} for a PHP solution.
+            verbose (bool): Print the reason of an infeasible solution.
+
+        Returns:
+            tuple: (is_legitimate, driving_cost, walking_cost), see `analyze_solution`.
+        """
+        # the tour must start and end at node 0
+        if not (tour[0] == 0 and tour[-1] == 0):
+            if verbose:
+                print("not cycle")
+            return self.INFEASIBLE
+
+        # every road in the tour must exist in the graph
+        edges = list(zip(tour, tour[1:]))
+        drive = self.drive
+        try:
+            costs = [drive[edge] for edge in edges]
+        except KeyError as e:
+            if verbose:
+                print(f"edge{e.args[0]} not exist")
+            return self.INFEASIBLE
+        except TypeError:
+            # unhashable node label, it cannot be in the graph
+            if verbose:
+                print("edge not exist")
+            return self.INFEASIBLE
+        # summed left to right, exactly like analyze_solution
+        driving_cost = sum(costs)
+
+        walking_cost = 0
+        if pick_up_locs_dict:
+            tour_set = set(tour)
+            picked_up_count = 0
+            for pick_up_loc, friends in pick_up_locs_dict.items():
+                # pick up locations must be in the tour
+                if pick_up_loc not in tour_set:
+                    if verbose:
+                        print(f"Pick up location {pick_up_loc} not in the tour")
+                    return self.INFEASIBLE
+                for friend in friends:
+                    if friend != pick_up_loc and not self.is_adjacent(friend, pick_up_loc):
+                        if verbose:
+                            print(f"{friend} pick up location {pick_up_loc} not in the neighbors or home")
+                        return self.INFEASIBLE
+                    walking_cost += self.walking_distance(pick_up_loc, friend)
+                    picked_up_count += 1
+            # analyze_solution only compares the number of friends picked up
+            # with |H|, keep the same rule so both functions always agree
+            if picked_up_count == len(self.H):
+                return True, driving_cost, walking_cost
+            if verbose:
+                print("Not all friends picked up")
+            return self.INFEASIBLE
+
+        # PHP solution, no pick-up locations. Every node in H should be in tour
+        if self.home_set.issubset(tour):
+            return True, driving_cost, walking_cost
+        if verbose:
+            print("Not visit every node in H")
+        return self.INFEASIBLE
+
+    def analyze_batch(self, candidates, verbose=False):
+        """
+        Analyze many solutions of this instance.
+
+        Parameters:
+            candidates (iterable): (tour, pick_up_locs_dict) pairs.
+            verbose (bool): Print the reason of every infeasible solution.
+
+        Returns:
+            list: One (is_legitimate, driving_cost, walking_cost) tuple per candidate,
+                in the same order as the input.
+        """
+        analyze = self.analyze
+        return [analyze(tour, pick_up_locs_dict, verbose) for tour, pick_up_locs_dict in candidates]
+
+    def total_costs(self, candidates):
+        """
+        Total cost (driving + walking) of every candidate, infinity if infeasible.
+        """
+        return [driving_cost + walking_cost
+                for _, driving_cost, walking_cost in self.analyze_batch(candidates)]
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,187 @@
+import os
+import contextlib
+from utils import *
+from student_utils import ptp_solution_to_str
+
+ARCHIVE_INDEX_SUFFIX = '.idx'
+
+
+def solution_name(in_file):
+    """Name of the solution of an input file, `20_03.in` -> `20_03`"""
+    return os.path.basename(in_file).split('.')[0]
+
+
+def parse_ptp_solution(text):
+    """
+    Parse the content of an output file.
+
+    Returns:
+        tuple: (tour, pick_up_locs_dict), see `ptp_solver`.
+    """
+    lines = [line.split() for line in text.strip().split('\n')]
+    tour = [int(node) for node in lines[0]]
+    pick_up_locs_dict = {}
+    for line in lines[2:2 + int(lines[1][0])]:
+        pick_up_locs_dict[int(line[0])] = [int(friend) for friend in line[1:]]
+    return tour, pick_up_locs_dict
+
+
+def _write_atomic(path, data):
+    """Write through a temporary file in the same directory, then rename it over path"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        # open may have failed before creating it
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+
+
+class SolutionSink:
+    """
+    Buffered writer for the solutions of many instances.
+
+    Solutions are formatted like `write_ptp_solution_to_out` and kept in memory
+    until `buffer_size` of them are pending, then written in one go:
+        - as individual `.out` files under out_dir, each one written to a
+          temporary file and renamed, so a reader never sees half a file;
+        - or appended to a single archive file (see `SolutionArchive`).
+
+    Parameters:
+        out_dir (str): Directory of the `.out` files, default ./outputs.
+        archive (str): Path of an archive file. When given, solutions go to the
+            archive instead of individual files.
+        buffer_size (int): Number of solutions kept before writing.
+
+    Examples:
+        with SolutionSink(archive='outputs/sweep.ptpa') as sink:
+            for in_file in in_files:
+                sink.add(in_file, tour, pick_up_locs_dict)
+    """
+
+    def __init__(self, out_dir=None, archive=None, buffer_size=256):
+        self.archive = archive
+        self.out_dir = out_dir or os.path.join(os.getcwd(), OUTPUT_FILE_DIRECTORY)
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.written = 0
+
+        # create the output directory once, not once per solution
+        directory = os.path.dirname(os.path.abspath(archive)) if archive else self.out_dir
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, in_file, tour, pick_up_locs_dict):
+        """Queue the solution of in_file"""
+        self.add_text(solution_name(in_file), ptp_solution_to_str(tour, pick_up_locs_dict))
+
+    def add_text(self, name, data):
+        """Queue an already formatted solution under name"""
+        self.buffer.append((name, data))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write every pending solution"""
+        if not self.buffer:
+            return
+        if self.archive:
+            self._flush_archive()
+        else:
+            for name, data in self.buffer:
+                _write_atomic(os.path.join(self.out_dir, name + '.out'), data)
+        self.written += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+
+    def _flush_archive(self):
+        """
+        Append the pending records, then their index entries.
+
+        The data is synced before the index, so after a crash the index only
+        ever points at complete records; unindexed bytes are simply ignored.
+        """
+        records = []
+        entries = []
+        with open(self.archive, 'ab') as f:
+            offset = f.tell()
+            for name, data in self.buffer:
+                record = (data + '\n').encode()
+                entries.append(f"{name}\t{offset}\t{len(record)}\n")
+                records.append(record)
+                offset += len(record)
+            f.write(b''.join(records))
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.archive + ARCHIVE_INDEX_SUFFIX, 'a+') as f:
+            # terminate a line left unfinished by a crash, so it stays ignored
+            if f.tell() > 0:
+                f.seek(f.tell() - 1)
+                if f.read(1) != '\n':
+                    entries.insert(0, '\n')
+            f.write(''.join(entries))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class SolutionArchive:
+    """
+    Random-access reader of an archive written by `SolutionSink`.
+
+    The archive is two files: the concatenated solutions, and an index file
+    (archive path + '.idx') with one `name<TAB>offset<TAB>length` line per
+    solution. Only the small index is read up front; each solution is then
+    read with a single seek. When a name was written more than once, the
+    latest solution wins.
+
+    Parameters:
+        archive (str): Path of the archive file.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.index = {}
+        with open(archive + ARCHIVE_INDEX_SUFFIX, 'r') as f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                # a line cut short by a crash is skipped
+                if len(fields) != 3 or not line.endswith('\n'):
+                    continue
+                self.index[fields[0]] = (int(fields[1]), int(fields[2]))
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return solution_name(name) in self.index
+
+    def names(self):
+        return list(self.index)
+
+    def read_text(self, name):
+        """Content of the `.out` file of name (an input file name or its base name)"""
+        offset, length = self.index[solution_name(name)]
+        with open(self.archive, 'rb') as f:
+            f.seek(offset)
+            return f.read(length).decode().rstrip('\n')
+
+    def read(self, name):
+        """Solution of name as (tour, pick_up_locs_dict)"""
+        return parse_ptp_solution(self.read_text(name))
+
+    def extract(self, out_dir=None):
+        """Write every solution of the archive as an individual `.out` file"""
+        with SolutionSink(out_dir=out_dir) as sink:
+            for name in self.index:
+                sink.add_text(name, self.read_text(name))
@@ -0,0 +1,635 @@
+"""
+Long-running local solve service that keeps instances and caches warm.
+
+Every CLI run re-imports NetworkX, parses its inputs and runs Dijkstra again
+before solving anything. The service pays that once: it listens on a Unix
+socket (or a localhost TCP port) and answers JSON requests, one per line,
+with one JSON response per line:
+
+    {"id": 1, "op": "load", "file": "inputs/6.in"}
+    {"id": 2, "op": "solve", "instance": "6", "problem": "ptp"}
+    {"id": 3, "op": "validate", "instance": "6", "tour": [...], "pick_up_locs_dict": {...}}
+    {"id": 4, "op": "update", "instance": "6", "add_homes": [12], "edges": [[3, 7, 12.0]]}
+    {"id": 5, "op": "metrics"}
+
+Responses carry the request id and either "result" or "error". Requests of
+one connection may be pipelined, their responses come back as they finish.
+
+An asyncio front end reads the requests; solves run in a process pool (see
+`preload_solvers`). Every worker keeps the graphs it has parsed and the
+distances between the terminals of the last home set it solved, keyed by the
+instance version, so a repeated PHP solve only runs the M-TSP solver. Updates
+go through `IncrementalPHP` in the service process and bump the version, the
+workers then replay the edge changes on their copy. Validation uses one
+`SolutionValidator` per instance, kept until the next update.
+
+The worker caches are least recently used: at most WORKER_INSTANCES graphs
+and WORKER_VALIDATORS validators (one per home set) per graph. Every job
+lists the instances still loaded, a worker drops the others.
+
+Solves follow the limits of `SupervisedSolve`: a timeout per attempt, a memory
+limit per worker (RLIMIT_AS) and the fallback chain of the backend. A pool
+whose worker died (e.g. killed by the OOM killer) or ran over the timeout is
+replaced, losing the warm caches of every worker, and a job lost with a dead
+worker is retried once.
+
+Examples:
+    python solve_service.py --socket solve.sock --workers 4 --load inputs/*.in
+    python solve_service.py --socket solve.sock --timeout 60 --memory-limit 2048
+    python solve_service.py --socket solve.sock --send '{"op": "solve", "instance": "6"}'
+
+    with ServiceClient(path='solve.sock') as client:
+        result = client.call('solve', instance='6', problem='php')
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+DEFAULT_SOCKET = 'solve_service.sock'
+# Longest request or response line, a tour of a large instance is long
+LINE_LIMIT = 64 << 20
+
+# PHP backends that run on precomputed terminal distances, by M-TSP solver
+TSP_SOLVERS = {'php': ('mtsp_dp', 'mtsp_dp'),
+               'php_heuristic': ('tsp_heuristics', 'heuristic_tsp'),
+               'php_clustered': ('cluster_tsp', 'cluster_tsp')}
+# Graphs a worker keeps, and validators it keeps per graph, least recently used first out
+WORKER_INSTANCES = 8
+WORKER_VALIDATORS = 4
+
+
+class ServiceError(Exception):
+    """The service answered a request with an error"""
+
+
+class ServiceMetrics:
+    """
+    Request counts, throughput and latency of the service.
+
+    Parameters:
+        window (int): Latencies kept per operation for the percentiles.
+        recent (float): Seconds over which recent_throughput is measured.
+    """
+
+    def __init__(self, window=1000, recent=60.0):
+        self.started = time.monotonic()
+        self.recent = recent
+        self.window = window
+        self.requests = {}
+        self.errors = {}
+        self.latencies = {}
+        self.finished = deque()
+        self.in_flight = 0
+
+    def record(self, op, seconds, ok=True):
+        now = time.monotonic()
+        self.requests[op] = self.requests.get(op, 0) + 1
+        if not ok:
+            self.errors[op] = self.errors.get(op, 0) + 1
+        self.latencies.setdefault(op, deque(maxlen=self.window)).append(seconds)
+        self.finished.append(now)
+        while self.finished and self.finished[0] < now - self.recent:
+            self.finished.popleft()
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: uptime, requests and errors (totals and by operation),
+                in_flight, throughput (requests per second since the start),
+                recent_throughput (over the last `recent` seconds) and latency,
+                {count, mean, p50, p95, max} seconds by operation.
+        """
+        now = time.monotonic()
+        uptime = now - self.started
+        total = sum(self.requests.values())
+        recent = sum(1 for t in self.finished if t >= now - self.recent)
+        latency = {}
+        for op, samples in self.latencies.items():
+            ordered = sorted(samples)
+            latency[op] = {'count': self.requests[op], 'mean': sum(ordered) / len(ordered),
+                           'p50': _percentile(ordered, 0.5), 'p95': _percentile(ordered, 0.95),
+                           'max': ordered[-1]}
+        return {'uptime': uptime, 'requests': total, 'errors': sum(self.errors.values()),
+                'requests_by_op': dict(self.requests), 'errors_by_op': dict(self.errors),
+                'in_flight': self.in_flight,
+                'throughput': total / uptime if uptime else 0.0,
+                'recent_throughput': recent / min(uptime, self.recent) if uptime else 0.0,
+                'latency': latency}
+
+
+def _percentile(ordered, q):
+    """Nearest-rank percentile of sorted samples"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+class LoadedInstance:
+    """
+    An instance resident in the service.
+
+    Attributes:
+        key (int): Unique per load, with the number of edge changes it names
+            a version of the graph in the worker caches.
+        edge_changes (list): Every (u, v, weight) update since the load, in order.
+    """
+
+    def __init__(self, key, name, file, G, H, alpha):
+        self.key = key
+        self.name = name
+        self.file = file
+        self.G = G
+        self.H = list(H)
+        self.alpha = alpha
+        self.edge_changes = []
+        self.lock = asyncio.Lock()
+        self.validator = None
+        self.incremental = None
+
+    def describe(self):
+        return {'instance': self.name, 'file': self.file, 'n': self.G.number_of_nodes(),
+                'homes': len(self.H), 'alpha': self.alpha, 'edge_changes': len(self.edge_changes)}
+
+    def job(self, problem, backend, homes, gap_tolerance, live_keys):
+        """
+        What a worker needs to solve this instance, see `_solve_job`.
+        live_keys are the keys of every loaded instance, the worker evicts the rest.
+        """
+        return {'key': self.key, 'file': self.file, 'edge_changes': list(self.edge_changes),
+                'H': list(self.H), 'homes': list(homes) if homes is not None else list(self.H),
+                'alpha': self.alpha, 'problem': problem, 'backend': backend,
+                'gap_tolerance': gap_tolerance, 'live_keys': list(live_keys)}
+
+
+# --- Worker side ---
+# key -> {'version', 'G', 'shared', 'validators'} of the instances a worker has seen,
+# least recently used first
+_worker_instances = {}
+
+
+def _touch(cache, key, value, limit):
+    """Store value under key as the most recently used entry, evict the oldest over limit"""
+    cache.pop(key, None)
+    cache[key] = value
+    while len(cache) > limit:
+        del cache[next(iter(cache))]
+    return value
+
+
+def _worker_instance(job):
+    """The worker's copy of an instance at the version of the job, and whether it was cached"""
+    from student_utils import input_file_to_instance
+    live_keys = set(job['live_keys'])
+    for key in [key for key in _worker_instances if key not in live_keys]:
+        del _worker_instances[key]
+    version = len(job['edge_changes'])
+    entry = _worker_instances.get(job['key'])
+    if entry is not None and entry['version'] == version:
+        return _touch(_worker_instances, job['key'], entry, WORKER_INSTANCES), True
+    if entry is not None and entry['version'] < version:
+        G = entry['G']
+        changes = job['edge_changes'][entry['version']:]
+    else:
+        G = input_file_to_instance(job['file'])[0]
+        changes = job['edge_changes']
+    for u, v, weight in changes:
+        G[u][v]['weight'] = weight
+        if G.has_edge(v, u):
+            G[v][u]['weight'] = weight
+    entry = {'version': version, 'G': G, 'shared': None, 'validators': {}}
+    return _touch(_worker_instances, job['key'], entry, WORKER_INSTANCES), False
+
+
+def _solve_job(job):
+    """Solve one request in a pool worker. Returns the result of a solve response."""
+    import importlib
+    from backends import get_backend
+    from home_sets import SharedDistances
+    from solution_validator import SolutionValidator
+    from solver_stats import SolverStats
+
+    start_time = time.perf_counter()
+    entry, warm = _worker_instance(job)
+    G, H, alpha = entry['G'], job['homes'], job['alpha']
+    backend = get_backend(job['backend'])
+    stats = SolverStats()
+    solve_start = time.perf_counter()
+    if backend.name in TSP_SOLVERS:
+        shared = entry['shared']
+        if shared is None or not set(H) <= set(shared.terminals):
+            shared = entry['shared'] = SharedDistances(G, sorted(set(job['H']) | set(H)), stats=stats)
+        else:
+            stats.add('service.warm_distances')
+        module, name = TSP_SOLVERS[backend.name]
+        tsp_solver = getattr(importlib.import_module(module), name)
+        tour, pick_up_locs_dict = shared.solve(H, tsp_solver=tsp_solver, stats=stats), {}
+    else:
+        tour, pick_up_locs_dict = backend.run(G, H, alpha, stats=stats, gap_tolerance=job['gap_tolerance'])
+    solve_seconds = time.perf_counter() - solve_start
+
+    homes_key = tuple(sorted(H))
+    validator = entry['validators'].get(homes_key) or SolutionValidator(G, H, alpha)
+    _touch(entry['validators'], homes_key, validator, WORKER_VALIDATORS)
+    is_legitimate, driving_cost, walking_cost = validator.analyze(tour, pick_up_locs_dict)
+    return {'backend': backend.name, 'tour': tour,
+            'pick_up_locs_dict': {str(k): list(v) for k, v in pick_up_locs_dict.items()},
+            'legitimate': is_legitimate, 'driving_cost': driving_cost, 'walking_cost': walking_cost,
+            'cost': driving_cost + walking_cost, 'solve_seconds': solve_seconds,
+            'seconds': time.perf_counter() - start_time, 'warm': warm, 'worker': os.getpid(),
+            'counters': stats.as_dict()}
+
+
+def _init_worker(memory_limit=None):
+    from supervisor import preload_solvers, _limit_memory
+    preload_solvers()
+    if memory_limit is not None:
+        # counted from here, so the worker caches share the limit with the solves
+        _limit_memory(memory_limit)
+
+
+# --- Service side ---
+class SolveService:
+    """
+    The service: resident instances, the worker pool and the request handlers.
+
+    Parameters:
+        workers (int): Solver processes, default os.cpu_count().
+        timeout (float): Wall-clock seconds of a solve attempt, None for no limit.
+        memory_limit (int): Bytes of address space a worker may allocate after
+            its start, None for no limit. Also the memory budget of the exact
+            first solve of `op_update`, by default the available memory.
+        fallback (bool): Retry a solve over its limits with the fallback of
+            its backend, see `solver_chain`.
+
+    Examples:
+        service = SolveService(workers=4, timeout=60)
+        asyncio.run(service.run(path='solve.sock'))
+    """
+
+    OPS = ('load', 'unload', 'instances', 'solve', 'validate', 'update', 'metrics')
+
+    def __init__(self, workers=None, timeout=None, memory_limit=None, fallback=True):
+        self.workers = workers or os.cpu_count()
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.fallback = fallback
+        self.executor = self._new_executor()
+        self.pool_restarts = 0
+        self.instances = {}
+        self.metrics = ServiceMetrics()
+        self.server = None
+        self._keys = itertools.count()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(self.memory_limit,))
+
+    def _restart_pool(self, executor):
+        """Replace a broken or stuck pool with a new one, killing its workers. Once per pool."""
+        if self.executor is not executor:
+            return
+        self.executor = self._new_executor()
+        self.pool_restarts += 1
+        # the pool has no public way to stop a running worker
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_job(self, job):
+        """
+        Run `_solve_job` in the pool within the timeout. The pool is replaced
+        after a timeout, and after a dead worker, then the job is retried once.
+        """
+        from supervisor import SolveTimeout
+        loop = asyncio.get_running_loop()
+        for retry in (False, True):
+            executor = self.executor
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(executor, _solve_job, job), self.timeout)
+            except asyncio.TimeoutError:
+                self._restart_pool(executor)
+                raise SolveTimeout(f"no result within {self.timeout} seconds") from None
+            except BrokenProcessPool:
+                self._restart_pool(executor)
+                if retry:
+                    raise
+
+    def _instance(self, request):
+        name = request.get('instance')
+        if name not in self.instances:
+            raise ValueError(f"instance {name!r} is not loaded")
+        return self.instances[name]
+
+    # --- Handlers of the ops, each returns the result of a response ---
+    async def op_load(self, request):
+        """{file, instance (default: the file name without .in)}"""
+        from student_utils import input_file_to_instance
+        file = os.path.abspath(request['file'])
+        name = request.get('instance') or os.path.splitext(os.path.basename(file))[0]
+        G, H, alpha = await asyncio.to_thread(input_file_to_instance, file)
+        self.instances[name] = LoadedInstance(next(self._keys), name, file, G, H, alpha)
+        return self.instances[name].describe()
+
+    async def op_unload(self, request):
+        instance = self._instance(request)
+        del self.instances[instance.name]
+        if instance.incremental is not None:
+            instance.incremental.close()
+        return {'instance': instance.name}
+
+    async def op_instances(self, request):
+        return [instance.describe() for instance in self.instances.values()]
+
+    async def op_solve(self, request):
+        """
+        {instance, problem ('php' or 'ptp', default 'php'), backend (default: selected,
+        see `select_backend`), homes (default: the instance's), gap_tolerance}.
+        The result lists every attempt like `SupervisedSolve.attempts`.
+        """
+        from backends import select_backend
+        from supervisor import SolveTimeout, solver_chain
+        instance = self._instance(request)
+        problem = request.get('problem', 'php')
+        homes = request.get('homes')
+        num_homes = len(homes) if homes is not None else len(instance.H)
+        backend = select_backend(problem, instance.G.number_of_nodes(), num_homes,
+                                 memory_budget=self.memory_limit, time_budget=self.timeout,
+                                 override=request.get('backend')).name
+        if homes is not None and problem == 'ptp':
+            raise ValueError("homes can only be given for php")
+        solvers = solver_chain(backend, self.fallback)
+        attempts = []
+        for i, solver in enumerate(solvers):
+            job = instance.job(problem, solver, homes, request.get('gap_tolerance'),
+                               [loaded.key for loaded in self.instances.values()])
+            start_time = time.perf_counter()
+            try:
+                result = await self._run_job(job)
+            except (SolveTimeout, MemoryError, BrokenProcessPool) as e:
+                attempts.append({'solver': solver, 'seconds': time.perf_counter() - start_time,
+                                 'error': f"{type(e).__name__}: {e}"})
+                if i == len(solvers) - 1:
+                    raise
+                continue
+            attempts.append({'solver': solver, 'seconds': time.perf_counter() - start_time, 'error': None})
+            result['attempts'] = attempts
+            return result
+
+    async def op_validate(self, request):
+        """{instance, tour, pick_up_locs_dict (default: none, i.e. PHP)}"""
+        from solution_validator import SolutionValidator
+        instance = self._instance(request)
+        tour = request['tour']
+        pick_up_locs_dict = {int(k): v for k, v in (request.get('pick_up_locs_dict') or {}).items()}
+        async with instance.lock:
+            if instance.validator is None:
+                instance.validator = SolutionValidator(instance.G, instance.H, instance.alpha)
+            is_legitimate, driving_cost, walking_cost = await asyncio.to_thread(
+                instance.validator.analyze, tour, pick_up_locs_dict)
+        return {'legitimate': is_legitimate, 'driving_cost': driving_cost,
+                'walking_cost': walking_cost, 'cost': driving_cost + walking_cost}
+
+    async def op_update(self, request):
+        """
+        {instance, edges: [[u, v, weight], ...], add_homes, remove_homes}.
+        Returns the PHP tour repaired by `IncrementalPHP` and its driving cost.
+        """
+        instance = self._instance(request)
+        edges = [(u, v, float(weight)) for u, v, weight in request.get('edges', [])]
+        async with instance.lock:
+            if instance.incremental is None:
+                self._check_first_solve(instance)
+            tour = await asyncio.to_thread(self._update, instance, edges,
+                                           request.get('add_homes', []), request.get('remove_homes', []))
+        return {'tour': tour, 'driving_cost': instance.alpha * instance.incremental.driving_distance,
+                **instance.describe()}
+
+    def _check_first_solve(self, instance):
+        """
+        IncrementalPHP starts from an exact solve in this process, refuse it
+        when its estimated time or memory is over the limits of a solve.
+        """
+        from backends import get_backend
+        from memory_accounting import available_memory
+        memory_budget = self.memory_limit if self.memory_limit is not None else available_memory()
+        reason = get_backend('php').rejects(instance.G.number_of_nodes(), len(instance.H),
+                                            memory_budget=memory_budget, time_budget=self.timeout)
+        if reason is not None:
+            raise ValueError(f"updates need an exact first solve, {reason}")
+
+    @staticmethod
+    def _update(instance, edges, add_homes, remove_homes):
+        from incremental import IncrementalPHP
+        if instance.incremental is None:
+            instance.incremental = IncrementalPHP(instance.G, instance.H)
+        solver = instance.incremental
+        # check every home first, so a bad update leaves the instance untouched
+        homes = set(solver.H)
+        for h in add_homes:
+            if h not in instance.G:
+                raise ValueError(f"node {h} is not in the graph")
+            homes.add(h)
+        for h in remove_homes:
+            if h not in homes:
+                raise ValueError(f"node {h} is not a home")
+            homes.discard(h)
+        tour = solver.tour
+        try:
+            if edges:
+                tour = solver.update_edges(edges)
+                instance.edge_changes.extend(edges)
+            for h in add_homes:
+                tour = solver.add_home(h)
+            for h in remove_homes:
+                tour = solver.remove_home(h)
+        finally:
+            # whatever was applied, the homes and the validator follow the solver
+            instance.H = list(solver.H)
+            instance.validator = None
+        return tour
+
+    async def op_metrics(self, request):
+        snapshot = self.metrics.snapshot()
+        snapshot.update(instances=len(self.instances), workers=self.workers, pool_restarts=self.pool_restarts)
+        return snapshot
+
+    async def handle(self, request):
+        """Answer one request, a dict, with a response dict"""
+        start_time = time.perf_counter()
+        op = request.get('op') if isinstance(request, dict) else None
+        response = {'id': request.get('id') if isinstance(request, dict) else None}
+        self.metrics.in_flight += 1
+        try:
+            if op not in self.OPS:
+                raise ValueError(f"unknown op {op!r}, expected one of {', '.join(self.OPS)}")
+            response['result'] = await getattr(self, 'op_' + op)(request)
+        except Exception as e:
+            response['error'] = f"{type(e).__name__}: {e}"
+        finally:
+            self.metrics.in_flight -= 1
+        self.metrics.record(op if op in self.OPS else 'invalid', time.perf_counter() - start_time,
+                            ok='error' not in response)
+        return response
+
+    async def _connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def answer(line):
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                self.metrics.record('invalid', 0.0, ok=False)
+                response = {'id': None, 'error': f"JSONDecodeError: {e}"}
+            else:
+                response = await self.handle(request)
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.create_task(answer(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # --- Lifecycle ---
+    async def start(self, path=None, host='127.0.0.1', port=None):
+        """Listen on the Unix socket path, or on host:port when a port is given"""
+        if port is not None:
+            self.server = await asyncio.start_server(self._connection, host, port, limit=LINE_LIMIT)
+        else:
+            path = path or DEFAULT_SOCKET
+            if os.path.exists(path):
+                os.unlink(path)
+            self.server = await asyncio.start_unix_server(self._connection, path, limit=LINE_LIMIT)
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for instance in self.instances.values():
+            if instance.incremental is not None:
+                instance.incremental.close()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    async def run(self, path=None, host='127.0.0.1', port=None, load=()):
+        """Start, load the given input files and serve until cancelled"""
+        await self.start(path=path, host=host, port=port)
+        for file in load:
+            response = await self.handle({'op': 'load', 'file': file})
+            print(response.get('error') or f"Loaded {response['result']['instance']}", flush=True)
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+
+class ServiceClient:
+    """
+    Blocking client of a running service, one request at a time.
+
+    Examples:
+        with ServiceClient(path='solve.sock') as client:
+            client.call('load', file='inputs/6.in')
+            print(client.call('solve', instance='6')['cost'])
+    """
+
+    def __init__(self, path=None, host='127.0.0.1', port=None, timeout=None):
+        if port is not None:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(path or DEFAULT_SOCKET)
+        self.file = self.sock.makefile('rb')
+        self._ids = itertools.count(1)
+
+    def request(self, request):
+        """Send a request dict, return the response dict"""
+        request = dict(request)
+        request.setdefault('id', next(self._ids))
+        self.sock.sendall(json.dumps(request).encode() + b'\n')
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("the service closed the connection")
+        return json.loads(line)
+
+    def call(self, op, **fields):
+        """Send one request, return its result or raise ServiceError"""
+        response = self.request({'op': op, **fields})
+        if 'error' in response:
+            raise ServiceError(response['error'])
+        return response['result']
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve PHP/PTP solve requests with warm instances and caches.")
+    parser.add_argument('--socket', default=None, metavar='PATH',
+                        help=f"Unix socket to listen on (default: ./{DEFAULT_SOCKET})")
+    parser.add_argument('--port', type=int, default=None,
+                        help="listen on this localhost TCP port instead of a Unix socket")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of solver processes (default: all cores)")
+    parser.add_argument('-t', '--timeout', type=float, default=None, metavar='SECONDS',
+                        help="wall-clock limit of every solve attempt (default: none)")
+    parser.add_argument('--memory-limit', type=float, default=None, metavar='MIB',
+                        help="memory limit of every solver process (default: none)")
+    parser.add_argument('--no-fallback', action='store_true',
+                        help="do not retry a solve over its limits with a cheaper solver")
+    parser.add_argument('--load', nargs='*', default=[], metavar='FILE',
+                        help="input files to load at start")
+    parser.add_argument('--send', default=None, metavar='JSON',
+                        help="send one request to a running service and print the response")
+    args = parser.parse_args(argv)
+
+    if args.send is not None:
+        with ServiceClient(path=args.socket, port=args.port) as client:
+            response = client.request(json.loads(args.send))
+        print(json.dumps(response, indent=2))
+        return 1 if 'error' in response else 0
+
+    from memory_accounting import MiB
+    memory_limit = int(args.memory_limit * MiB) if args.memory_limit is not None else None
+    service = SolveService(workers=args.workers, timeout=args.timeout, memory_limit=memory_limit,
+                           fallback=not args.no_fallback)
+    where = f"127.0.0.1:{args.port}" if args.port is not None else (args.socket or DEFAULT_SOCKET)
+    print(f"Serving on {where} with {service.workers} workers", flush=True)
+    try:
+        asyncio.run(service.run(path=args.socket, port=args.port, load=args.load))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
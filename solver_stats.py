@@ -0,0 +1,61 @@
+class SolverStats:
+    """
+    Deterministic work counters of a solve.
+
+    Solvers count in local integers and add them here once, at the end of
+    the hot loop, so counting never slows the loop down. Counter names are
+    prefixed by the component that produced them:
+        - mtsp_dp.states_reached: DP states (mask, v) that were expanded.
+        - mtsp_dp.states_pruned: possible DP states (v in mask, node 0 in mask)
+          skipped because no path reached them, e.g. for lack of an edge.
+        - mtsp_dp.relaxations: transitions dp[mask][v] -> dp[mask | u][u] tried.
+        - dijkstra.runs, dijkstra.heap_pushes, dijkstra.heap_pops
+        - ptp.moves_evaluated, ptp.moves_accepted, ptp.restarts
+        - ptp.stops_pruned: pick-up stops dominated by another stop.
+        - reduction.pruned, reduction.contracted: nodes removed by graph_reduction.
+        - heuristic_tsp.moves: 2-opt and Or-opt moves of the DP fallback.
+        - cluster_tsp.clusters, cluster_tsp.exact_clusters, cluster_tsp.medoid_iterations,
+          cluster_tsp.boundary_moves: see cluster_tsp.
+        - service.warm_distances: solves of solve_service on cached terminal distances.
+
+    Examples:
+        stats = SolverStats()
+        tour = php_solver_from_tsp(G, H, stats=stats)
+        print(stats.as_dict())
+    """
+
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+
+    def add(self, name, value=1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def update(self, counts):
+        """Add every counter of a dict"""
+        for name, value in counts.items():
+            self.add(name, value)
+
+    def merge(self, other):
+        """Add every counter of another SolverStats"""
+        self.update(other.counts)
+
+    def __getitem__(self, name):
+        return self.counts.get(name, 0)
+
+    def __bool__(self):
+        return bool(self.counts)
+
+    def as_dict(self):
+        return dict(sorted(self.counts.items()))
+
+    def __repr__(self):
+        return f"SolverStats({self.as_dict()})"
+
+    @staticmethod
+    def aggregate(count_dicts):
+        """Counter totals over many solves, e.g. all records of a batch"""
+        total = SolverStats()
+        for counts in count_dicts:
+            if counts:
+                total.update(counts)
+        return total
@@ -0,0 +1,108 @@
+"""
+Startup-time benchmark of the entry points.
+
+Every entry point is imported in a fresh interpreter, several times, and the
+median wall time is reported after subtracting the bare interpreter startup.
+The heavy third-party modules loaded by each entry point are listed too.
+
+Usage:
+    python startup_benchmark.py
+    python startup_benchmark.py -o startup.json
+    python startup_benchmark.py --baseline startup.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from utils import write_to_file
+
+# name -> statement run by a fresh interpreter
+ENTRY_POINTS = {
+    'cli': 'import ptp_cli',
+    'batch_runner': 'import batch_runner',
+    'solver_worker': 'import supervisor; supervisor.preload_solvers()',
+}
+
+HEAVY_MODULES = ('matplotlib', 'networkx', 'numpy', 'scipy')
+
+
+def _run(statement):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', statement], check=True)
+    return time.perf_counter() - start
+
+
+def heavy_modules_loaded(statement):
+    """The HEAVY_MODULES in sys.modules after running statement"""
+    probe = (f"{statement}\nimport sys, json\n"
+             f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    out = subprocess.run([sys.executable, '-c', probe], check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def startup_times(entry_points=None, repeat=5):
+    """
+    Returns:
+        dict: Results with the bare interpreter time and, per entry point,
+            the median and min import seconds above it and the heavy modules loaded.
+    """
+    entry_points = entry_points or ENTRY_POINTS
+    interpreter = statistics.median(_run('pass') for _ in range(repeat))
+    results = {'python': sys.version.split()[0], 'interpreter': interpreter, 'entry_points': {}}
+    for name, statement in entry_points.items():
+        times = [_run(statement) - interpreter for _ in range(repeat)]
+        results['entry_points'][name] = {
+            'statement': statement,
+            'median': statistics.median(times),
+            'min': min(times),
+            'heavy_modules': heavy_modules_loaded(statement),
+        }
+    return results
+
+
+def format_results(results):
+    lines = [f"Interpreter startup: {1000 * results['interpreter']:.1f} ms"]
+    for name, record in results['entry_points'].items():
+        lines.append(f"{name:<15} +{1000 * record['median']:7.1f} ms (min {1000 * record['min']:.1f} ms), "
+                     f"loads {', '.join(record['heavy_modules']) or 'no heavy modules'}")
+    return '\n'.join(lines)
+
+
+def compare_to_baseline(results, baseline):
+    """One line per entry point with its startup time against the baseline"""
+    lines = []
+    for name, record in results['entry_points'].items():
+        before = baseline['entry_points'].get(name)
+        if before is None:
+            continue
+        change = record['min'] - before['min']
+        lines.append(f"{name:<15} {1000 * before['min']:7.1f} ms -> {1000 * record['min']:7.1f} ms "
+                     f"({1000 * change:+.1f} ms)")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of the entry points.")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="runs per entry point (default: %(default)s)")
+    parser.add_argument('-o', '--output', default=None, help="write the results JSON to this file")
+    parser.add_argument('--baseline', default=None, help="baseline results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    results = startup_times(repeat=args.repeat)
+    print(format_results(results))
+    if args.output:
+        write_to_file(args.output, json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        print(f"\nAgainst {args.baseline}:")
+        print(compare_to_baseline(results, baseline))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
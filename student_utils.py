@@ -1,6 +1,6 @@
-import networkx as nx
-import matplotlib.pyplot as plt
 from utils import *
+from profiling import span, traced
+from memory_accounting import checkpoint
 # import numpy as np
 
 def data_parser(input_data):
@@ -31,10 +31,12 @@ def weighted_edge_list_to_graph(edge_list):
     For technical reasons, the graph is made directed here.
     But it is equivalent to an undirected one by construction.
     """
+    import networkx as nx
     G = nx.DiGraph()
     G.add_weighted_edges_from(edge_list)
     return G
 
+@traced()
 def input_file_to_instance(file):
     """
     Create an instance of the PTP problem from a specific file.
@@ -55,9 +57,12 @@ def input_file_to_instance(file):
         Alpha and H are also stored in the graph G as attributes.
         You can access them via `G.graph['alpha']` and `G.graph['H']`, respectively.
     """
-    input_data = read_file(file)
-    alpha, _, _, H, edge_list = data_parser(input_data)
-    G = weighted_edge_list_to_graph(edge_list)
+    with span('read_file'):
+        input_data = read_file(file)
+    with span('data_parser'):
+        alpha, _, _, H, edge_list = data_parser(input_data)
+    with span('build_graph'):
+        G = weighted_edge_list_to_graph(edge_list)
     G.graph['H'] = H
     G.graph['alpha'] = alpha
     return G, H, alpha
@@ -67,6 +72,7 @@ def is_metric(G):
     Check whether a given graph G is metric or not,
     i.e., whether triangle inequality holds.
     """
+    import networkx as nx
     d = nx.floyd_warshall(G)
     for u, v, data in G.edges(data=True):
         if abs(d[u][v] - data['weight']) >= 0.001:
@@ -77,6 +83,7 @@ def is_connected(G):
     """
     Check whether a graph G is connected or not
     """
+    import networkx as nx
     return nx.is_connected(nx.to_undirected(G))
 
 def is_valid_input(file: str) -> tuple:
@@ -190,6 +197,7 @@ def is_valid_input(file: str) -> tuple:
     return is_valid, message
 
 
+@traced()
 def analyze_solution(G, H, alpha, tour, pick_up_locs_dict):
     """
     Analyze the solution for a given instance of the problem.
@@ -243,7 +251,10 @@ def analyze_solution(G, H, alpha, tour, pick_up_locs_dict):
         driving_cost += float(alpha * G.get_edge_data(tour[i-1], tour[i])['weight'])
     # every friend should get picked up exactly once    
     if pick_up_locs_dict:
-        all_shortest_path_lengths = nx.floyd_warshall(G)
+        import networkx as nx
+        with span('floyd_warshall'):
+            all_shortest_path_lengths = nx.floyd_warshall(G)
+        checkpoint('analyze_solution.floyd_warshall')
         friends_get_picked_up = []
         for pick_up_loc in pick_up_locs_dict:
             friends = pick_up_locs_dict[pick_up_loc]
@@ -273,23 +284,33 @@ def analyze_solution(G, H, alpha, tour, pick_up_locs_dict):
         return False, float('infinity'), float('infinity')
 
 
-def write_ptp_solution_to_out(tour, pick_up_locs_dict, in_file):
-    out_dir = os.path.join(os.getcwd(), OUTPUT_FILE_DIRECTORY)
-    if not os.path.exists(out_dir):
-        os.makedirs(out_dir)
-    file_name = in_file.split('.')[0] + '.out'
-    out_file_path = os.path.join(out_dir, file_name)
+def ptp_solution_to_str(tour, pick_up_locs_dict):
+    """
+    Content of the output file of a solution
+    """
     data = []
     data.append(' '.join(str(i) for i in tour))
     data.append(str(len(pick_up_locs_dict)))
     for pick_up_loc in pick_up_locs_dict:
         friends = pick_up_locs_dict[pick_up_loc]
         data.append(str(pick_up_loc) + ' ' + ' '.join(str(i) for i in friends))
-    write_to_file(out_file_path, '\n'.join(data))
+    return '\n'.join(data)
+
+
+def write_ptp_solution_to_out(tour, pick_up_locs_dict, in_file):
+    out_dir = os.path.join(os.getcwd(), OUTPUT_FILE_DIRECTORY)
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    file_name = in_file.split('.')[0] + '.out'
+    out_file_path = os.path.join(out_dir, file_name)
+    write_to_file(out_file_path, ptp_solution_to_str(tour, pick_up_locs_dict))
     
 
 def draw_gragh(G, with_weight=True):
     """Draw the graph"""
+    # plotting is only needed here, so matplotlib is not loaded with the solvers
+    import networkx as nx
+    import matplotlib.pyplot as plt
     pos = nx.spring_layout(G)  # positions for all nodes
     nx.draw(G, pos, with_labels=True, node_color='skyblue', node_size=2000, font_size=10)
 
@@ -0,0 +1,228 @@
+import time
+import importlib
+import multiprocessing
+from profiling import profile, attach
+from solver_stats import SolverStats
+from memory_accounting import track_memory
+from backends import get_backend
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Everything a solver worker needs: no plotting, no CLI
+SOLVER_MODULES = ('student_utils', 'php_from_tsp', 'ptp_solver', 'tsp_heuristics', 'cluster_tsp',
+                  'solution_validator')
+
+
+class SolveTimeout(Exception):
+    """The worker did not finish within its wall-clock budget and was killed"""
+
+
+class WorkerMemoryExceeded(MemoryError):
+    """The worker ran out of its memory budget"""
+
+
+class WorkerCrashed(Exception):
+    """The worker exited without a result, e.g. killed by the OOM killer"""
+
+
+def preload_solvers():
+    """
+    Import SOLVER_MODULES. Called before a process pool is created, forked
+    workers inherit them instead of importing them each; as the pool
+    initializer, spawned workers import this surface only.
+    """
+    for name in SOLVER_MODULES:
+        importlib.import_module(name)
+
+
+def run_solver(solver, G, H, alpha, stats=None, gap_tolerance=None):
+    """
+    Run a solver by name, always returning (tour, pick_up_locs_dict).
+
+    Solvers are the backends of the registry (see backends.py):
+        php: php_solver_from_tsp, exact M-TSP by mtsp_dp.
+        php_heuristic: php_solver_from_tsp with heuristic_tsp instead of mtsp_dp.
+        php_clustered: php_solver_from_tsp with cluster_tsp, for the largest home sets.
+        ptp: ptp_solver.
+        ptp_greedy: greedy_ptp_solver, one local search without restarts.
+
+    gap_tolerance stops the restarts of ptp early, see `ptp_solver`.
+    """
+    return get_backend(solver).run(G, H, alpha, stats=stats, gap_tolerance=gap_tolerance)
+
+
+def solver_chain(solver, fallback=True):
+    """The solvers tried in order: solver, then its fallback (see Backend.fallback)"""
+    solvers = [solver]
+    if fallback and get_backend(solver).fallback is not None:
+        solvers.append(get_backend(solver).fallback)
+    return solvers
+
+
+def solver_version(solver, fallback=True):
+    """
+    Version of a solver and of its fallback, e.g. 'php:3+php_heuristic:2'.
+    Stored results of older versions are solved again (see RunStore).
+    """
+    return '+'.join(f"{name}:{get_backend(name).version}" for name in solver_chain(solver, fallback))
+
+
+def _address_space():
+    """Current virtual memory size of this process in bytes, 0 if unknown"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, AttributeError):
+        return 0
+
+
+def _limit_memory(memory_limit):
+    """Allow this process memory_limit more bytes of address space than it has now"""
+    if resource is None:
+        return
+    limit = _address_space() + memory_limit
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_main(conn, func, args, memory_limit):
+    if memory_limit is not None:
+        _limit_memory(memory_limit)
+    try:
+        result = func(*args)
+    except MemoryError as e:
+        conn.send(('memory', f"{type(e).__name__}: {e}"))
+    except BaseException as e:
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+    else:
+        conn.send(('ok', result))
+    finally:
+        conn.close()
+
+
+def run_supervised(func, args=(), timeout=None, memory_limit=None):
+    """
+    Run func(*args) in a separate worker process and return its result.
+
+    Parameters:
+        func (callable): A module-level function, so it can be sent to the worker.
+        timeout (float): Wall-clock budget in seconds, None for no limit.
+        memory_limit (int): Extra address space in bytes the worker may allocate
+            on top of what it inherits (RLIMIT_AS, POSIX only), None for no limit.
+
+    Raises:
+        SolveTimeout: The budget ran out, the worker has been killed.
+        WorkerMemoryExceeded: The worker raised MemoryError.
+        WorkerCrashed: The worker died without a result.
+        RuntimeError: The worker raised any other exception.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    worker = multiprocessing.Process(target=_worker_main, args=(sender, func, args, memory_limit),
+                                     daemon=True)
+    worker.start()
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            raise SolveTimeout(f"no result within {timeout} seconds")
+        try:
+            status, payload = receiver.recv()
+        except EOFError:
+            worker.join()
+            raise WorkerCrashed(f"worker exited with code {worker.exitcode} without a result") from None
+    finally:
+        if worker.is_alive():
+            worker.kill()
+        worker.join()
+        receiver.close()
+
+    if status == 'memory':
+        raise WorkerMemoryExceeded(payload)
+    if status == 'error':
+        raise RuntimeError(payload)
+    return payload
+
+
+def _solve_in_worker(solver, G, H, alpha, trace_memory, gap_tolerance=None):
+    stats = SolverStats()
+    with profile() as profiler, track_memory(trace=trace_memory) as tracker:
+        tour, pick_up_locs_dict = run_solver(solver, G, H, alpha, stats=stats, gap_tolerance=gap_tolerance)
+    spans = [child.to_dict() for child in profiler.root.children]
+    return tour, pick_up_locs_dict, stats.as_dict(), spans, tracker.to_dict()
+
+
+class SupervisedSolve:
+    """
+    Solve one instance within a time and memory budget, falling back to a
+    cheaper solver (see Backend.fallback) when the budget is exceeded.
+
+    Without timeout and memory_limit the solver runs in this process, as before.
+    Otherwise every attempt runs in its own worker process (see `run_supervised`);
+    its spans are attached to the active profiler.
+
+    Attributes after `solve`:
+        solver_used (str): The solver that produced the answer.
+        attempts (list): {'solver', 'seconds', 'error'} of every attempt, in order.
+        counters (dict): Work counters of the successful attempt.
+        memory (dict): `MemoryTracker.to_dict` of the successful worker, None in-process.
+
+    Examples:
+        supervised = SupervisedSolve('php', timeout=60, memory_limit=2 << 30)
+        tour, pick_up_locs_dict = supervised.solve(G, H, alpha)
+        print(supervised.solver_used)
+    """
+
+    def __init__(self, solver, timeout=None, memory_limit=None, fallback=True, trace_memory=False,
+                 gap_tolerance=None):
+        self.solver = solver
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.fallback = fallback
+        self.trace_memory = trace_memory
+        self.gap_tolerance = gap_tolerance
+        self.solver_used = None
+        self.attempts = []
+        self.counters = {}
+        self.memory = None
+
+    @property
+    def supervised(self):
+        return self.timeout is not None or self.memory_limit is not None
+
+    def solve(self, G, H, alpha, stats=None):
+        """
+        Returns:
+            tuple: (tour, pick_up_locs_dict) of the first attempt within budget.
+
+        Raises:
+            The error of the last attempt when every attempt failed.
+        """
+        solvers = solver_chain(self.solver, self.fallback)
+        for i, solver in enumerate(solvers):
+            start_time = time.time()
+            try:
+                if self.supervised:
+                    tour, pick_up_locs_dict, counters, spans, memory = run_supervised(
+                        _solve_in_worker, (solver, G, H, alpha, self.trace_memory, self.gap_tolerance),
+                        timeout=self.timeout, memory_limit=self.memory_limit)
+                    for span_dict in spans:
+                        attach(span_dict)
+                    self.memory = memory
+                else:
+                    worker_stats = SolverStats()
+                    tour, pick_up_locs_dict = run_solver(solver, G, H, alpha, stats=worker_stats,
+                                                         gap_tolerance=self.gap_tolerance)
+                    counters = worker_stats.as_dict()
+            except (SolveTimeout, MemoryError, WorkerCrashed) as e:
+                self.attempts.append({'solver': solver, 'seconds': time.time() - start_time,
+                                      'error': f"{type(e).__name__}: {e}"})
+                if i == len(solvers) - 1:
+                    raise
+                continue
+            self.attempts.append({'solver': solver, 'seconds': time.time() - start_time, 'error': None})
+            self.solver_used = solver
+            self.counters = counters
+            if stats is not None:
+                stats.update(counters)
+            return tour, pick_up_locs_dict
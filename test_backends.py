@@ -0,0 +1,52 @@
+"""
+Test script for the solver backend registry and the per-instance selection.
+"""
+
+import os
+import pytest
+from backends import Backend, BACKENDS, register_backend, select_backend, backends_for
+from batch_runner import solve_instance
+from memory_accounting import MiB
+
+INPUT_DIR = "inputs"
+
+
+def test_select_backend():
+    assert select_backend('php', 100, 10).name == 'php'
+    # |H| = 20 needs over a GiB of DP tables and far more than a second
+    assert select_backend('php', 100, 20, memory_budget=256 * MiB).name == 'php_heuristic'
+    assert select_backend('php', 100, 20, time_budget=1).name == 'php_heuristic'
+    assert select_backend('php', 100, 40).name == 'php_heuristic'
+    assert select_backend('php', 2000, 1000).name == 'php_clustered'
+    assert select_backend('ptp', 100, 20).name == 'ptp'
+    assert select_backend('ptp', 100, 20, time_budget=1e-6).name == 'ptp_greedy'
+
+    assert select_backend('php', 100, 40, override='php').name == 'php'
+    with pytest.raises(ValueError):
+        select_backend('ptp', 100, 10, override='php')
+    with pytest.raises(ValueError):
+        select_backend('tsp', 100, 10)
+
+
+def test_registered_backend_is_selected():
+    def run(G, H, alpha, stats=None):
+        raise NotImplementedError
+
+    register_backend(Backend('php_exact_test', 'php', run, exact=True,
+                             time_model=lambda n, h: 0, memory_model=lambda n, h: 0, max_homes=5))
+    try:
+        assert [b.name for b in backends_for('php')][:2] == ['php', 'php_exact_test']
+        assert select_backend('php', 100, 4).name == 'php'
+        assert select_backend('php', 100, 4, memory_budget=1).name == 'php_exact_test'
+        assert select_backend('php', 100, 6, memory_budget=1).name != 'php_exact_test'
+    finally:
+        del BACKENDS['php_exact_test']
+
+
+def test_records_backend():
+    file = os.path.join(INPUT_DIR, "1.in")
+    record = solve_instance(file, 'php')
+    assert (record['backend'], record['solver_used']) == ('php', 'php')
+    record = solve_instance(file, 'php', backend='php_heuristic')
+    assert record['legitimate']
+    assert (record['backend'], record['solver_used']) == ('php_heuristic', 'php_heuristic')
@@ -0,0 +1,64 @@
+"""
+Test script for the batch runner: the records of run_batch, in-process and in
+a process pool, and the summary printed at the end.
+"""
+
+import os
+import json
+import tempfile
+import pytest
+from batch_runner import run_batch, summarize
+from php_from_tsp import php_solver_from_tsp
+from student_utils import input_file_to_instance, analyze_solution
+
+INPUT_DIR = "inputs"
+FILES = [os.path.join(INPUT_DIR, name) for name in ["1.in", "6.in", "2.in"]]
+RECORD_KEYS = {'file', 'solver', 'n', 'homes', 'alpha', 'legitimate', 'driving_cost', 'walking_cost', 'cost',
+               'lower_bound', 'gap', 'time', 'tour', 'pick_up_locs_dict', 'error', 'profile', 'counters',
+               'memory', 'dp_estimate', 'backend', 'solver_used', 'attempts', 'cached'}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_php_records_and_summary(workers):
+    with tempfile.TemporaryDirectory() as directory:
+        results_file = os.path.join(directory, "results.jsonl")
+        missing = os.path.join(directory, "missing.in")
+        records = run_batch(FILES + [missing], solver='php', workers=workers, results_file=results_file,
+                            quiet=True)
+        with open(results_file) as f:
+            assert [json.loads(line) for line in f] == records
+
+    by_file = {record['file']: record for record in records}
+    assert sorted(by_file) == ["1.in", "2.in", "6.in", "missing.in"]
+    assert by_file["missing.in"]['error'] is not None and not by_file["missing.in"]['legitimate']
+    for file in FILES:
+        record = by_file[os.path.basename(file)]
+        assert set(record) == RECORD_KEYS
+        G, H, alpha = input_file_to_instance(file)
+        assert (record['n'], record['homes'], record['alpha']) == (G.number_of_nodes(), len(H), alpha)
+        assert record['error'] is None and record['legitimate'] and not record['cached']
+        assert record['backend'] == record['solver_used'] == 'php'
+        assert record['cost'] == pytest.approx(analyze_solution(G, H, alpha, php_solver_from_tsp(G, H), {})[1])
+        assert record['cost'] == record['driving_cost'] + record['walking_cost']
+        assert analyze_solution(G, H, alpha, record['tour'], {})[0]
+        assert record['time'] > 0 and record['counters']['dijkstra.runs'] > 0
+        # the lower bound is opt-in
+        assert record['lower_bound'] is None and record['gap'] is None
+
+    summary = summarize(records)
+    assert "Successfully tested 4 files \n 3 legitimate" in summary
+    average = sum(by_file[os.path.basename(file)]['cost'] for file in FILES) / 3
+    assert f"Average cost: {average:.5f}" in summary
+    assert "1 files failed with an error" in summary
+
+
+def test_ptp_lower_bound_and_solutions():
+    with tempfile.TemporaryDirectory() as directory:
+        records = run_batch(FILES[:2], solver='ptp', workers=1, out_dir=directory, quiet=True,
+                            lower_bound=True)
+        assert sorted(os.listdir(directory)) == ["1.out", "6.out"]
+    for record in records:
+        assert record['legitimate'] and record['solver_used'] == 'ptp'
+        assert 0 < record['lower_bound'] <= record['cost'] + 1e-6
+        assert 0 <= record['gap'] < 1
+    assert "Average gap to the lower bound" in summarize(records)
@@ -0,0 +1,37 @@
+"""
+Smoke test of the scaling benchmark on tiny sizes: the shape of its results
+and the regression check against a baseline.
+"""
+
+import copy
+from benchmark import run_benchmark, compare_to_baseline, STAGES
+
+
+def test_benchmark_results_and_baseline():
+    results = run_benchmark([20, 30], [3, 4], [3], repeat=2, warmup=0, include_bundled=False, verbose=False)
+    assert set(results['meta']) == {'python', 'machine', 'repeat', 'warmup', 'created'}
+    assert [case['name'] for case in results['cases']] == ['gen_n20_h3_d3', 'gen_n20_h4_d3',
+                                                           'gen_n30_h3_d3', 'gen_n30_h4_d3']
+    for case in results['cases']:
+        assert case['legitimate'] and case['source'] == 'generated'
+        assert set(case['stages']) == set(STAGES)
+        assert 0 < case['time_min'] <= case['time_median']
+        assert case['peak_memory'] > 0 and case['counters']['dijkstra.runs'] == case['homes'] + 1
+
+    assert compare_to_baseline(results, results) == []
+
+    slower = copy.deepcopy(results)
+    first, second, third, fourth = slower['cases']
+    first['time_min'] = 2 * first['time_min'] + 1
+    second['time_min'] += 0.001  # under min_seconds, noise
+    third['cost'] += 1
+    fourth['legitimate'] = False
+    fourth['peak_memory'] *= 2
+    regressions = compare_to_baseline(slower, results)
+    assert [message.split(':')[0] for message in regressions] == ['gen_n20_h3_d3', 'gen_n30_h3_d3',
+                                                                  'gen_n30_h4_d3', 'gen_n30_h4_d3']
+    assert ' time ' in regressions[0] and ' cost ' in regressions[1]
+    assert ' peak memory ' in regressions[2] and 'no longer legitimate' in regressions[3]
+
+    # a case missing from the baseline is not compared
+    assert compare_to_baseline(slower, {'cases': results['cases'][1:2]}) == []
@@ -0,0 +1,65 @@
+"""
+Test script for the cluster-first, route-second M-TSP.
+
+Checks that clusters partition the stops, that stitching is never worse than
+joining the cycles as they are, and that cluster_tsp gives legitimate PHP
+tours close to heuristic_tsp.
+"""
+
+import random
+import networkx as nx
+import pytest
+from cluster_tsp import cluster_tsp, k_medoids, solve_cycle, stitch
+from tsp_heuristics import heuristic_tsp, distance_matrix, tour_length
+from php_from_tsp import php_solver_from_tsp
+from benchmark import generated_case
+from student_utils import input_file_to_instance, analyze_solution
+from solver_stats import SolverStats
+
+
+def euclidean_graph(n, seed=0):
+    rng = random.Random(seed)
+    points = [(rng.random(), rng.random()) for _ in range(n)]
+    G = nx.Graph()
+    G.add_weighted_edges_from((u, v, ((points[u][0] - points[v][0]) ** 2 + (points[u][1] - points[v][1]) ** 2) ** 0.5)
+                              for u in range(n) for v in range(u + 1, n))
+    return G
+
+
+def test_clusters_and_stitching():
+    dist = distance_matrix(euclidean_graph(61))
+    medoids, clusters, _ = k_medoids(range(1, 61), dist, 6)
+    assert sorted(v for cluster in clusters for v in cluster) == list(range(1, 61))
+    assert all(medoid in cluster for medoid, cluster in zip(medoids, clusters))
+
+    cycles = []
+    for cluster in clusters:
+        order, _ = solve_cycle([[dist[u][v] for v in cluster] for u in cluster])
+        cycles.append([cluster[i] for i in order])
+    order = stitch(cycles, dist)
+    assert order[0] == 0 and sorted(order) == list(range(61))
+    assert tour_length(order, dist) <= tour_length([0] + [v for cycle in cycles for v in cycle], dist) + 1e-9
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cluster_tsp_close_to_heuristic(workers):
+    G = euclidean_graph(120, seed=1)
+    dist = distance_matrix(G)
+    stats = SolverStats()
+    tour = cluster_tsp(G, stats=stats, workers=workers)
+    assert tour[0] == tour[-1] == 0 and sorted(tour[:-1]) == list(range(120))
+    assert stats['cluster_tsp.clusters'] == 12
+    assert tour_length(tour[:-1], dist) <= 1.1 * tour_length(heuristic_tsp(G)[:-1], dist)
+    assert tour == cluster_tsp(G)
+
+
+def test_php_with_cluster_tsp():
+    G, H, alpha = input_file_to_instance("inputs/6.in")
+    assert analyze_solution(G, H, alpha, php_solver_from_tsp(G, H, tsp_solver=cluster_tsp), {})[0]
+
+    _, G, H, alpha, _ = generated_case(300, 80, 4, seed=3)
+    tour = php_solver_from_tsp(G, H, tsp_solver=cluster_tsp)
+    is_legitimate, driving_cost, _ = analyze_solution(G, H, alpha, tour, {})
+    assert is_legitimate
+    _, heuristic_cost, _ = analyze_solution(G, H, alpha, php_solver_from_tsp(G, H, tsp_solver=heuristic_tsp), {})
+    assert driving_cost <= 1.1 * heuristic_cost
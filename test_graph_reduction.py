@@ -0,0 +1,64 @@
+"""
+Test script for the graph preprocessing before shortest paths.
+
+Checks that the reduction keeps the distances between the remaining nodes,
+that contracted edges expand to real paths, and that the triangle inequality
+check on the reduced graph gives the same answer as on the full one.
+"""
+
+import random
+import networkx as nx
+import pytest
+from instance_generator import generate_instance
+from student_utils import weighted_edge_list_to_graph, analyze_solution
+from input_validation import is_metric_compact
+from php_from_tsp import php_solver_from_tsp
+from graph_reduction import GraphReduction
+
+
+def generated_graph(n, homes, seed, avg_degree=2.5):
+    H, adj = generate_instance(n, homes, 0.5, degree='local', avg_degree=avg_degree, seed=seed)
+    G = weighted_edge_list_to_graph([(u, v, float(w)) for u, nbrs in enumerate(adj) for v, w in nbrs.items()])
+    return G, H, {u: nbrs for u, nbrs in enumerate(adj)}
+
+
+def test_reduction_keeps_distances():
+    G, H, _ = generated_graph(400, 8, seed=1)
+    reduction = GraphReduction.from_graph(G, [0] + H)
+    assert reduction.pruned > 0 and reduction.contracted > 0
+    assert all(t in reduction.adj for t in [0] + H)
+
+    reduced = reduction.graph()
+    for s in [0] + H[:3]:
+        expected = nx.single_source_dijkstra_path_length(G, s)
+        for v, d in nx.single_source_dijkstra_path_length(reduced, s).items():
+            assert d == pytest.approx(expected[v])
+    for (a, b), chain in reduction.chains.items():
+        path = reduction.expand([a, b])
+        assert path == [a] + chain + [b]
+        assert nx.path_weight(G, path, 'weight') == pytest.approx(reduction.adj[a][b])
+
+
+def test_php_on_reduced_graph():
+    G, H, _ = generated_graph(300, 7, seed=4)
+    tour = php_solver_from_tsp(G, H)
+    is_legitimate, driving_cost, _ = analyze_solution(G, H, 0.5, tour, {})
+    assert is_legitimate
+    assert driving_cost == pytest.approx(analyze_solution(G, H, 0.5, php_solver_from_tsp(G, H, preprocess=False), {})[1])
+
+
+def test_metric_check_on_reduced_graph():
+    rng = random.Random(0)
+    non_metric = 0
+    for seed in range(30):
+        _, _, adj = generated_graph(80, 2, seed=seed, avg_degree=rng.choice([2, 2.5, 3]))
+        # stretch a few edges, which may break the triangle inequality
+        for _ in range(rng.randint(0, 2)):
+            u = rng.randrange(len(adj))
+            v = rng.choice(list(adj[u]))
+            adj[u][v] = adj[v][u] = adj[u][v] * rng.choice([1.2, 2, 5])
+        reduction = GraphReduction(adj)
+        expected = is_metric_compact(adj)
+        non_metric += not expected
+        assert is_metric_compact(reduction.adj, reduction.required_distances()) == expected
+    assert non_metric > 0
@@ -0,0 +1,33 @@
+"""
+Test script for batch solving of many home sets on one shared graph.
+
+Checks that every tour is legitimate and as short as a separate
+php_solver_from_tsp solve of the same home set.
+"""
+
+import pytest
+from student_utils import input_file_to_instance, analyze_solution
+from php_from_tsp import php_solver_from_tsp
+from home_sets import solve_home_sets, random_home_sets, SharedDistances
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_home_sets_match_separate_solves(workers):
+    G, _, _ = input_file_to_instance("inputs/6.in")
+    home_sets = random_home_sets(G, 6, 5, seed=2, pool=12)
+    results, summary = solve_home_sets(G, home_sets, workers=workers)
+    assert summary['requests'] == 6 and summary['failed'] == 0
+    assert summary['throughput'] > 0
+    for result, H in zip(results, home_sets):
+        assert result['homes'] == H
+        is_legitimate, driving_cost, _ = analyze_solution(G, H, 1, result['tour'], {})
+        assert is_legitimate
+        _, expected, _ = analyze_solution(G, H, 1, php_solver_from_tsp(G, H), {})
+        assert driving_cost == pytest.approx(expected)
+
+
+def test_home_outside_shared_terminals():
+    G, H, _ = input_file_to_instance("inputs/1.in")
+    shared = SharedDistances(G, H[:1])
+    with pytest.raises(ValueError):
+        shared.solve(H)
@@ -0,0 +1,86 @@
+"""
+Test script for the incremental re-solve after edge-weight updates.
+
+Checks that the repaired shortest-path trees match a fresh Dijkstra after
+random updates, and that the re-optimized tours stay legitimate.
+"""
+
+import time
+import random
+from concurrent.futures import ProcessPoolExecutor
+import networkx as nx
+import pytest
+from instance_generator import generate_instance
+from student_utils import weighted_edge_list_to_graph, analyze_solution
+from incremental import IncrementalPHP
+
+
+def generated_graph(n, homes, seed):
+    H, adj = generate_instance(n, homes, 0.5, degree='local', avg_degree=4, seed=seed)
+    G = weighted_edge_list_to_graph([(u, v, float(w)) for u, nbrs in enumerate(adj) for v, w in nbrs.items()])
+    return G, H
+
+
+def test_updates_match_fresh_dijkstra():
+    G, H = generated_graph(120, 6, seed=3)
+    solver = IncrementalPHP(G, H)
+    rng = random.Random(0)
+    edges = list(G.edges())
+    for _ in range(25):
+        changes = []
+        for _ in range(rng.randint(1, 4)):
+            u, v = rng.choice(edges)
+            changes.append((u, v, G[u][v]['weight'] * rng.choice([0.2, 0.5, 2.0, 5.0])))
+        tour = solver.update_edges(changes)
+
+        for s in solver.terminals:
+            expected = nx.single_source_dijkstra_path_length(G, s)
+            assert solver.trees[s].dist == pytest.approx(expected)
+        assert analyze_solution(G, H, 0.5, tour, {})[0]
+
+    local_distance = solver.driving_distance
+    solver.resolve()
+    assert solver.driving_distance <= local_distance + 1e-9
+
+
+def test_update_errors():
+    G, H = generated_graph(30, 3, seed=1)
+    solver = IncrementalPHP(G, H)
+    u, v = next(iter(G.edges()))
+    with pytest.raises(ValueError):
+        solver.update_edges([(u, v, -1.0)])
+    missing = next(w for w in G.nodes if w != u and w not in G[u])
+    with pytest.raises(ValueError):
+        solver.update_edges([(u, missing, 1.0)])
+
+
+def test_add_and_remove_homes():
+    G, H = generated_graph(150, 6, seed=5)
+    rng = random.Random(1)
+    others = [v for v in G.nodes if v not in H and v != 0]
+    with IncrementalPHP(G, H[:3]) as solver:
+        for h in H[3:] + rng.sample(others, 3):
+            tour = solver.add_home(h)
+            assert analyze_solution(G, solver.H, 0.5, tour, {})[0]
+        for h in rng.sample(solver.H, 4):
+            tour = solver.remove_home(h)
+            assert h not in solver.trees
+            assert analyze_solution(G, solver.H, 0.5, tour, {})[0]
+        assert sorted(solver.terminals) == sorted([0] + solver.H)
+
+        # an exact re-solve in the background is adopted when nothing changed meanwhile
+        local_distance = solver.driving_distance
+        solver.resolve_in_background().result()
+        solver.collect_background(wait=True)
+        assert solver.driving_distance <= local_distance + 1e-9
+        assert analyze_solution(G, solver.H, 0.5, solver.tour, {})[0]
+
+        # and dropped when a change comes before it finishes
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            executor.submit(time.sleep, 0.5)
+            solver.resolve_in_background(executor)
+            solver.add_home(next(v for v in others if v not in solver.H))
+            assert solver.collect_background(wait=True) is False
+
+        with pytest.raises(ValueError):
+            solver.remove_home(-1)
@@ -0,0 +1,97 @@
+"""
+Test script for the single-pass input validation.
+
+Checks that check_input agrees with is_valid_input on valid and broken inputs,
+and that check_input_corpus reports every file of a directory.
+"""
+
+import os
+import shutil
+import tempfile
+from student_utils import is_valid_input
+from input_validation import check_input, check_input_corpus
+
+INPUT_DIR = "inputs"
+
+
+def set_edge_weight(lines, u, weight):
+    """Set the weight of the first edge of node u, in both directions"""
+    lines = list(lines)
+    i = 3
+    v = None
+    while i < len(lines) and lines[i].split():
+        node, d = map(int, lines[i].split())
+        for j in range(i + 1, i + 1 + d):
+            nbr = int(lines[j].split()[0])
+            if (node == u and v is None) or (node == v and nbr == u):
+                v = nbr if node == u else v
+                lines[j] = f"{nbr} {weight}"
+        i += 1 + d
+    return lines
+
+
+def write_variants(directory):
+    """Copy bundled inputs under valid names and derive broken ones from them"""
+    with open(os.path.join(INPUT_DIR, "2.in")) as f:
+        lines = f.read().split('\n')
+
+    shutil.copy(os.path.join(INPUT_DIR, "2.in"), os.path.join(directory, "20_03.in"))
+    shutil.copy(os.path.join(INPUT_DIR, "9.in"), os.path.join(directory, "40_10.in"))
+
+    # wrong alpha for the file name
+    shutil.copy(os.path.join(INPUT_DIR, "2.in"), os.path.join(directory, "20_10.in"))
+    # too many nodes for the file name
+    shutil.copy(os.path.join(INPUT_DIR, "2.in"), os.path.join(directory, "10_03.in"))
+    # 0 is a home
+    broken = list(lines)
+    broken[2] = '0 ' + ' '.join(broken[2].split()[1:])
+    with open(os.path.join(directory, "20_03_zero.in"), 'w') as f:
+        f.write('\n'.join(broken))
+    # an edge that is much heavier than the path around it
+    with open(os.path.join(directory, "20_03_metric.in"), 'w') as f:
+        f.write('\n'.join(set_edge_weight(lines, 0, 100000)))
+    # the two directions of an edge disagree
+    broken = list(lines)
+    v, w = broken[4].split()
+    broken[4] = f"{v} {int(float(w)) + 1}"
+    with open(os.path.join(directory, "20_03_asym.in"), 'w') as f:
+        f.write('\n'.join(broken))
+    # cannot be parsed
+    with open(os.path.join(directory, "20_03_garbage.in"), 'w') as f:
+        f.write("not an input file\n")
+
+
+def test_check_input_matches_is_valid_input():
+    with tempfile.TemporaryDirectory() as directory:
+        write_variants(directory)
+        for file in sorted(os.listdir(directory)):
+            path = os.path.join(directory, file)
+            report = check_input(path)
+            is_valid, message = is_valid_input(path)
+            assert report['valid'] == is_valid, file
+            # fail-fast reports a prefix of the full error list
+            assert all(error in message for error in report['errors']), file
+
+
+def test_check_input_corpus():
+    with tempfile.TemporaryDirectory() as directory:
+        write_variants(directory)
+        corpus_report = check_input_corpus(directory, workers=2)
+        assert corpus_report['total'] == len(os.listdir(directory))
+        valid_files = sorted(report['file'] for report in corpus_report['files'] if report['valid'])
+        assert valid_files == ["20_03.in", "40_10.in"]
+        garbage = next(report for report in corpus_report['files'] if report['file'] == "20_03_garbage.in")
+        assert garbage['errors'] == ['Cannot parse data']
+        assert 'metric' in garbage['skipped']
+
+
+def test_bundled_inputs_are_valid():
+    corpus_report = check_input_corpus(INPUT_DIR, workers=1)
+    assert corpus_report['invalid'] == 0
+
+
+if __name__ == "__main__":
+    test_check_input_matches_is_valid_input()
+    test_check_input_corpus()
+    test_bundled_inputs_are_valid()
+    print("✓ All input validation tests passed!")
@@ -0,0 +1,68 @@
+"""
+Test script for the random instance generator.
+
+Every degree distribution and weight model must produce files that pass
+is_valid_input, the same seed must produce the same file, and every model
+must generate 10^4 nodes in seconds.
+"""
+
+import os
+import time
+import tempfile
+from student_utils import is_valid_input
+from instance_generator import (DEGREE_DISTRIBUTIONS, WEIGHT_MODELS, generate_instance,
+                                generate_ladder, instance_file_name, write_instance)
+
+
+def test_generated_instances_are_valid():
+    with tempfile.TemporaryDirectory() as directory:
+        for degree in DEGREE_DISTRIBUTIONS:
+            for weights in WEIGHT_MODELS:
+                for n, alpha in [(2, 1.0), (30, 0.3), (60, 1.0)]:
+                    H, adj = generate_instance(n, n // 2, alpha, degree=degree, weights=weights, seed=n)
+                    file = os.path.join(directory, instance_file_name(n, alpha, tag=f"{degree}_{weights}"))
+                    write_instance(file, alpha, H, adj)
+                    is_valid, message = is_valid_input(file)
+                    assert is_valid, (file, message)
+
+
+def test_closure_weights_are_metric():
+    for degree in DEGREE_DISTRIBUTIONS:
+        for max_weight in [1, 2, 9, 1000]:
+            _, adj = generate_instance(300, 10, 1.0, degree=degree, weights='closure', max_weight=max_weight, seed=1)
+            assert all(1 <= w <= max_weight for nbrs in adj for w in nbrs.values())
+            # no two-edge detour is shorter than the edge it bypasses
+            for nbrs in adj:
+                for u, w_ux in nbrs.items():
+                    for v, w_xv in nbrs.items():
+                        if v in adj[u]:
+                            assert adj[u][v] <= w_ux + w_xv
+
+
+def test_generation_scales():
+    for degree in DEGREE_DISTRIBUTIONS:
+        for weights in WEIGHT_MODELS:
+            start_time = time.perf_counter()
+            generate_instance(10 ** 4, 100, 1.0, degree=degree, weights=weights, seed=0)
+            assert time.perf_counter() - start_time < 5, (degree, weights)
+
+
+def test_same_seed_same_instance():
+    assert generate_instance(200, 20, 0.3, seed=7) == generate_instance(200, 20, 0.3, seed=7)
+    assert generate_instance(200, 20, 0.3, seed=7) != generate_instance(200, 20, 0.3, seed=8)
+
+
+def test_ladder():
+    with tempfile.TemporaryDirectory() as directory:
+        files = generate_ladder(directory, [10, 100, 1000], 0.1, 1.0)
+        assert [os.path.basename(file) for file in files] == \
+            ["10_10_h1_s0.in", "100_10_h10_s1.in", "1000_10_h100_s2.in"]
+
+
+if __name__ == "__main__":
+    test_generated_instances_are_valid()
+    test_closure_weights_are_metric()
+    test_generation_scales()
+    test_same_seed_same_instance()
+    test_ladder()
+    print("✓ All generator tests passed!")
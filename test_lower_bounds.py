@@ -0,0 +1,58 @@
+"""
+Test script for the lower bounds: never above the optimum, exact on small
+cases where they have to be, and early stopping of the PTP restarts.
+"""
+
+import os
+import random
+import itertools
+from lower_bounds import php_lower_bounds, assignment_bound, instance_lower_bound, gap
+from php_from_tsp import php_solver_from_tsp
+from ptp_solver import ptp_solver
+from shortest_paths import shortest_paths_from_terminals
+from student_utils import input_file_to_instance, analyze_solution
+from solver_stats import SolverStats
+
+INPUT_DIR = "inputs"
+
+
+def test_php_bounds_below_optimum():
+    for input_file in ["1.in", "2.in", "6.in"]:
+        G, H, alpha = input_file_to_instance(os.path.join(INPUT_DIR, input_file))
+        terminals = [0] + [h for h in H if h != 0]
+        all_shortest_paths = shortest_paths_from_terminals(G, terminals)
+        dist = {u: all_shortest_paths[u][0] for u in terminals}
+        bounds = php_lower_bounds(terminals, dist)
+
+        optimum = analyze_solution(G, H, alpha, php_solver_from_tsp(G, H), {})[1] / alpha
+        for name, value in bounds.items():
+            assert value <= optimum + 1e-6, (input_file, name)
+        assert bounds['lower'] >= bounds['mst']
+        assert bounds['held_karp'] >= bounds['one_tree'] - 1e-6
+        assert instance_lower_bound(G, H, alpha, 'php') <= alpha * optimum + 1e-6
+
+
+def test_assignment_matches_brute_force():
+    rng = random.Random(0)
+    for n in range(3, 7):
+        points = [(rng.random(), rng.random()) for _ in range(n)]
+        dist = [[((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5 for b in points] for a in points]
+        expected = min(sum(dist[i][p[i]] for i in range(n))
+                       for p in itertools.permutations(range(n)) if all(p[i] != i for i in range(n)))
+        assert abs(assignment_bound(list(range(n)), dist) - expected) < 1e-9
+
+
+def test_ptp_bound_and_early_stop():
+    for input_file in ["1.in", "2.in", "6.in"]:
+        G, H, alpha = input_file_to_instance(os.path.join(INPUT_DIR, input_file))
+        tour, pick_up_locs_dict = ptp_solver(G, H, alpha)
+        cost = sum(analyze_solution(G, H, alpha, tour, pick_up_locs_dict)[1:])
+        lower = instance_lower_bound(G, H, alpha, 'ptp')
+        assert 0 < lower <= cost + 1e-6, input_file
+        assert 0 <= gap(cost, lower) < 1
+
+    # any answer is within a gap of 1: no restart is needed
+    stats = SolverStats()
+    tour, pick_up_locs_dict = ptp_solver(G, H, alpha, stats=stats, gap_tolerance=1.0)
+    assert stats['ptp.restarts'] == 0
+    assert analyze_solution(G, H, alpha, tour, pick_up_locs_dict)[0]
@@ -0,0 +1,44 @@
+"""
+Test script for the per-solve memory accounting.
+
+Checks the DP memory estimate against traced allocations, the pre-flight
+budget decisions, and that the heuristic downgrade still gives legitimate tours.
+"""
+
+import os
+import pytest
+from php_from_tsp import php_solver_from_tsp
+from student_utils import input_file_to_instance, analyze_solution
+from tsp_heuristics import heuristic_tsp
+from memory_accounting import (MemoryBudgetExceeded, estimate_dp_memory, preflight,
+                               track_memory)
+
+INPUT_DIR = "inputs"
+
+
+def test_estimate_bounds_traced_dp_memory():
+    G, H, alpha = input_file_to_instance(os.path.join(INPUT_DIR, "2.in"))
+    with track_memory(trace=True) as tracker:
+        php_solver_from_tsp(G, H)
+    estimate = estimate_dp_memory(len(H))
+    assert tracker.peak_checkpoint == 'mtsp_dp.fill'
+    assert tracker.peak_traced is not None and tracker.peak_rss is not None
+    assert 0.5 * estimate < tracker.peak_traced < 1.5 * estimate
+    assert any(site['site'].startswith('mtsp_dp.py') for site in tracker.to_dict()['top_sites'])
+
+
+def test_preflight():
+    estimate = estimate_dp_memory(10)
+    assert preflight(10) == 'exact'
+    assert preflight(10, budget=estimate) == 'exact'
+    assert preflight(10, budget=estimate - 1, over_budget='downgrade') == 'heuristic'
+    with pytest.raises(MemoryBudgetExceeded):
+        preflight(10, budget=estimate - 1)
+
+
+def test_heuristic_downgrade_is_legitimate():
+    for input_file in ["1.in", "6.in", "2.in"]:
+        G, H, alpha = input_file_to_instance(os.path.join(INPUT_DIR, input_file))
+        tour = php_solver_from_tsp(G, H, tsp_solver=heuristic_tsp)
+        is_legitimate, _, _ = analyze_solution(G, H, alpha, tour, {})
+        assert is_legitimate, input_file
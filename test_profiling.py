@@ -0,0 +1,83 @@
+"""
+Test script for the profiling spans: nesting, no-op outside a profile, and
+span trees sent through to_dict and attach.
+"""
+
+import json
+from profiling import span, traced, profile, attach, active_profiler, Span, Profiler
+
+
+@traced()
+def solve(depth):
+    with span('inner'):
+        if depth:
+            solve(depth - 1)
+    return depth
+
+
+@traced('named')
+def named():
+    return 'ok'
+
+
+def test_nested_spans():
+    with profile() as profiler:
+        with span('outer'):
+            assert solve(1) == 1
+            named()
+        with span('outer'):
+            pass
+    assert active_profiler() is None
+
+    outer = profiler.root.children
+    assert [child.name for child in outer] == ['outer', 'outer']
+    assert [child.name for child in outer[0].children] == ['solve', 'named']
+    inner = outer[0].children[0].children[0]
+    assert inner.name == 'inner' and [child.name for child in inner.children] == ['solve']
+    assert profiler.root.end is not None and all(child.end is not None for child in outer)
+    assert outer[0].duration >= outer[0].children[0].duration
+
+    totals = profiler.totals()
+    assert set(totals) == {'outer', 'outer/solve', 'outer/solve/inner', 'outer/solve/inner/solve',
+                           'outer/solve/inner/solve/inner', 'outer/named'}
+    assert totals['outer'] == outer[0].duration + outer[1].duration
+    assert profiler.format().splitlines()[0].startswith('total: ')
+    assert len(profiler.format().splitlines()) == 8
+
+    # profiles nest, the inner one only sees its own spans
+    with profile() as first:
+        with profile() as second:
+            named()
+        assert active_profiler() is first
+        named()
+    assert [child.name for child in second.root.children] == ['named']
+    assert [child.name for child in first.root.children] == ['named']
+
+
+def test_no_op_outside_a_profile():
+    assert active_profiler() is None
+    with span('ignored') as ignored:
+        assert solve(2) == 2
+    assert span('other') is ignored
+    attach({'name': 'ignored', 'seconds': 1.0, 'children': []})
+    assert active_profiler() is None
+
+
+def test_to_dict_and_attach_round_trip():
+    with profile() as worker:
+        with span('solve'):
+            with span('dp'):
+                pass
+    data = json.loads(worker.to_json())
+    assert data['name'] == 'total' and [child['name'] for child in data['children']] == ['solve']
+
+    rebuilt = Span.from_dict(data)
+    assert rebuilt.to_dict() == data
+
+    with profile(Profiler('batch')) as profiler:
+        with span('instance'):
+            for child in data['children']:
+                attach(child)
+    instance = profiler.root.children[0]
+    assert instance.children[0].to_dict() == data['children'][0]
+    assert profiler.totals()['instance/solve/dp'] == data['children'][0]['children'][0]['seconds']
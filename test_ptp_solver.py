@@ -0,0 +1,86 @@
+"""
+Test script for the PTP local search and the solver work counters.
+
+Checks that ptp_solver returns legitimate solutions, that never cost more than
+the optimal PHP tour when |H| is small enough to start from it, and that the
+counters of a solve are deterministic.
+"""
+
+import os
+import networkx as nx
+from php_from_tsp import php_solver_from_tsp
+from ptp_solver import ptp_solver, pickup_options, prune_pickup_options, EXACT_ORDER_LIMIT
+from student_utils import input_file_to_instance, analyze_solution
+from solver_stats import SolverStats
+from mtsp_dp import mtsp_dp
+
+INPUT_DIR = "inputs"
+
+
+def test_ptp_solver_is_legitimate_and_beats_php():
+    for input_file in ["1.in", "6.in", "2.in", "7.in", "4.in"]:
+        G, H, alpha = input_file_to_instance(os.path.join(INPUT_DIR, input_file))
+        tour, pick_up_locs_dict = ptp_solver(G, H, alpha)
+        is_legitimate, driving_cost, walking_cost = analyze_solution(G, H, alpha, tour, pick_up_locs_dict)
+        assert is_legitimate, input_file
+
+        # only a search started from the exact PHP route is sure to beat it
+        if len(H) + 1 <= EXACT_ORDER_LIMIT:
+            php_tour = php_solver_from_tsp(G, H)
+            _, php_driving_cost, php_walking_cost = analyze_solution(G, H, alpha, php_tour, {})
+            assert driving_cost + walking_cost <= php_driving_cost + php_walking_cost + 1e-6, input_file
+
+
+def test_counters_are_deterministic():
+    G, H, alpha = input_file_to_instance(os.path.join(INPUT_DIR, "1.in"))
+    first, second = SolverStats(), SolverStats()
+    ptp_solver(G, H, alpha, stats=first)
+    ptp_solver(G, H, alpha, stats=second)
+    assert first.as_dict() == second.as_dict()
+    assert first['dijkstra.runs'] > 0
+    assert first['ptp.restarts'] == 8
+
+    stats = SolverStats()
+    php_solver_from_tsp(G, H, stats=stats)
+    n = len(H) + 1
+    assert stats['dijkstra.runs'] == n
+    # on the complete reduced graph every possible state is reached: the start (1, 0),
+    # then every mask with node 0 ending at one of its other nodes
+    assert stats['mtsp_dp.states_reached'] == 1 + (n - 1) * (1 << (n - 2))
+    assert stats['mtsp_dp.states_pruned'] == 0
+
+    # without the edge (1, 2) no path over {0, 1, 2} ends at 1 or 2, so none over {0, 1, 2, 3} ends at 3
+    G = nx.complete_graph(4)
+    nx.set_edge_attributes(G, 1, 'weight')
+    G.remove_edge(1, 2)
+    stats = SolverStats()
+    mtsp_dp(G, stats=stats)
+    assert stats['mtsp_dp.states_pruned'] == 3
+
+
+def test_dominated_stops():
+    G, H, alpha = input_file_to_instance(os.path.join(INPUT_DIR, "2.in"))
+    options = pickup_options(G, H)
+    pruned = prune_pickup_options(G, options, alpha)
+    assert all(stops[0] == h for h, stops in pruned.items())
+    kept = {s for stops in pruned.values() for s in stops}
+    removed = {s for stops in options.values() for s in stops} - kept
+    assert removed
+
+    # every removed stop is beaten by a kept one on walking by more than the detour
+    dist = dict(nx.all_pairs_dijkstra_path_length(G))
+    for s in removed:
+        friends = [h for h, stops in options.items() if s in stops]
+        assert any(all(t in options[h] and dist[s][h] - dist[t][h] >= 2 * alpha * dist[s][t] - 1e-9
+                       for h in friends)
+                   for t in kept)
+
+    tour, pick_up_locs_dict = ptp_solver(G, H, alpha)
+    unpruned = ptp_solver(G, H, alpha, prune_stops=False)
+    assert sum(analyze_solution(G, H, alpha, tour, pick_up_locs_dict)[1:]) <= \
+        sum(analyze_solution(G, H, alpha, *unpruned)[1:]) + 1e-6
+
+
+def test_aggregate():
+    total = SolverStats.aggregate([{'a': 1, 'b': 2}, None, {'a': 3}])
+    assert total.as_dict() == {'a': 4, 'b': 2}
@@ -0,0 +1,70 @@
+"""
+Test script for the SQLite run store and result reuse by the batch runner.
+"""
+
+import os
+import shutil
+import tempfile
+from batch_runner import run_batch
+from run_store import RunStore, instance_hash
+from backends import get_backend
+
+INPUT_DIR = "inputs"
+
+
+def test_batch_reuses_stored_results():
+    with tempfile.TemporaryDirectory() as directory:
+        files = []
+        for name in ["1.in", "6.in"]:
+            files.append(os.path.join(directory, name))
+            shutil.copy(os.path.join(INPUT_DIR, name), files[-1])
+        store = os.path.join(directory, "runs.sqlite")
+
+        first = run_batch(files, solver='php', workers=1, store=store, quiet=True)
+        second = run_batch(files, solver='php', workers=1, store=store, quiet=True)
+        assert not any(record['cached'] for record in first)
+        assert all(record['cached'] for record in second)
+        assert sorted((r['file'], r['cost'], r['tour']) for r in first) == \
+            sorted((r['file'], r['cost'], r['tour']) for r in second)
+
+        # other parameters and other content are solved again
+        assert not any(record['cached'] for record in
+                       run_batch(files, solver='php', workers=1, store=store, quiet=True, fallback=False))
+        with open(files[0], 'a') as f:
+            f.write("\n")
+        third = run_batch(files, solver='php', workers=1, store=store, quiet=True)
+        assert {r['file']: r['cached'] for r in third} == {"1.in": False, "6.in": True}
+
+        with RunStore(store) as run_store:
+            runs = run_store.runs()
+            assert len(runs) == 4
+            assert sum(run['cached'] for run in runs) == 3
+            best = run_store.best_known()
+            assert len(best) == 3  # 1.in before and after the edit, and 6.in
+            costs = {record['file']: record['cost'] for record in first}
+            assert run_store.best_known(instance_hash(files[1]))[0]['cost'] == costs["6.in"]
+            oldest, newest = runs[-1]['run_id'], runs[0]['run_id']
+            comparison = run_store.compare_runs(oldest, newest)
+            assert [(file, delta) for file, _, _, delta in comparison] == [("6.in", 0)]
+
+
+def test_new_backend_version_solves_again():
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, "4.in")
+        shutil.copy(os.path.join(INPUT_DIR, "4.in"), file)
+        store = os.path.join(directory, "runs.sqlite")
+        # no backend fits a 1 byte budget: the fastest one for |H| = 20, php_clustered, is selected
+        options = dict(solver='php', workers=1, store=store, quiet=True,
+                       memory_budget=1, over_budget='downgrade')
+
+        first, = run_batch([file], **options)
+        assert first['solver_used'] == 'php_clustered'
+        assert run_batch([file], **options)[0]['cached']
+
+        clustered = get_backend('php_clustered')
+        version = clustered.version
+        clustered.version = version + '.1'
+        try:
+            assert not run_batch([file], **options)[0]['cached']
+        finally:
+            clustered.version = version
@@ -0,0 +1,22 @@
+"""
+Test script for the terminal-only shortest paths of the PHP pipeline.
+"""
+
+import networkx as nx
+from shortest_paths import shortest_paths_from_terminals
+from student_utils import input_file_to_instance
+
+
+def test_terminal_paths_match_all_pairs():
+    G, H, _ = input_file_to_instance("inputs/6.in")
+    terminals = [0] + list(H)
+    expected = dict(nx.all_pairs_dijkstra_path_length(G))
+    all_shortest_paths = shortest_paths_from_terminals(G, terminals)
+    assert set(all_shortest_paths) == set(terminals)
+    for u in terminals:
+        dist, paths = all_shortest_paths[u]
+        for v in terminals:
+            assert dist[v] == expected[u][v]
+            path = paths[v]
+            assert path[0] == u and path[-1] == v
+            assert sum(G[a][b]['weight'] for a, b in zip(path, path[1:])) == dist[v]
@@ -0,0 +1,62 @@
+"""
+Test script for the batch solution validator.
+
+Checks that SolutionValidator returns exactly what analyze_solution returns,
+for legitimate and for broken candidate solutions.
+"""
+
+import os
+from php_from_tsp import php_solver_from_tsp
+from student_utils import input_file_to_instance, analyze_solution
+from solution_validator import SolutionValidator
+
+INPUT_DIR = "inputs"
+
+
+def make_candidates(G, H, tour):
+    """Some legitimate and some broken solutions around a PHP tour"""
+    candidates = [
+        (tour, {}),
+        (tour, {h: (h,) for h in H}),
+        (tour[1:], {}),                                 # does not start at 0
+        (tour[:-1] + [tour[-2], 0], {}),                # repeated node, missing edge
+        ([0, 0], {}),                                   # self loop
+        (tour, {h: (h,) for h in H[1:]}),               # a friend is left behind
+    ]
+    # pick every friend up at a neighbor that lies on the tour when possible
+    on_tour = set(tour)
+    pick_up_locs_dict = {}
+    for h in H:
+        loc = next((v for v in G.neighbors(h) if v in on_tour), h)
+        pick_up_locs_dict.setdefault(loc, []).append(h)
+    candidates.append((tour, pick_up_locs_dict))
+    # a pick-up location that is not on the tour
+    candidates.append(([0, tour[1], 0], {H[0]: (H[0],)}))
+    return candidates
+
+
+def test_validator_matches_analyze_solution():
+    for input_file in ["1.in", "6.in", "2.in"]:
+        G, H, alpha = input_file_to_instance(os.path.join(INPUT_DIR, input_file))
+        tour = php_solver_from_tsp(G, H)
+        candidates = make_candidates(G, H, tour)
+
+        validator = SolutionValidator(G, H, alpha)
+        batch_results = validator.analyze_batch(candidates)
+        expected = [analyze_solution(G, H, alpha, t, d) for t, d in candidates]
+        assert batch_results == expected, input_file
+
+
+def test_validator_description_example():
+    G, H, alpha = input_file_to_instance(os.path.join(INPUT_DIR, "1.in"))
+    validator = SolutionValidator(G, H, alpha)
+    is_legitimate, driving_cost, walking_cost = validator.analyze([0, 1, 2, 1, 0], {2: (2, 3, 4)})
+    assert is_legitimate
+    assert abs(driving_cost - 4 * alpha) < 1e-9
+    assert walking_cost == 2
+
+
+if __name__ == "__main__":
+    test_validator_matches_analyze_solution()
+    test_validator_description_example()
+    print("✓ All validator tests passed!")
@@ -0,0 +1,57 @@
+"""
+Test script for the bulk solution writer and the solution archive.
+"""
+
+import os
+import tempfile
+from solution_writer import SolutionSink, SolutionArchive, parse_ptp_solution
+from student_utils import ptp_solution_to_str
+
+SOLUTIONS = {
+    "20_03.in": ([0, 1, 2, 1, 0], {2: [2, 3, 4]}),
+    "20_10.in": ([0, 5, 0], {5: [5], 0: [6]}),
+    "40_03.in": ([0, 3, 7, 3, 0], {}),
+}
+
+
+def test_files_mode():
+    with tempfile.TemporaryDirectory() as directory:
+        with SolutionSink(out_dir=os.path.join(directory, "outputs"), buffer_size=2) as sink:
+            for in_file, (tour, pick_up_locs_dict) in SOLUTIONS.items():
+                sink.add(in_file, tour, pick_up_locs_dict)
+        files = sorted(os.listdir(os.path.join(directory, "outputs")))
+        assert files == ["20_03.out", "20_10.out", "40_03.out"]
+        for in_file, solution in SOLUTIONS.items():
+            with open(os.path.join(directory, "outputs", in_file.split('.')[0] + '.out')) as f:
+                text = f.read()
+            assert text == ptp_solution_to_str(*solution)
+            assert parse_ptp_solution(text) == solution
+
+
+def test_archive_mode():
+    with tempfile.TemporaryDirectory() as directory:
+        archive = os.path.join(directory, "sweep.ptpa")
+        with SolutionSink(archive=archive, buffer_size=2) as sink:
+            for in_file, (tour, pick_up_locs_dict) in SOLUTIONS.items():
+                sink.add(in_file, tour, pick_up_locs_dict)
+        # a later sweep overrides one solution
+        with SolutionSink(archive=archive) as sink:
+            sink.add("20_10.in", [0, 6, 0], {6: [5, 6]})
+        # a crash in the middle of an index write leaves a partial line
+        with open(archive + ".idx", 'a') as f:
+            f.write("40_10\t9999")
+        with SolutionSink(archive=archive) as sink:
+            sink.add("40_03.in", [0, 3, 0], {})
+
+        reader = SolutionArchive(archive)
+        assert len(reader) == 3
+        assert "20_03.in" in reader and "40_10" not in reader
+        assert reader.read("20_03") == SOLUTIONS["20_03.in"]
+        assert reader.read("40_03.in") == ([0, 3, 0], {})
+        assert reader.read("20_10") == ([0, 6, 0], {6: [5, 6]})
+
+
+if __name__ == "__main__":
+    test_files_mode()
+    test_archive_mode()
+    print("✓ All solution writer tests passed!")
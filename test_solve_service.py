@@ -0,0 +1,192 @@
+"""
+Test script for the local solve service: solve, validate and update requests
+over a Unix socket, warm and bounded worker caches, concurrent clients,
+metrics, and the recovery and limits of the worker pool.
+"""
+
+import json
+import socket
+import asyncio
+import tempfile
+import threading
+import os
+import signal
+import pytest
+import solve_service
+from solve_service import SolveService, ServiceClient, ServiceError
+from php_from_tsp import php_solver_from_tsp
+from ptp_solver import ptp_solver
+from student_utils import input_file_to_instance, analyze_solution
+
+
+@pytest.fixture
+def service_path():
+    path = os.path.join(tempfile.mkdtemp(), 'solve.sock')
+    service = SolveService(workers=1)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(service.start(path=path), loop).result()
+    try:
+        yield path
+    finally:
+        asyncio.run_coroutine_threadsafe(service.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+
+def test_solve_and_validate(service_path):
+    G, H, alpha = input_file_to_instance("inputs/6.in")
+    with ServiceClient(path=service_path) as client:
+        assert client.call('load', file="inputs/6.in")['homes'] == len(H)
+
+        first = client.call('solve', instance='6')
+        second = client.call('solve', instance='6')
+        _, expected, _ = analyze_solution(G, H, alpha, php_solver_from_tsp(G, H), {})
+        assert first['legitimate'] and first['backend'] == 'php'
+        assert first['cost'] == pytest.approx(expected)
+        assert (first['warm'], second['warm']) == (False, True)
+        assert second['counters']['service.warm_distances'] == 1
+
+        subset = client.call('solve', instance='6', homes=H[:3])
+        assert analyze_solution(G, H[:3], alpha, subset['tour'], {})[0]
+
+        ptp = client.call('solve', instance='6', problem='ptp')
+        assert ptp['cost'] == pytest.approx(sum(analyze_solution(G, H, alpha, *ptp_solver(G, H, alpha))[1:]))
+        checked = client.call('validate', instance='6', tour=ptp['tour'], pick_up_locs_dict=ptp['pick_up_locs_dict'])
+        assert checked['legitimate'] and checked['cost'] == pytest.approx(ptp['cost'])
+        assert not client.call('validate', instance='6', tour=[0, 0])['legitimate']
+
+        with pytest.raises(ServiceError):
+            client.call('solve', instance='missing')
+
+
+def test_update_reaches_workers(service_path):
+    G, H, alpha = input_file_to_instance("inputs/1.in")
+    u, v = next((u, v) for u, v in G.edges if u < v)
+    new_home = next(x for x in G.nodes if x not in H and x != 0)
+    with ServiceClient(path=service_path) as client:
+        client.call('load', file="inputs/1.in", instance='city')
+        client.call('solve', instance='city')
+        updated = client.call('update', instance='city', edges=[[u, v, 0.5]], add_homes=[new_home])
+        assert updated['homes'] == len(H) + 1 and updated['edge_changes'] == 1
+
+        # a bad home rejects the whole update
+        missing = max(G.nodes) + 1
+        for bad in ({'add_homes': [missing]}, {'remove_homes': [missing]},
+                    {'edges': [[u, v, 1.0]], 'add_homes': [missing]}):
+            with pytest.raises(ServiceError):
+                client.call('update', instance='city', **bad)
+        unchanged = client.call('instances')[0]
+        assert (unchanged['edge_changes'], unchanged['homes']) == (1, len(H) + 1)
+
+        result = client.call('solve', instance='city')
+        assert not result['warm']
+        G[u][v]['weight'] = G[v][u]['weight'] = 0.5
+        H = H + [new_home]
+        _, expected, _ = analyze_solution(G, H, alpha, php_solver_from_tsp(G, H), {})
+        assert result['legitimate'] and result['cost'] == pytest.approx(expected)
+        assert analyze_solution(G, H, alpha, updated['tour'], {})[0]
+
+
+def test_concurrent_clients_and_metrics(service_path):
+    with ServiceClient(path=service_path) as client:
+        client.call('load', file="inputs/2.in")
+    errors = []
+
+    def run():
+        try:
+            with ServiceClient(path=service_path) as client:
+                for _ in range(3):
+                    assert client.call('solve', instance='2', problem='ptp')['legitimate']
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+    # a bad line gets an error response, not a dropped connection
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(service_path)
+        sock.sendall(b'not json\n{"id": 7, "op": "nope"}\n')
+        reader = sock.makefile('rb')
+        responses = [json.loads(reader.readline()) for _ in range(2)]
+    assert all('error' in response for response in responses)
+
+    with ServiceClient(path=service_path) as client:
+        metrics = client.call('metrics')
+    assert metrics['requests_by_op']['solve'] == 12
+    assert metrics['errors_by_op']['invalid'] == 2
+    assert metrics['latency']['solve']['p50'] <= metrics['latency']['solve']['max']
+    assert metrics['throughput'] > 0 and metrics['instances'] == 1
+
+
+def test_worker_caches_are_bounded(monkeypatch):
+    monkeypatch.setattr(solve_service, '_worker_instances', {})
+    monkeypatch.setattr(solve_service, 'WORKER_INSTANCES', 2)
+    monkeypatch.setattr(solve_service, 'WORKER_VALIDATORS', 2)
+    file = os.path.abspath("inputs/1.in")
+    _, H, alpha = input_file_to_instance(file)
+
+    def job(key, live_keys, homes=None):
+        return {'key': key, 'file': file, 'edge_changes': [], 'H': H, 'homes': homes or H, 'alpha': alpha,
+                'problem': 'php', 'backend': 'php', 'gap_tolerance': None, 'live_keys': live_keys}
+
+    for key in range(3):
+        solve_service._solve_job(job(key, [0, 1, 2]))
+    assert list(solve_service._worker_instances) == [1, 2]
+    # 2 was unloaded
+    assert solve_service._solve_job(job(1, [1, 3]))['warm']
+    assert list(solve_service._worker_instances) == [1]
+
+    for size in range(1, len(H) + 1):
+        assert solve_service._solve_job(job(1, [1], homes=H[:size]))['legitimate']
+    assert list(solve_service._worker_instances[1]['validators']) == [tuple(sorted(H[:size - 1])),
+                                                                      tuple(sorted(H[:size]))]
+
+
+def test_dead_worker_is_replaced(service_path):
+    G, H, alpha = input_file_to_instance("inputs/6.in")
+    with ServiceClient(path=service_path) as client:
+        client.call('load', file="inputs/6.in")
+        first = client.call('solve', instance='6')
+        os.kill(first['worker'], signal.SIGKILL)
+        second = client.call('solve', instance='6')
+        assert second['legitimate'] and second['cost'] == pytest.approx(first['cost'])
+        assert second['worker'] != first['worker'] and not second['warm']
+        assert [attempt['solver'] for attempt in second['attempts']] == ['php']
+        assert client.call('metrics')['pool_restarts'] == 1
+
+
+def test_first_update_within_limits():
+    service = SolveService(workers=1, memory_limit=1)
+    try:
+        G, H, alpha = input_file_to_instance("inputs/6.in")
+        instance = solve_service.LoadedInstance(0, '6', "inputs/6.in", G, H, alpha)
+        service.instances['6'] = instance
+        with pytest.raises(ValueError, match="exact first solve"):
+            asyncio.run(service.op_update({'instance': '6', 'remove_homes': [H[0]]}))
+        assert instance.incremental is None and instance.H == H
+    finally:
+        service.executor.shutdown()
+
+
+def test_timeout_falls_back_then_fails():
+    from supervisor import SolveTimeout
+    service = SolveService(workers=1, timeout=1e-6)
+    try:
+        G, H, alpha = input_file_to_instance("inputs/6.in")
+        service.instances['6'] = solve_service.LoadedInstance(0, '6', "inputs/6.in", G, H, alpha)
+        # php, then its fallback php_heuristic, both over the timeout
+        with pytest.raises(SolveTimeout):
+            asyncio.run(service.op_solve({'instance': '6'}))
+        assert service.pool_restarts == 2
+
+        service.timeout = None
+        assert asyncio.run(service.op_solve({'instance': '6'}))['legitimate']
+    finally:
+        service.executor.shutdown()
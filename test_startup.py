@@ -0,0 +1,13 @@
+"""
+Test script for the lazy imports: the CLI and student_utils start in a fresh
+interpreter without loading matplotlib or networkx.
+"""
+
+import pytest
+from startup_benchmark import heavy_modules_loaded
+
+
+@pytest.mark.parametrize("statement", ["import student_utils", "from student_utils import *", "import ptp_cli"])
+def test_no_plotting_or_graph_library_at_import(statement):
+    loaded = heavy_modules_loaded(statement)
+    assert 'matplotlib' not in loaded and 'networkx' not in loaded, loaded
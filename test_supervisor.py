@@ -0,0 +1,57 @@
+"""
+Test script for supervised solves.
+
+Checks that workers over their time or memory budget are stopped with the
+right error, and that SupervisedSolve falls back to the cheaper solver.
+"""
+
+import os
+import time
+import pytest
+from student_utils import input_file_to_instance, analyze_solution
+from supervisor import (SupervisedSolve, SolveTimeout, WorkerMemoryExceeded,
+                        run_supervised)
+
+INPUT_DIR = "inputs"
+
+
+def sleep_then_return(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def allocate(megabytes):
+    return len(bytearray(megabytes << 20))
+
+
+def test_run_supervised():
+    assert run_supervised(sleep_then_return, (0,), timeout=10) == 0
+    start = time.time()
+    with pytest.raises(SolveTimeout):
+        run_supervised(sleep_then_return, (30,), timeout=0.5)
+    assert time.time() - start < 10
+    with pytest.raises(WorkerMemoryExceeded):
+        run_supervised(allocate, (1024,), memory_limit=64 << 20)
+    with pytest.raises(RuntimeError):
+        run_supervised(allocate, (-1,))
+
+
+def test_fallback_records_solver_used():
+    G, H, alpha = input_file_to_instance(os.path.join(INPUT_DIR, "2.in"))
+
+    supervised = SupervisedSolve('php', timeout=30)
+    tour, _ = supervised.solve(G, H, alpha)
+    assert supervised.solver_used == 'php'
+    assert len(supervised.attempts) == 1
+    assert supervised.counters['mtsp_dp.states_reached'] > 0
+
+    # the DP of |H| = 20 takes far longer than a second, the heuristic does not
+    G, H, alpha = input_file_to_instance(os.path.join(INPUT_DIR, "10.in"))
+    supervised = SupervisedSolve('php', timeout=1)
+    tour, _ = supervised.solve(G, H, alpha)
+    assert supervised.solver_used == 'php_heuristic'
+    assert supervised.attempts[0]['error'].startswith('SolveTimeout')
+    assert analyze_solution(G, H, alpha, tour, {})[0]
+
+    with pytest.raises(SolveTimeout):
+        SupervisedSolve('php', timeout=1, fallback=False).solve(G, H, alpha)
@@ -0,0 +1,24 @@
+"""
+Test script for the tour heuristics: they keep the depot first, visit every
+stop once and never make a tour longer.
+"""
+
+import random
+from tsp_heuristics import tour_length, nearest_neighbor_order, two_opt, or_opt, improve_order
+
+
+def test_improvements_keep_a_valid_shorter_tour():
+    rng = random.Random(0)
+    points = [(rng.random(), rng.random()) for _ in range(30)]
+    dist = [[((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5 for b in points] for a in points]
+
+    order = nearest_neighbor_order(range(30), dist)
+    assert order[0] == 0 and sorted(order) == list(range(30))
+    for improve in (two_opt, or_opt, improve_order):
+        before = tour_length(order, dist)
+        improve(order, dist)
+        assert order[0] == 0 and sorted(order) == list(range(30))
+        assert tour_length(order, dist) <= before + 1e-9
+
+    # a local optimum: another pass finds nothing
+    assert improve_order(order, dist) == 0
@@ -0,0 +1,139 @@
+"""
+Heuristics for ordering a set of stops into a short closed tour.
+
+A tour is represented by its visiting order, a list starting with the depot
+and without repeating it at the end. Distances are looked up as dist[u][v],
+so both a list of lists and a dict of dicts work.
+"""
+
+
+def tour_length(order, dist):
+    """Length of the closed tour order[0] -> ... -> order[-1] -> order[0]"""
+    if len(order) < 2:
+        return 0
+    return sum(dist[order[i - 1]][order[i]] for i in range(1, len(order))) + dist[order[-1]][order[0]]
+
+
+def distance_matrix(G):
+    """dist[u][v] = weight of the edge u-v of a complete graph on the nodes 0 to n-1, dist[u][u] = 0"""
+    n = G.number_of_nodes()
+    dist = [[float('inf')] * n for _ in range(n)]
+    for u in range(n):
+        dist[u][u] = 0
+    for u, v, data in G.edges(data=True):
+        dist[u][v] = data['weight']
+        dist[v][u] = data['weight']
+    return dist
+
+
+def nearest_neighbor_order(nodes, dist, start=0):
+    """Visit the nearest unvisited node first, starting from start"""
+    unvisited = [v for v in nodes if v != start]
+    order = [start]
+    while unvisited:
+        last = order[-1]
+        best = min(range(len(unvisited)), key=lambda i: dist[last][unvisited[i]])
+        order.append(unvisited.pop(best))
+    return order
+
+
+def two_opt(order, dist):
+    """
+    Improve a tour by reversing segments until no reversal shortens it.
+    order[0] stays in place. Works in place.
+
+    Returns:
+        int: Number of improving moves applied.
+    """
+    k = len(order)
+    moves = 0
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, k - 1):
+            a, b = order[i - 1], order[i]
+            d_ab = dist[a][b]
+            for j in range(i + 1, k):
+                c, e = order[j], order[(j + 1) % k]
+                delta = dist[a][c] + dist[b][e] - d_ab - dist[c][e]
+                if delta < -1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    moves += 1
+                    improved = True
+                    b = order[i]
+                    d_ab = dist[a][b]
+    return moves
+
+
+def or_opt(order, dist, max_segment=3):
+    """
+    Improve a tour by moving segments of up to max_segment consecutive stops
+    to a better position. order[0] stays in place. Works in place.
+
+    Returns:
+        int: Number of improving moves applied.
+    """
+    moves = 0
+    improved = True
+    while improved:
+        improved = False
+        k = len(order)
+        for length in range(1, max_segment + 1):
+            for i in range(1, k - length + 1):
+                segment = order[i:i + length]
+                prev, nxt = order[i - 1], order[(i + length) % k]
+                removal_gain = dist[prev][segment[0]] + dist[segment[-1]][nxt] - dist[prev][nxt]
+                rest = order[:i] + order[i + length:]
+                best_delta, best_position, best_reversed = -1e-9, None, False
+                for p in range(len(rest)):
+                    a, b = rest[p], rest[(p + 1) % len(rest)]
+                    d_ab = dist[a][b]
+                    forward = dist[a][segment[0]] + dist[segment[-1]][b] - d_ab - removal_gain
+                    backward = dist[a][segment[-1]] + dist[segment[0]][b] - d_ab - removal_gain
+                    if forward < best_delta:
+                        best_delta, best_position, best_reversed = forward, p, False
+                    if backward < best_delta:
+                        best_delta, best_position, best_reversed = backward, p, True
+                if best_position is not None:
+                    if best_reversed:
+                        segment.reverse()
+                    order[:] = rest[:best_position + 1] + segment + rest[best_position + 1:]
+                    moves += 1
+                    improved = True
+                    break
+            if improved:
+                break
+    return moves
+
+
+def improve_order(order, dist):
+    """Alternate 2-opt and Or-opt until neither improves the tour. Works in place."""
+    moves = two_opt(order, dist)
+    while True:
+        moved = or_opt(order, dist)
+        if not moved:
+            break
+        moves += moved + two_opt(order, dist)
+    return moves
+
+
+def heuristic_tsp(G, stats=None):
+    """
+    Drop-in replacement of mtsp_dp for instances too large for the DP:
+    nearest neighbor followed by 2-opt and Or-opt. Uses O(n^2) memory instead
+    of O(n 2^n), the tour is not guaranteed to be optimal.
+
+    Parameters:
+        G (nx.Graph): Complete graph on the nodes 0 to n-1, see mtsp_dp.
+        stats (SolverStats): Optional, receives heuristic_tsp.moves.
+
+    Returns:
+        list: A tour over all nodes of G, starting and ending at node 0.
+    """
+    n = G.number_of_nodes()
+    dist = distance_matrix(G)
+    order = nearest_neighbor_order(range(n), dist)
+    moves = improve_order(order, dist)
+    if stats is not None:
+        stats.add('heuristic_tsp.moves', moves)
+    return order + [0]